@@ -0,0 +1,92 @@
+"""
+    Compara a API do Node com o IO direto no address space (components.io.DirectIO) no mesmo
+    processo do servidor: operacoes por segundo de escrita de atuador e leitura de sensor, com
+    e sem uma subscription interna no node escrito.
+
+    $ python -m benchmarks.direct_io --ops 20000
+"""
+from asyncua import Server, ua
+from components.io import NodeIO, DirectIO, bind_io
+
+import argparse
+import asyncio
+import time
+
+
+WARMUP = 200
+
+
+class Counter:
+    """Handler de subscription que so conta as notificacoes recebidas."""
+    def __init__(self):
+        self.notifications = 0
+
+    def datachange_notification(self, node, val, data):
+        self.notifications += 1
+
+
+async def rate(operation, ops: int) -> float:
+    for i in range(WARMUP):
+        await operation(i)
+
+    start = time.perf_counter()
+    for i in range(ops):
+        await operation(i)
+
+    return ops / (time.perf_counter() - start)
+
+
+async def measure(io: NodeIO, ops: int) -> dict:
+    values = (False, True)
+
+    async def write(i):
+        await io.write(values[i & 1])
+
+    async def read(i):
+        await io.read()
+
+    return {'write': await rate(write, ops), 'read': await rate(read, ops)}
+
+
+async def main(ops: int):
+    server = Server()
+    await server.init()
+    idx = await server.register_namespace('urn:benchmark')
+    objects = server.get_objects_node()
+
+    node = await objects.add_variable(ua.NodeId('Benchmark.Actuator', idx), ua.QualifiedName('Actuator', idx), False, varianttype=ua.VariantType.Boolean)
+    await node.set_writable(True)
+
+    await server.start()
+    try:
+        results = []
+        for subscribed in (False, True):
+            subscription = None
+            if subscribed:
+                handler = Counter()
+                subscription = await server.create_subscription(10, handler)
+                await subscription.subscribe_data_change(node)
+
+            for io in (bind_io(server, node, ua.VariantType.Boolean, direct=False), bind_io(server, node, ua.VariantType.Boolean)):
+                result = await measure(io, ops)
+                result['api'] = 'direct' if isinstance(io, DirectIO) else 'node'
+                result['subscribed'] = subscribed
+                results.append(result)
+
+            if subscription is not None:
+                await subscription.delete()
+
+    finally:
+        await server.stop()
+
+    print(f"{'api':<10}{'subscribed':>12}{'write ops/s':>14}{'read ops/s':>14}")
+    for r in results:
+        print(f"{r['api']:<10}{str(r['subscribed']):>12}{r['write']:>14.0f}{r['read']:>14.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ops/s da API do Node contra o IO direto no address space')
+    parser.add_argument('--ops', type=int, default=20000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.ops))
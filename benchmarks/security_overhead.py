@@ -0,0 +1,135 @@
+"""
+    Mede o custo de cada modo de seguranca: latencia por mensagem (escrita de atuador e leitura de sensor)
+    e CPU do processo por mensagem, com servidor e cliente na mesma maquina.
+
+    $ python -m benchmarks.security_overhead --messages 2000
+"""
+from typing import List
+from pathlib import Path
+from asyncua import Client, Server, ua
+from asyncua.crypto.cert_gen import setup_self_signed_certificate
+from asyncua.crypto.security_policies import SecurityPolicyBasic256Sha256
+from cryptography.x509.oid import ExtendedKeyUsageOID
+from manager.security import EndpointConfig, EndpointUserManager, SecurityMode, configure_endpoints, start_endpoints
+
+import argparse
+import asyncio
+import socket
+import statistics
+import tempfile
+import time
+
+
+BASE_PORT = 4850
+WARMUP = 50
+SUBJECT = {"countryName": "BR", "organizationName": "Benchmark"}
+
+
+async def create_certificate(base: Path, name: str, app_uri: str, usage: list) -> tuple:
+    cert, key = base / f'{name}.der', base / f'{name}_key.pem'
+    await setup_self_signed_certificate(key, cert, app_uri, socket.gethostname(), usage, SUBJECT)
+    return cert, key
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def measure(url: str, idx: int, mode: SecurityMode, client_cert: Path, client_key: Path, messages: int) -> dict:
+    client = Client(url)
+    client.application_uri = 'urn:benchmark:client'
+
+    if mode != SecurityMode.NONE:
+        await client.set_security(SecurityPolicyBasic256Sha256, str(client_cert), str(client_key), mode=mode.message_mode)
+
+    async with client:
+        actuator = client.get_node(ua.NodeId('Benchmark.Actuator', idx))
+        sensor = client.get_node(ua.NodeId('Benchmark.Sensor', idx))
+        datavalues = [ua.DataValue(ua.Variant(value, ua.VariantType.Boolean)) for value in (False, True)]
+
+        # aquecimento, fora da medicao
+        for i in range(WARMUP):
+            await actuator.write_value(datavalues[i % 2])
+
+        latencies = []
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+
+        for i in range(messages):
+            start = time.perf_counter()
+            await actuator.write_value(datavalues[i % 2])
+            await sensor.read_value()
+            latencies.append((time.perf_counter() - start) / 2)
+
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+
+    return {
+        'mode': mode.name,
+        'mean_ms': statistics.mean(latencies) * 1e3,
+        'p50_ms': percentile(latencies, 0.5) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'cpu_us_per_msg': cpu / (messages * 2) * 1e6,
+        'msg_per_s': messages * 2 / wall,
+    }
+
+
+async def main(messages: int):
+    modes = [SecurityMode.NONE, SecurityMode.SIGN, SecurityMode.SIGN_AND_ENCRYPT]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        server_uri = 'urn:benchmark:server'
+        server_cert, server_key = await create_certificate(
+            base, 'server', server_uri, [ExtendedKeyUsageOID.SERVER_AUTH, ExtendedKeyUsageOID.CLIENT_AUTH])
+        client_cert, client_key = await create_certificate(
+            base, 'client', 'urn:benchmark:client', [ExtendedKeyUsageOID.CLIENT_AUTH])
+
+        endpoints = [
+            EndpointConfig(BASE_PORT + i, [mode], users=[(str(client_cert), 'benchmark')], anonymous=mode == SecurityMode.NONE)
+            for i, mode in enumerate(modes)
+        ]
+
+        user_manager = EndpointUserManager(endpoints)
+        await user_manager.load()
+
+        server = Server(user_manager=user_manager)
+        await server.init()
+        await server.set_application_uri(server_uri)
+        configure_endpoints(server, endpoints)
+
+        await server.load_certificate(str(server_cert))
+        await server.load_private_key(str(server_key))
+
+        idx = await server.register_namespace('urn:benchmark')
+        objects = server.get_objects_node()
+        for name in ['Actuator', 'Sensor']:
+            node = await objects.add_variable(ua.NodeId(f'Benchmark.{name}', idx), ua.QualifiedName(name, idx), False, varianttype=ua.VariantType.Boolean)
+            await node.set_writable(True)
+
+        await server.start()
+        listeners = await start_endpoints(server, endpoints)
+
+        try:
+            results = []
+            for endpoint, mode in zip(endpoints, modes):
+                results.append(await measure(endpoint.url('127.0.0.1'), idx, mode, client_cert, client_key, messages))
+
+        finally:
+            for listener in listeners:
+                await listener.stop()
+
+            await server.stop()
+
+    print(f"{'mode':<18}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'cpu us/msg':>12}{'msg/s':>10}")
+    for r in results:
+        print(f"{r['mode']:<18}{r['mean_ms']:>10.3f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['cpu_us_per_msg']:>12.1f}{r['msg_per_s']:>10.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Custo de cada modo de seguranca OPC UA')
+    parser.add_argument('--messages', type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.messages))
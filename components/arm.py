@@ -1,30 +1,49 @@
 from components.base import BaseComponent
-from asyncua import ua
 
 import asyncio
 
 
 class ArmComponent(BaseComponent):
-    def __init__(self, name, server, namespace_index, base_node):
+    """
+        Braco pivotante que alimenta as tampas: gira sobre a esteira de tampas e empurra a
+        proxima tampa ate o ponto de pega do PickPlace. Nao tem sensores, o movimento é por tempo.
+        Quem precisa de uma tampa seta 'requested' e espera 'fed'.
+    """
+    kind = 'Arm'
+
+    def __init__(self, name, server, namespace_index, base_node, push_time: float = 1.5, return_time: float = 1.0):
         super().__init__(name, server, namespace_index, base_node)
 
+        self.push_time = push_time
+        self.return_time = return_time
+        self.requested = asyncio.Event()
+        self.fed = asyncio.Event()
+        self.covers_fed = 0
+
     async def build(self):
         # criar as motores de movimento e direção
-        idx = self.namespace_index
-        self.move = await self.base_node.add_variable(idx, f'IO:Move {self.name}', False, varianttype=ua.VariantType.Boolean)
-        self.move.set_writable(True)
-        self.nodes.append(self.move)
+        self.move = await self.add_io(f'IO:Move {self.name}', 'Move', actuator=True)
+        self.move_front = await self.add_io(f'IO:Move Front {self.name}', 'MoveFront', actuator=True)
+        self.move_back = await self.add_io(f'IO:Move Back {self.name}', 'MoveBack', actuator=True)
 
-        self.move_front = await self.base_node.add_variable(idx, f'IO:Move Front {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.move_front.set_writable(True)
-        self.nodes.append(self.move_front)
+    async def push_cover(self):
+        # gira o braco sobre a esteira e empurra a tampa para o ponto de pega
+        await self.write(self.move, True)
+        await self.write(self.move_front, True)
+        await self.dwell(self.push_time)
 
-        self.move_back = await self.base_node.add_variable(idx, f'IO:Move Back {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.move_back.set_writable(True)
-        self.nodes.append(self.move_back)
+        # volta a posicao de repouso
+        await self.write(self.move_front, False)
+        await self.write(self.move, False)
+        await self.dwell(self.return_time)
 
     async def run(self):
         await self.start_event.wait()
 
         while True:
-            await asyncio.sleep(1)
+            await self.requested.wait()
+            self.requested.clear()
+
+            await self.push_cover()
+            self.covers_fed += 1
+            self.fed.set()
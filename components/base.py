@@ -1,10 +1,16 @@
-from typing import List, Union
+from typing import Dict, List, Optional, Tuple, Union
 from abc import abstractmethod, ABC
-from asyncua import Node, Server
+from asyncua import Node, Server, ua
 from asyncua.ua import NodeId
 from enum import Enum, auto
+from contextlib import contextmanager
+from datetime import timezone
+from manager.metrics import Histogram
+from components.io import IOBackend, NodeIO, OpcUaBackend
 
 import asyncio
+import time
+import weakref
 
 
 class BoxType(Enum):
@@ -13,7 +19,37 @@ class BoxType(Enum):
     METAL = auto()
 
 
+def make_node_id(namespace_index: int, *parts: str) -> NodeId:
+    """
+        Gera um NodeId de string deterministico a partir das partes do caminho,
+        ex: make_node_id(2, 'Conveyor', 'InputConveyor', 'Engine0') -> ns=2;s=Conveyor.InputConveyor.Engine0
+    """
+    identifier = '.'.join(part.replace(' ', '') for part in parts)
+    return NodeId(identifier, namespace_index)
+
+
 class BaseComponent:
+    # prefixo usado nos NodeIds das variaveis do componente
+    kind = 'Component'
+
+    # escala dos tempos de espera fixos, < 1 acelera (ex: replay de traces)
+    time_scale = 1.0
+
+    # gravador de IO compartilhado por todos os componentes, None desabilita
+    recorder = None
+
+    # perfil de tempos (manager.timing.TimingProfile), None mantem os dwell fixos
+    timing = None
+
+    # prazo e recuperacao das esperas de sensor (manager.watchdog.Watchdog), None espera para sempre
+    watchdog = None
+
+    # escritas de atuador com o valor ja comandado nao vao para o servidor
+    suppress_writes = True
+
+    # backend de IO da planta (components.io), a Line troca por instancia quando usa outro
+    io_backend: IOBackend = OpcUaBackend()
+
     def __init__(self, name: str, server: Server, namespace_index: int, base_node: Node):
         self.name = name
         self.server = server
@@ -21,7 +57,320 @@ class BaseComponent:
         self.base_node = base_node
         self.start_event = asyncio.Event()
         self.nodes = []
+
+        # IO de cada node criado por add_io, ligado uma vez no build
+        self.bindings: Dict[NodeId, NodeIO] = {}
+
+        # IO booleano (sensores e atuadores) na ordem de criacao, lido pelo LineSnapshot
+        self.io: List[Tuple[str, Node]] = []
+
+        # liberado enquanto o processo roda, em pausa as escritas esperam aqui
+        self.running = asyncio.Event()
+        self.running.set()
+        self.halted = asyncio.Event()
+        self._frozen: Dict[Node, bool] = {}
+
+        # ultimo valor comandado de cada atuador, escritas repetidas sao suprimidas
+        self.commanded: Dict[NodeId, object] = {}
+        self.writes_issued = 0
+        self.writes_suppressed = 0
+
+        # esperas de sensor em andamento, usadas pelo monitor para detectar travamentos, e as tasks
+        # da sequencia do componente (as que esperam os sensores dele)
+        self.active_waits: Dict[int, ActiveWait] = {}
+        self._sequence_tasks: weakref.WeakSet = weakref.WeakSet()
+        self.wait_histogram = Histogram()
+
+        # ultima borda consumida e a task que a consumiu; o primeiro comando dessa task logo depois
+        # da borda (sem dwell no meio) mede o tempo de reacao
+        self.last_edge: Optional[EdgeEvent] = None
+        self._edge_task: Optional[asyncio.Task] = None
+        self.reaction_histogram = Histogram()
+
+        # tempo de ciclo por caixa processada
+        self.cycle_histogram = Histogram()
+
+        # recuperacoes do watchdog; isolated enquanto o componente espera a liberacao de um jam
+        self.watchdog_timeouts = 0
+        self.missed_edges = 0
+        self.motion_retries = 0
+        self.jams = 0
+        self.isolated = False
+        self.downtime_avoided = 0.0
+
+        # linha (Line.name), caixa em processamento e instante do ultimo comando, chaves do perfil de tempos;
+        # com varias linhas no mesmo processo os componentes tem os mesmos nomes em todas
+        self.line_name: Optional[str] = None
+        self.current_box: Optional[BoxType] = None
+        self.last_command_at: Optional[float] = None
+        self._wait_ended_at: Optional[float] = None
+
+    def node_id(self, signal: str) -> NodeId:
+        return make_node_id(self.namespace_index, self.kind, self.name, signal)
+
+    async def add_io(self, browse_name: str, signal: str, value=False, varianttype=ua.VariantType.Boolean, actuator=False) -> Node:
+        """
+            Cria uma variavel de IO com NodeId estavel (kind.name.signal), assim os clientes
+            podem guardar os ids e registrar os nodes uma unica vez.
+            Atuadores sao adicionados em self.nodes para serem resetados.
+        """
+        qualified_name = ua.QualifiedName(browse_name, self.namespace_index)
+        node = await self.base_node.add_variable(self.node_id(signal), qualified_name, value, varianttype=varianttype)
+        await node.set_writable(True)
+        self.bindings[node.nodeid] = self.io_backend.bind(self.server, node, varianttype, actuator)
+
+        if actuator:
+            self.nodes.append(node)
+            self.commanded[node.nodeid] = value
+
+        if varianttype == ua.VariantType.Boolean:
+            self.io.append((f'{self.kind}.{self.name}.{signal}', node))
+
+        return node
     
+    async def write(self, node: Node, value, varianttype: Optional[ua.VariantType] = None):
+        """
+            Escreve em um atuador. Em pausa, a escrita fica bloqueada ate o resume,
+            assim a sequencia do componente congela no passo atual.
+        """
+        await self.running.wait()
+
+        # o trace guarda o comando da sequencia, mesmo quando a escrita é suprimida
+        if self.recorder is not None:
+            self.recorder.actuator(node.nodeid, value)
+
+        edge = self._take_edge()
+        if self.suppress_writes and self.commanded.get(node.nodeid, _UNKNOWN) == value:
+            # o atuador ja esta no valor, mas o passo da sequencia foi comandado agora
+            self.writes_suppressed += 1
+            self._command_issued()
+            return
+
+        if edge is not None:
+            self.reaction_histogram.observe(edge.latency(time.time()))
+
+        await self._write_node(node, value, varianttype)
+
+        self.commanded[node.nodeid] = value
+        self.writes_issued += 1
+        self._command_issued()
+
+    def _command_issued(self):
+        now = time.monotonic()
+        self.last_command_at = now
+
+        # comando de outro estagio (move_to_next / move_to_prev na task dele) arma as esperas external
+        if asyncio.current_task() not in self._sequence_tasks:
+            for active_wait in self.active_waits.values():
+                if active_wait.external and active_wait.armed_at is None:
+                    active_wait.armed_at = now
+
+    def _take_edge(self) -> Optional['EdgeEvent']:
+        """Borda ainda sem reacao consumida pela task atual, None para escritas de outras tasks."""
+        if self.last_edge is None or self._edge_task is not asyncio.current_task():
+            return None
+
+        edge, self.last_edge = self.last_edge, None
+        return edge
+
+    async def _write_node(self, node: Node, value, varianttype: Optional[ua.VariantType] = None):
+        io = self.bindings.get(node.nodeid)
+        if io is not None:
+            await io.write(value)
+
+        elif varianttype is None:
+            await node.set_value(value)
+
+        else:
+            await node.set_data_value(value=value, varianttype=varianttype)
+
+    async def read(self, node: Node):
+        """Valor atual de um node, pelo IO ligado no build quando existir."""
+        io = self.bindings.get(node.nodeid)
+        if io is not None:
+            return await io.read()
+
+        return await node.read_value()
+
+    async def resend(self):
+        """Reenvia o valor comandado de todos os atuadores, sem supressao (retry do watchdog)."""
+        for node in self.nodes:
+            value = self.commanded.get(node.nodeid, _UNKNOWN)
+            if value is not _UNKNOWN:
+                await self._write_node(node, value)
+
+        self.last_command_at = time.monotonic()
+
+    async def reconcile(self):
+        """
+            Le o valor atual dos atuadores e corrige os valores comandados, depois de um reset
+            do processo, de uma reconexao ou de uma escrita feita por outro cliente.
+        """
+        for node in self.nodes:
+            self.commanded[node.nodeid] = await self.read(node)
+
+    def timing_key(self, label: str) -> str:
+        """Chave do perfil de tempos: [linha.]kind.name.sinal[.borda][.BoxType]."""
+        prefix = f'{self.kind}.{self.name}.'
+        key = label if label.startswith(prefix) else prefix + label
+
+        if self.line_name is not None:
+            key = f'{self.line_name}.{key}'
+
+        if self.current_box is not None:
+            key = f'{key}.{self.current_box.name}'
+
+        return key
+
+    async def dwell(self, seconds: float, after: Union[str, 'EdgeDetector', None] = None):
+        """
+            Tempo de espera de uma sequencia, escalado por time_scale. Com 'after' (o movimento
+            confirmado logo antes) e um perfil de tempos ativo, o valor é adaptado à velocidade
+            observada desse movimento.
+        """
+        if after is not None and self.timing is not None:
+            label = after if isinstance(after, str) else after.label
+            seconds = self.timing.dwell(self.timing_key(label), seconds)
+
+        # um comando depois de uma pausa proposital nao é reacao a borda
+        self._take_edge()
+
+        # o tempo so corre com o processo rodando, uma pausa no meio congela o restante
+        remaining = seconds * self.time_scale
+        while remaining > 0:
+            await self.running.wait()
+            started = time.monotonic()
+            if await self._wait_running(None, remaining) is not self.halted:
+                return
+
+            remaining -= time.monotonic() - started
+
+    async def wait_running(self, event: asyncio.Event, timeout: float):
+        """
+            Espera o evento com prazo, contado so com o processo rodando: uma pausa suspende a
+            espera e o prazo recomeça inteiro no resume. asyncio.TimeoutError quando estoura.
+        """
+        while True:
+            await self.running.wait()
+            result = await self._wait_running(event, timeout)
+            if result is event:
+                return
+
+            if result is None:
+                raise asyncio.TimeoutError
+
+    async def _wait_running(self, event: Optional[asyncio.Event], timeout: float) -> Optional[asyncio.Event]:
+        """O evento (ou halted, se o processo pausou antes) que disparou dentro de timeout, None se nenhum."""
+        waiters = {asyncio.ensure_future(self.halted.wait()): self.halted}
+        if event is not None:
+            waiters[asyncio.ensure_future(event.wait())] = event
+
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=timeout)
+
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+        fired = [waiters[waiter] for waiter in done]
+        if event is not None and event in fired:
+            return event
+
+        return self.halted if fired else None
+
+    def end_cycle(self, started: float):
+        """Fecha o ciclo de uma caixa iniciado em 'started' (time.monotonic())."""
+        self.cycle_histogram.observe(time.monotonic() - started)
+
+    @contextmanager
+    def waiting(self, label: str, external: bool = False):
+        """
+            Registra uma espera de sensor em andamento, com a task que esta esperando. Esperas
+            external incluem o tempo do outro estagio e nao entram no perfil de tempos.
+        """
+        active_wait = ActiveWait(label, asyncio.current_task(), external)
+        commanded_at = self.last_command_at
+        self.active_waits[id(active_wait)] = active_wait
+        if active_wait.task is not None:
+            self._sequence_tasks.add(active_wait.task)
+
+        try:
+            yield active_wait
+
+        finally:
+            del self.active_waits[id(active_wait)]
+            self.wait_histogram.observe(time.monotonic() - active_wait.since)
+            ended_at, self._wait_ended_at = self._wait_ended_at, time.monotonic()
+
+        # so esperas concluidas no tempo normal entram no perfil, do comando que iniciou o movimento (o ultimo
+        # antes da espera, desde que depois da espera anterior, ex: comando, dwell, espera) ate a confirmacao
+        if self.timing is not None and not active_wait.recovered and not external:
+            started = active_wait.since
+            if commanded_at is not None and (ended_at is None or commanded_at >= ended_at):
+                started = min(started, commanded_at)
+
+            self.timing.observe(self.timing_key(label), time.monotonic() - started)
+
+    async def wait_edge(self, detector: 'EdgeDetector', label: Optional[str] = None, external: bool = False):
+        """
+            Espera o trigger do detector e limpa o evento para a proxima borda. external: a borda
+            depende de outro estagio (ex: o proximo puxar a caixa), o prazo do watchdog so conta
+            a partir do primeiro comando que o outro estagio mandar para este componente.
+        """
+        label = label or detector.label
+        with self.waiting(label, external) as active_wait:
+            if self.watchdog is None:
+                await detector.wait()
+
+            else:
+                active_wait.recovered = await self.watchdog.guard(self, active_wait, detector.event_trigger, lambda: self.reread_edge(detector))
+                detector.clear()
+
+        self.last_edge = detector.last_event
+        self._edge_task = asyncio.current_task()
+
+    async def reread_edge(self, detector: 'EdgeDetector'):
+        """Relê o sensor do detector; uma borda perdida dispara o evento agora."""
+        io = self.bindings.get(detector.node_id)
+        if io is not None:
+            detector.update(int(bool(await io.read())), detector.name)
+
+    @property
+    def paused(self) -> bool:
+        return not self.running.is_set()
+
+    async def pause(self):
+        """
+            Congela os atuadores: guarda o valor atual dos atuadores booleanos e desliga todos.
+            Filas, subscriptions e tasks continuam vivas.
+        """
+        if self.paused:
+            return
+
+        self.running.clear()
+        self.halted.set()
+        self.last_edge = None
+        for node in self.nodes:
+            value = await self.read(node)
+            if isinstance(value, bool):
+                self._frozen[node] = value
+                await self._write_node(node, False)
+                self.commanded[node.nodeid] = False
+
+    async def resume(self):
+        """Restaura os atuadores congelados e libera a sequencia do ponto onde parou."""
+        if not self.paused:
+            return
+
+        for node, value in self._frozen.items():
+            if value:
+                await self._write_node(node, value)
+                self.commanded[node.nodeid] = value
+
+        self._frozen.clear()
+        self.halted.clear()
+        self.running.set()
+
     @abstractmethod
     async def run(self):
         raise NotImplementedError
@@ -37,12 +386,48 @@ class BaseComponent:
         pass
 
 
+# valor comandado ainda desconhecido, a proxima escrita sempre vai para o servidor
+_UNKNOWN = object()
+
+
+class ActiveWait:
+    def __init__(self, label: str, task: Optional[asyncio.Task], external: bool = False):
+        self.label = label
+        self.task = task
+        self.since = time.monotonic()
+        self.reported = False
+        self.recovered = False
+
+        # inicio do prazo do watchdog, proprio de cada espera: o inicio dela, ou nas esperas
+        # external o primeiro comando de outro estagio (None ate la)
+        self.external = external
+        self.armed_at: Optional[float] = None if external else self.since
+
+
 class EdgeType(Enum):
     RISING = auto()
     FALLING = auto()
     BOTH = auto()
 
 
+class EdgeEvent:
+    """
+        Borda detectada, com o timestamp de origem do sensor (SourceTimestamp do DataValue,
+        em epoch) e o instante em que a notificacao chegou no servidor.
+    """
+    __slots__ = ('edge', 'source_timestamp', 'received_at')
+
+    def __init__(self, edge: EdgeType, source_timestamp: Optional[float], received_at: float):
+        self.edge = edge
+        self.source_timestamp = source_timestamp
+        self.received_at = received_at
+
+    def latency(self, command_at: float) -> float:
+        """Tempo da borda no sensor ate o comando do atuador."""
+        reference = self.source_timestamp if self.source_timestamp is not None else self.received_at
+        return max(0.0, command_at - reference)
+
+
 class State(Enum):
     LOW = 0
     HIGH = 1
@@ -60,8 +445,18 @@ class EdgeDetector:
         self.trigger_on = trigger_on
         self.event_trigger = event
         self.enable = enable
+        self.last_event: Optional[EdgeEvent] = None
+
+    @property
+    def name(self) -> str:
+        return str(self.node_id.Identifier)
+
+    @property
+    def label(self) -> str:
+        """Sinal e borda esperada, bordas de subida e descida do mesmo sensor tem tempos diferentes."""
+        return f'{self.name}.{self.trigger_on.name}'
     
-    def update(self, signal_value: int, name: str):
+    def update(self, signal_value: int, name: str, source_timestamp: Optional[float] = None, received_at: Optional[float] = None):
         """Atualiza o estado com o novo valor do sensor (0 ou 1)."""
         if self.enable is False:
             return
@@ -83,6 +478,7 @@ class EdgeDetector:
         if edge:
             if self.trigger_on == EdgeType.BOTH or self.trigger_on == edge:
                 # print(f'Trigger Event: {self.trigger_on} for node_id: {name}')
+                self.last_event = EdgeEvent(edge, source_timestamp, received_at or time.time())
                 self.event_trigger.set()
     
     def set_trigger(self, trigger_on: EdgeType):
@@ -100,18 +496,41 @@ class EdgeDetector:
         self.event_trigger.clear()
 
 
+def sensor_timestamp(data) -> Optional[float]:
+    """SourceTimestamp (ou ServerTimestamp) do DataValue da notificacao, em epoch."""
+    try:
+        datavalue = data.monitored_item.Value
+    except AttributeError:
+        return None
+
+    timestamp = datavalue.SourceTimestamp or datavalue.ServerTimestamp
+    if timestamp is None:
+        return None
+
+    # timestamps OPC UA sao sempre UTC
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+    return timestamp.timestamp()
+
+
 class EventSensorHandle:
     def __init__(self, server: Server, edge_detectors: List[EdgeDetector]):
         self.server = server
         self.edge_detectors = edge_detectors
 
     async def datachange_notification(self, node: Node, val, data):
+       received_at = time.time()
+       source_timestamp = sensor_timestamp(data)
        name = await node.read_browse_name()
        value = int(val)
 
+       if BaseComponent.recorder is not None:
+           BaseComponent.recorder.sensor(node.nodeid, value)
+
        for edge_detector in self.edge_detectors:
            if node.nodeid == edge_detector.node_id:
-               edge_detector.update(value, name)
+               edge_detector.update(value, name, source_timestamp, received_at)
 
     async def event_notification(self, event):
         pass
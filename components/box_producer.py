@@ -3,30 +3,102 @@ from components.order import Order, OrderFn, OrderState
 from asyncua import Node, Server, ua
 from typing import List, Optional, Tuple
 from enum import Enum, auto
+from manager.jobs import JobQueue
+from manager.make_ahead import MakeAhead
 
 import asyncio
+import time
 
 
 class BoxFeeder(BaseComponent):
-    def __init__(self, order_producer_queue: asyncio.Queue[Order], box_type: BoxType, server: Server, namespace_index: int, base_node: Node, num_emitters: int, num_conveyors: int, queue: asyncio.Queue[OrderFn]):
+    """
+        Produz as caixas de um tipo: emite o container, enche com o produto e leva pelas
+        esteiras ate o sensor de fim, onde o turntable de selecao puxa.
+
+        pipelined: o proximo container é emitido e enchido enquanto a caixa anterior ainda
+        anda pelas esteiras 3 e 4 ou espera o turntable. A proxima caixa passa do sensor de
+        start e para na esteira 2 ate a anterior sair do sensor de fim (feeders de 2 esteiras
+        esperam a saida antes de passar do start, a ultima esteira é puxada pelo turntable).
+
+        make_ahead: com a fila vazia o feeder produz uma caixa sem ordem e deixa parada no
+        sensor de fim (park_capacity), a proxima ordem do tipo recebe essa caixa na hora.
+    """
+    kind = 'Feeder'
+
+    def __init__(self, order_producer_queue: JobQueue, box_type: BoxType, server: Server, namespace_index: int, base_node: Node, num_emitters: int, num_conveyors: int, queue: asyncio.Queue[OrderFn], pipelined: bool = False, make_ahead: Optional[MakeAhead] = None):
         super().__init__(box_type.name, server, namespace_index, base_node)
 
         # enfileira caixas para o segundo estagio, passando o tipo e um metodo para avançar a ultima esteira
         self.order_producer_queue = order_producer_queue
         self.box_type = box_type
+        self.current_box = box_type
+        self.boxes_done = 0
         self.queue = queue  
         self.num_emitters = num_emitters
         self.num_conveyors = num_conveyors
+        self.pipelined = pipelined
+
+        # modo pipelined: pedido de enchimento do proximo container e container pronto
+        self.fill_next = asyncio.Event()
+        self.filled = asyncio.Event()
+        self._fill_pending = False
+
+        # o turntable desligou a ultima esteira depois de puxar a caixa, o trecho final esta livre
+        self.released = asyncio.Event()
+
+        # caixas antecipadas paradas no sensor de fim, sem ordem; so cabe uma, a seguinte
+        # ficaria no trecho que a sequencia do feeder usa para a proxima caixa
+        self.make_ahead = make_ahead
+        self.park_capacity = 1
+        self.parked = 0
 
         self.emitters = []
         self.conveyors = []
         self.sensors = []
 
+    def wants_make_ahead(self) -> bool:
+        if self.make_ahead is None or not self.order_producer_queue.empty():
+            return False
+
+        return self.parked < self.park_capacity and self.make_ahead.wanted(self.box_type)
+
+    async def next_order(self) -> Optional[Order]:
+        """Ordem da proxima caixa, ou None quando a fila esta vazia e a politica pede uma caixa antecipada."""
+        while True:
+            if self.wants_make_ahead():
+                return None
+
+            timeout = self.make_ahead.period if self.make_ahead is not None else None
+            try:
+                order = await asyncio.wait_for(self.order_producer_queue.get(), timeout)
+
+            except asyncio.TimeoutError:
+                continue
+
+            if order.state == OrderState.WAIT:
+                order.set_state(OrderState.PRODUCTION)
+                print(f'[Feeder]: Received production order: {order}')
+
+                if self.make_ahead is not None:
+                    self.make_ahead.observe(order)
+
+            return order
+
+    async def assign_parked(self, order: Order):
+        """Entrega a caixa antecipada parada no sensor de fim para a ordem."""
+        print(f'[Feeder]: assigning parked box to order: {order}')
+        order.start_box()
+        self.parked -= 1
+        self.make_ahead.hits += 1
+
+        await self.queue.put((order, self.move_to_next))
+        self.boxes_done += 1
+
     async def enche_container(self, node_producer: Node):
         # await asyncio.sleep(1)
-        await node_producer.set_value(True)
-        await asyncio.sleep(5)
-        await node_producer.set_value(False)
+        await self.write(node_producer, True)
+        await self.dwell(5)
+        await self.write(node_producer, False)
 
     async def run(self):
         producer_container = producer_product = None
@@ -59,103 +131,231 @@ class BoxFeeder(BaseComponent):
         await self.start_event.wait()
 
         print(f'[Feeder]: Starting box producer: {self.box_type.name}')
+
+        if self.pipelined:
+            # borda de descida do sensor de fim em um detector separado, a caixa anterior saiu
+            end_leave_detector = EdgeDetector(end_sensor.nodeid, asyncio.Event(), EdgeType.FALLING)
+            handler.add_detect(end_leave_detector)
+
+            asyncio.create_task(self.task_fill(producer_container, producer_product, edge_detectors[0]), name=f'{self.name}:fill')
+            await self.run_pipelined(start_converyor, end_conveyors, edge_detectors[0], edge_detectors[1], end_leave_detector)
+
         is_full = False
         
         while True:
-            # ja começa ligando a upper e down, desliga o evento do sensor de start
-            order = await self.order_producer_queue.get()
-            order.state = OrderState.PRODUCTION
+            # uma caixa por vez: a fila devolve a ordem da proxima caixa, por prioridade
+            order = await self.next_order()
 
-            print(f'[Feeder]: Received production order: {order}')
+            if order is not None and self.parked:
+                # a proxima caixa sai logo (container ja cheio), espera o turntable liberar a ultima esteira
+                self.released.clear()
+                await self.assign_parked(order)
 
-            for _ in range(order.quantity):
-
-                edge_detectors[0].set_enable(False)
-                await producer_container.set_value(True)
-                await asyncio.sleep(1)
+                edge_detectors[1].set_trigger(EdgeType.FALLING)
+                await self.wait_released(edge_detectors[1])
+                edge_detectors[1].set_trigger(EdgeType.RISING)
+                continue
 
-                if is_full is False:
-                    if producer_product:
-                        await producer_product.set_value(True)
-                    
-                    # espera 5 segundo para encher, apos, liga a esteira 1 e 2, e desliga os 2 producer
-                    await asyncio.sleep(5)
+            # ja começa ligando a upper e down, desliga o evento do sensor de start
+            cycle_start = time.monotonic()
+            if order is not None:
+                order.start_box()
 
-                edge_detectors[0].set_enable(True)      # habilita o evento do sensor 1, borda de descida
+            edge_detectors[0].set_enable(False)
+            await self.write(producer_container, True)
+            await self.dwell(1)
 
+            if is_full is False:
                 if producer_product:
-                    await producer_product.set_value(False)
-
-                await asyncio.sleep(1)
+                    await self.write(producer_product, True)
+                
+                # espera 5 segundo para encher, apos, liga a esteira 1 e 2, e desliga os 2 producer
+                await self.dwell(5)
 
-                for conveyor in start_converyor:
-                    await conveyor.set_value(True)
-                        
-                # espera sensor de start, dar a transição
-                # quer dizer que a caixa moveu para a esteira 2
-                await ev_start_sensor.wait()
-                ev_start_sensor.clear()
+            edge_detectors[0].set_enable(True)      # habilita o evento do sensor 1, borda de descida
 
-                # desliga a esteira 1 e ja enche o proximo
-                await start_converyor[0].set_value(False)
+            if producer_product:
+                await self.write(producer_product, False)
 
-                if producer_product:
-                    is_full = True
-                    asyncio.create_task(self.enche_container(producer_product))
-                
-                # liga as esteiras 3 e 4
-                if end_conveyors:
-                    for conveyor in end_conveyors:
-                        await conveyor.set_value(True)
+            await self.dwell(1)
 
-                # espera chegar no final, desliga todas
-                await ev_end_sensor.wait()
-                ev_end_sensor.clear()
+            for conveyor in start_converyor:
+                await self.write(conveyor, True)
+                    
+            # espera sensor de start, dar a transição
+            # quer dizer que a caixa moveu para a esteira 2
+            await self.wait_edge(edge_detectors[0])
+
+            # desliga a esteira 1 e ja enche o proximo
+            await self.write(start_converyor[0], False)
+
+            if producer_product:
+                is_full = True
+                asyncio.create_task(self.enche_container(producer_product))
+            
+            # liga as esteiras 3 e 4
+            if end_conveyors:
+                for conveyor in end_conveyors:
+                    await self.write(conveyor, True)
+
+            # espera chegar no final, desliga todas
+            await self.wait_edge(edge_detectors[1])
+
+            if not end_conveyors:                
+                await self.write(start_converyor[1], False)
+
+            else:
+                for conveyor in self.conveyors:
+                    if conveyor is not None:
+                        await self.write(conveyor, False)
+
+            # caixa antecipada fica parada no sensor de fim ate chegar uma ordem
+            if order is None:
+                self.parked += 1
+                self.make_ahead.produced += 1
+                self.end_cycle(cycle_start)
+                continue
+
+            # configura o evento do sensor de stop, para ser de borda de descida
+            # e depois continua o ciclo novamente
+            # manda uma caixa para a fila do turntable
+            await self.queue.put((order, self.move_to_next))
+            self.boxes_done += 1
+            self.end_cycle(cycle_start)
+
+            # # espera o turn table puxar
+            edge_detectors[1].set_trigger(EdgeType.FALLING)
+            await self.wait_edge(edge_detectors[1], external=True)
+            edge_detectors[1].set_trigger(EdgeType.RISING)
+
+    def request_fill(self):
+        """Pede o proximo container, se ainda nao houver um pedido ou um container pronto."""
+        if not self._fill_pending:
+            self._fill_pending = True
+            self.fill_next.set()
+
+    async def task_fill(self, producer_container: Node, producer_product: Optional[Node], start_detector: EdgeDetector):
+        while True:
+            await self.fill_next.wait()
+            self.fill_next.clear()
 
-                if not end_conveyors:                
-                    await start_converyor[1].set_value(False)
+            start_detector.set_enable(False)
+            await self.write(producer_container, True)
+            await self.dwell(1)
 
-                else:
-                    for conveyor in self.conveyors:
-                        if conveyor is not None:
-                            await conveyor.set_value(False)
+            if producer_product:
+                await self.write(producer_product, True)
+                await self.dwell(5)
+                await self.write(producer_product, False)
 
-                # configura o evento do sensor de stop, para ser de borda de descida
-                # e depois continua o ciclo novamente
-                # manda uma caixa para a fila do turntable
-                await self.queue.put((order, self.move_to_next))
+            start_detector.set_enable(True)
+            await self.dwell(1)
+            self.filled.set()
 
-                # # espera o turn table puxar
-                edge_detectors[1].set_trigger(EdgeType.FALLING)
-                await ev_end_sensor.wait()
+    async def run_pipelined(self, start_converyor: List[Node], end_conveyors: Optional[List[Node]],
+                            start_detector: EdgeDetector, end_detector: EdgeDetector, end_leave_detector: EdgeDetector):
+        box_at_end = False
 
-                ev_end_sensor.clear()
-                edge_detectors[1].set_trigger(EdgeType.RISING)
+        while True:
+            order = await self.next_order()
+
+            if order is not None and self.parked:
+                await self.assign_parked(order)
+                continue
+
+            self.request_fill()
+            await self.filled.wait()
+            self.filled.clear()
+            self._fill_pending = False
+
+            cycle_start = time.monotonic()
+            if order is not None:
+                order.start_box()
+
+            # feeders de 2 esteiras: a ultima esteira é puxada pelo turntable, espera a anterior sair
+            if box_at_end and not end_conveyors:
+                await self.wait_released(end_leave_detector)
+                box_at_end = False
+
+            for conveyor in start_converyor:
+                await self.write(conveyor, True)
+
+            await self.wait_edge(start_detector)
+            await self.write(start_converyor[0], False)
+
+            # a caixa passou do start, ja enche o proximo container se houver mais caixas
+            if not self.order_producer_queue.empty() or self.wants_make_ahead():
+                self.request_fill()
+
+            if end_conveyors:
+                # segura a caixa na esteira 2 ate a anterior sair do sensor de fim
+                if box_at_end:
+                    await self.write(start_converyor[1], False)
+                    await self.wait_released(end_leave_detector)
+                    await self.write(start_converyor[1], True)
+                    box_at_end = False
+
+                for conveyor in end_conveyors:
+                    await self.write(conveyor, True)
+
+            await self.wait_edge(end_detector)
+
+            if not end_conveyors:
+                await self.write(start_converyor[1], False)
+
+            else:
+                for conveyor in self.conveyors:
+                    if conveyor is not None:
+                        await self.write(conveyor, False)
+
+            # a saida desta caixa é esperada so quando a proxima precisar do trecho final
+            end_leave_detector.clear()
+            self.released.clear()
+            box_at_end = True
+
+            if order is None:
+                self.parked += 1
+                self.make_ahead.produced += 1
+                self.end_cycle(cycle_start)
+                continue
+
+            await self.queue.put((order, self.move_to_next))
+            self.boxes_done += 1
+            self.end_cycle(cycle_start)
+
+    async def wait_released(self, end_leave_detector: EdgeDetector):
+        """
+            Espera a caixa anterior sair do sensor de fim e o turntable desligar a ultima esteira,
+            senao o desligamento do turntable pararia a proxima caixa no meio do caminho.
+        """
+        await self.wait_edge(end_leave_detector, external=True)
+        with self.waiting('released', external=True):
+            await self.released.wait()
 
     async def build(self):
         # gera os emitters
         names = [f'IO:Container {self.name}', f'IO:Product {self.name}']
+        signals = ['Container', 'Product']
         for i in range(0, self.num_emitters):
-            node = await self.base_node.add_variable(self.namespace_index, names[i], False, varianttype=ua.VariantType.Boolean)
-            await node.set_writable(True)
+            node = await self.add_io(names[i], signals[i], actuator=True)
             self.emitters.append(node)
-            self.nodes.append(node)
 
         # gera as esteiras
         names = f'IO:Conveyor {self.name}:'
         for i in range(0, self.num_conveyors):
-            node = await self.base_node.add_variable(self.namespace_index, names + f'{i + 1}', False, varianttype=ua.VariantType.Boolean)
-            await node.set_writable(True)
+            node = await self.add_io(names + f'{i + 1}', f'Conveyor{i + 1}', actuator=True)
             self.conveyors.append(node)
-            self.nodes.append(node)
 
         # gera os sensores
         names = [f'IO:Sensor Start {self.name}', f'IO:Sensor End {self.name}']
+        signals = ['SensorStart', 'SensorEnd']
         for i in range(0, 2):
-            node = await self.base_node.add_variable(self.namespace_index, names[i], False, varianttype=ua.VariantType.Boolean)
-            await node.set_writable(True)
+            node = await self.add_io(names[i], signals[i])
             self.sensors.append(node)
 
     async def move_to_next(self, value: bool):
         # liga ou desliga a ultima esteira desse estagio, permite que o turntable mova para frente
-        await self.conveyors[self.num_conveyors - 1].set_value(value)
+        await self.write(self.conveyors[self.num_conveyors - 1], value)
+
+        if not value:
+            self.released.set()
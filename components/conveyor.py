@@ -13,6 +13,8 @@ class ConveyorDirection(Enum):
 
 
 class Conveyor(BaseComponent):
+    kind = 'Conveyor'
+
     def __init__(
             self, name, server, namespace_index, base_node,
             num_engines: int,
@@ -41,22 +43,18 @@ class Conveyor(BaseComponent):
         self.lock_engines = asyncio.Lock()
 
     async def build(self):
-        idx = self.namespace_index
         name = 'IO: Engine:'
         multiply = len(self.directions)
 
         for i in range(0, self.num_engines * multiply):
-            node = await self.base_node.add_variable(idx, name + f'{i} {self.name}', False, varianttype=ua.VariantType.Boolean)
-            await node.set_writable(True)
-
+            node = await self.add_io(name + f'{i} {self.name}', f'Engine{i}', actuator=True)
             self.engines.append(node)
-            self.nodes.append(node)
 
         # gera os sensores
         names = [f'IO:Sensor Start {self.name}', f'IO:Sensor End {self.name}']
+        signals = ['SensorStart', 'SensorEnd']
         for i in range(0, self.num_sensors):
-            node = await self.base_node.add_variable(self.namespace_index, names[i], False, varianttype=ua.VariantType.Boolean)
-            await node.set_writable(True)
+            node = await self.add_io(names[i], signals[i])
             self.sensors.append(node)
     
     async def run(self):
@@ -74,6 +72,7 @@ class Conveyor(BaseComponent):
         while True:
             await self.sem_input.acquire()
             order, _ = await self.queue_input.get()
+            self.current_box = order.box_type
             self.items += 1
 
             # retirada, roda ao contrario os motores das esteiras que giram para ambos sentidos
@@ -83,21 +82,19 @@ class Conveyor(BaseComponent):
             else:
                 # aqui é simples (simples o caralho), liga os motores, espera o a borda de descida do sensor de entrada
                 # para desligar a esteira           
-                asyncio.create_task(self.task_move_front(order, start_edge_detector, end_edge_detector))
+                asyncio.create_task(self.task_move_front(order, start_edge_detector, end_edge_detector), name=f'{self.name}:move_front')
 
     async def task_move_front(self, order: Order, start_edge_detector: EdgeDetector, end_edge_detector: EdgeDetector):
         async with self.lock_engines:
             await self._move(ConveyorDirection.FORWARD, True)
-            await start_edge_detector.event_trigger.wait()
-            start_edge_detector.event_trigger.clear()
+            await self.wait_edge(start_edge_detector)
 
             await self._move(ConveyorDirection.FORWARD, False)
 
         if self.items < self.max_items:
             async with self.lock_engines:
                 await self._move(ConveyorDirection.FORWARD, True)
-                await end_edge_detector.event_trigger.wait()
-                end_edge_detector.event_trigger.clear()
+                await self.wait_edge(end_edge_detector)
 
                 # chegou no final, desliga todos os motores
                 await self._move(ConveyorDirection.FORWARD, False)
@@ -107,8 +104,7 @@ class Conveyor(BaseComponent):
             self.items -= 1
             
             end_edge_detector.set_trigger(EdgeType.FALLING)
-            await end_edge_detector.event_trigger.wait()
-            end_edge_detector.event_trigger.clear()
+            await self.wait_edge(end_edge_detector, external=True)
 
             self.sem_input.release()
             end_edge_detector.set_trigger(EdgeType.RISING)
@@ -119,8 +115,7 @@ class Conveyor(BaseComponent):
             self.items -= 1
             
             end_edge_detector.set_trigger(EdgeType.FALLING)
-            await end_edge_detector.event_trigger.wait()
-            end_edge_detector.event_trigger.clear()
+            await self.wait_edge(end_edge_detector, external=True)
 
             self.sem_input.release()
             end_edge_detector.set_trigger(EdgeType.RISING)
@@ -132,22 +127,22 @@ class Conveyor(BaseComponent):
             if direction == ConveyorDirection.FORWARD:
                 for i, engine in enumerate(self.engines):
                     if i % 2 == 0:
-                        await engine.set_value(state)
+                        await self.write(engine, state)
             
             # os impares sao para tras
             elif direction == ConveyorDirection.BACKWARD:
                 for i, engine in enumerate(self.engines):
                     if i % 2 != 0:
-                        await engine.set_value(state)
+                        await self.write(engine, state)
 
             return
         
         for i, engine in enumerate(self.engines):
-            await engine.set_value(state)
+            await self.write(engine, state)
 
     async def move_to_next(self, value):
         async with self.lock_engines:
-            await self.engines[self.num_engines - 1].set_value(value)
+            await self.write(self.engines[self.num_engines - 1], value)
 
 
 class ConveyorAccess(Conveyor):
@@ -166,16 +161,17 @@ class ConveyorAccess(Conveyor):
 
         while True:
             order, move_next_fn = await self.queue_input.get()
+            self.current_box = order.box_type
             print(f'[Conveyor Access]: {order}')
-            await asyncio.sleep(1)
+            await self.dwell(1)
 
             # liga o motor 0, que é pra frente, espera chegar no sensor, é borda de descida
-            await self.engines[0].set_value(True)
+            await self.write(self.engines[0], True)
             await move_next_fn(True)
 
-            await end_edge_detector.wait()
+            await self.wait_edge(end_edge_detector)
             
-            await self.engines[0].set_value(False)
+            await self.write(self.engines[0], False)
             await move_next_fn(False)
 
             # chegou na borda, avisa o handler que chegou
@@ -185,8 +181,8 @@ class ConveyorAccess(Conveyor):
             # espera o handler puxar
             # await end_edge_detector.set_trigger(EdgeType.RISING)
             if self.wait_next_stage:
-                await end_edge_detector.wait()
+                await self.wait_edge(end_edge_detector, external=True)
 
             # await end_edge_detector.set_trigger(EdgeType.FALLING)
-            await asyncio.sleep(1)
+            await self.dwell(1, after=end_edge_detector)
             print(f'[Conveyor Access]: get next order')
@@ -1,13 +1,17 @@
+from typing import Callable, List, Optional
 from components.base import BaseComponent, EventSensorHandle, EdgeDetector, EdgeType
 from asyncua import ua
 from asyncua.ua import DataValue, Variant, VariantType
-from components.order import OrderFn
+from components.order import OrderFn, OrderState
 
 
 import asyncio
+import time
 
 
 class Handler(BaseComponent):
+    kind = 'Handler'
+
     def __init__(self, name, server, namespace_index, base_node,
                  queue_input_a: asyncio.Queue[OrderFn],
                  queue_input_b: asyncio.Queue[OrderFn],
@@ -25,13 +29,60 @@ class Handler(BaseComponent):
         self.sensors_rack = []
         self.positions = {}
         self.idle_position = 21474
+        self.idle_delay = 60
+        self.idle_period = 1
+
+        # leitura dos sensores de movimento e das condicoes de aborto (s), escalada por time_scale
+        self.poll_period = 0.05
+
+        # manager.parking.HandlerParking, None estaciona sempre na idle_position
+        self.parking = None
+        self.last_home = 8
+        self.at_position: Optional[int] = None
+        self.parked = False
+        self.last_activity = time.monotonic()
+
+        # conteudo de cada posicao do rack (posicao i + 1): (BoxType, CoverType) ou None
+        self.slots: List[Optional[tuple]] = [None] * self.num_sensors_rack
+
+        # manager.slotting.RackSlotting, None desliga o re-slotting ocioso
+        self.slotting = None
+        # a linha informa se ainda ha ordens em andamento (caixas a produzir ou em transito)
+        self.pending_jobs: Callable[[], bool] = lambda: False
+        self._jobs_waiting = 0
         self.lock_processor = asyncio.Lock()
         self._started_moving = asyncio.Event()
         self._stopped_moving = asyncio.Event()
         
         self._stopped_moving.set()
         self._is_moving = False
-        self._position = 1
+
+    @property
+    def rack_capacity(self) -> int:
+        return self.num_sensors_rack
+
+    @property
+    def stored(self) -> int:
+        """Caixas ja guardadas no rack (as posicoes livres sao preenchidas em ordem a partir de 1)."""
+        return sum(key is not None for key in self.slots)
+
+    def free_position(self) -> int:
+        # rack cheio: a admissao nao deixa chegar aqui, segue para depois da ultima posicao como antes
+        return next((i + 1 for i, key in enumerate(self.slots) if key is None), len(self.slots) + 1)
+
+    def box_waiting(self) -> bool:
+        """Ha caixa esperando o handler em uma das entradas."""
+        return bool(self._jobs_waiting or self.queue_input_a.qsize() or self.queue_input_b.qsize())
+
+    def job_pending(self) -> bool:
+        """Ha caixa chegando ou ordem em andamento, o handler nao esta mais ocioso."""
+        return self.box_waiting() or self.pending_jobs()
+
+    def park_position(self) -> int:
+        if self.parking is None:
+            return self.idle_position
+
+        return self.parking.position(self.idle_position, self.last_home)
 
     async def create_edge_detectors(self):
         ev_moving_x = asyncio.Event()
@@ -65,9 +116,10 @@ class Handler(BaseComponent):
         await self.create_edge_detectors()
         await self.start_event.wait()
 
-        asyncio.create_task(self.process_input_a())
-        asyncio.create_task(self.process_input_b())
-        asyncio.create_task(self.task_monitor_moving())
+        asyncio.create_task(self.process_input_a(), name=f'{self.name}:input_a')
+        asyncio.create_task(self.process_input_b(), name=f'{self.name}:input_b')
+        asyncio.create_task(self.task_monitor_moving(), name=f'{self.name}:monitor_moving')
+        asyncio.create_task(self.supervise_idle(), name=f'{self.name}:idle')
         
     async def process_input_a(self):
         print(f'[Handler]: awaiting orders in input a to storage')
@@ -75,44 +127,64 @@ class Handler(BaseComponent):
         while True:
 
             async with self.sem_input_a:
-                task_idle_monitor = asyncio.create_task(self.monitor_idle())
                 order, _ = await self.queue_input_a.get()
                 print(f'[Handler]: get new order from input a to storage: {order}')
+                self._box_arrived(8, order)
 
+                # aborta o re-slotting ou o estacionamento em andamento
+                self._jobs_waiting += 1
                 async with self.lock_processor:
+                    self._jobs_waiting -= 1
                     # move para posição inicial de A
-                    task_idle_monitor.cancel()
+                    self.current_box = order.box_type
+                    cycle_start = time.monotonic()
                     await self._move_home_a()
                     await self._raise_product()
-                    await self._move_product()
+                    await self._move_product((order.box_type, order.cover))
                     await self._release_product()
+                    order.set_state(OrderState.STORAGE)
+                    order.box_finished()
                     await self._move_home_a()
+                    self.end_cycle(cycle_start)
+                    self.last_activity = time.monotonic()
                     # aguarda para pegar o proximo item
                 
-                await asyncio.sleep(0.5)
+                await self.dwell(0.5)
     
     async def process_input_b(self):
         while True:
             async with self.sem_input_b:
-                task_idle_monitor = asyncio.create_task(self.monitor_idle())
                 order, _ = await self.queue_input_b.get()
                 print(f'[Handler]: get new order from input b to storage: {order}')
+                self._box_arrived(1, order)
                 
+                self._jobs_waiting += 1
                 async with self.lock_processor:
-                    task_idle_monitor.cancel()
+                    self._jobs_waiting -= 1
+                    self.current_box = order.box_type
+                    cycle_start = time.monotonic()
                     await self._move_home_b()
                     await self._raise_product()
-                    await self._move_product()
+                    await self._move_product((order.box_type, order.cover))
                     await self._release_product()
+                    order.set_state(OrderState.STORAGE)
+                    order.box_finished()
                     await self._move_home_b()
+                    self.end_cycle(cycle_start)
+                    self.last_activity = time.monotonic()
                     # aguarda para pegar o proximo item
                 
-                await asyncio.sleep(0.5)
+                await self.dwell(0.5)
+
+    async def _reread_moving(self):
+        if not await self.read(self.sensor_x) and not await self.read(self.sensor_z):
+            self._is_moving = False
+            self._stopped_moving.set()
 
     async def task_monitor_moving(self):
         while True:
-            mov_x = await self.sensor_x.get_value()
-            mov_z = await self.sensor_z.get_value()
+            mov_x = await self.read(self.sensor_x)
+            mov_z = await self.read(self.sensor_z)
 
             moving = mov_x or mov_z
             if moving and not self._is_moving:
@@ -129,58 +201,128 @@ class Handler(BaseComponent):
                 self._started_moving.clear()
                 self._stopped_moving.set()
 
-            await asyncio.sleep(0.05)
+            await asyncio.sleep(self.poll_period * self.time_scale)
+
+    def _box_arrived(self, home: int, order):
+        parked_at = self.at_position if self.parked else None
+        self.parked = False
+        self.last_home = home
 
-    async def monitor_idle(self):
+        if self.parking is not None:
+            self.parking.arrived(home, order, parked_at)
+
+    async def supervise_idle(self):
         """
-            Caso fique mais de 60 segundos ocioso, vai para posicção de idle
+            Task unica de ociosidade. Com o handler parado ha mais de idle_delay (60 s), reorganiza
+            o rack (se o re-slotting estiver ligado) e estaciona na posicao da politica de parking;
+            enquanto continua ocioso reavalia a cada idle_period, a previsao muda com as caixas
+            que entram na linha.
         """
-        await asyncio.sleep(60)
-        async with self.lock_processor:
-            await self._move_position(self.idle_position)
+        self.last_activity = time.monotonic()
+
+        while True:
+            await self.dwell(self.idle_period)
+            if time.monotonic() - self.last_activity < self.idle_delay * self.time_scale:
+                continue
+
+            if self.box_waiting() or self.lock_processor.locked():
+                continue
+
+            async with self.lock_processor:
+                # o re-slotting para com ordens em andamento, o estacionamento so com caixa esperando
+                if self.slotting is not None:
+                    await self.reslot()
+
+                await self.park()
+
+    async def park(self):
+        """Vai para a posicao de espera, abortado se chegar uma caixa no caminho."""
+        target = self.park_position()
+        if target == self.at_position:
+            self.parked = True
+            return
+
+        if self.box_waiting() or not await self._unless(self._move_position(target), self.box_waiting):
+            return
+
+        print(f'[Handler]: estacionado em P{target}')
+        self.parked = True
+        if self.parking is not None:
+            self.parking.parks += 1
+
+    async def _wait_until(self, condition: Callable[[], bool]):
+        while not condition():
+            await asyncio.sleep(self.poll_period * self.time_scale)
+
+    async def _unless(self, coro, condition: Callable[[], bool]) -> bool:
+        """Roda coro, cancelando se condition ficar verdadeira antes do fim. True se terminou."""
+        task = asyncio.ensure_future(coro)
+        job = asyncio.ensure_future(self._wait_until(condition))
+        await asyncio.wait((task, job), return_when=asyncio.FIRST_COMPLETED)
+
+        job.cancel()
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+
+            except asyncio.CancelledError:
+                pass
+
+            return False
+
+        task.result()
+        return True
+
+    async def reslot(self) -> bool:
+        """
+            Move as caixas do rack segundo o plano do slotting, uma por vez. Ate pegar a caixa
+            o movimento é abortado assim que chega um job; com a caixa no handler ela é deixada
+            no destino antes de liberar. Retorna False se foi abortado.
+        """
+        for _ in range(self.slotting.max_moves):
+            if self.job_pending():
+                return False
+
+            move = self.slotting.plan(self.slots)
+            if move is None:
+                break
+
+            source, target = move
+            if not await self._unless(self._move_position(source), self.job_pending):
+                self.slotting.aborted += 1
+                return False
+
+            print(f'[Handler]: re-slotting {self.slots[source - 1]} P{source} -> P{target}')
+            await self._pick_product()
+            key, self.slots[source - 1] = self.slots[source - 1], None
+            await self._move_position(target)
+            await self._release_product()
+            self.slots[target - 1] = key
+            self.slotting.moves += 1
+
+        return True
     
     async def build(self):
         # cria os sensores das prateleiras
         name = 'IO: Sensor X'
-        idx = self.namespace_index
 
         for i in range(self.num_sensors_rack):
-            node = await self.base_node.add_variable(idx, name + f'{i + 1} {self.name}', False, ua.VariantType.Boolean)
-            await node.set_writable(True)
+            node = await self.add_io(name + f'{i + 1} {self.name}', f'SensorRack{i + 1}')
             self.sensors_rack.append(node)
 
         # sensores de movimento
-        self.sensor_x = await self.base_node.add_variable(idx, f'IO:Sensor X {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.sensor_x.set_writable(True)
-
-        self.sensor_z = await self.base_node.add_variable(idx, f'IO:Sensor Z {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.sensor_z.set_writable(True)
-
-        self.sensor_center = await self.base_node.add_variable(idx, f'IO:Sensor Meio {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.sensor_center.set_writable(True)
-
-        self.sensor_left = await self.base_node.add_variable(idx, f'IO:Sensor Left {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.sensor_left.set_writable(True)
-
-        self.sensor_right = await self.base_node.add_variable(idx, f'IO:Sensor Right {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.sensor_right.set_writable(True)
+        self.sensor_x = await self.add_io(f'IO:Sensor X {self.name}', 'SensorX')
+        self.sensor_z = await self.add_io(f'IO:Sensor Z {self.name}', 'SensorZ')
+        self.sensor_center = await self.add_io(f'IO:Sensor Meio {self.name}', 'SensorCenter')
+        self.sensor_left = await self.add_io(f'IO:Sensor Left {self.name}', 'SensorLeft')
+        self.sensor_right = await self.add_io(f'IO:Sensor Right {self.name}', 'SensorRight')
 
         # movimento
-        self.handler_raise = await self.base_node.add_variable(idx, f'IO:Move Raise {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.handler_raise.set_writable(True)
-        self.nodes.append(self.handler_raise)
-
-        self.handler_move_leff = await self.base_node.add_variable(idx, f'IO:Move Left {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.handler_move_leff.set_writable(True)
-        self.nodes.append(self.handler_move_leff)
-
-        self.handler_move_right = await self.base_node.add_variable(idx, f'IO:Move Right {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.handler_move_right.set_writable(True)
-        self.nodes.append(self.handler_move_right)
-
-        self.position = await self.base_node.add_variable(idx, f'IO:Position {self.name}', 21474, varianttype=ua.VariantType.Int16)
-        await self.position.set_writable(True)
-        self.nodes.append(self.position)
+        self.handler_raise = await self.add_io(f'IO:Move Raise {self.name}', 'MoveRaise', actuator=True)
+        self.handler_move_leff = await self.add_io(f'IO:Move Left {self.name}', 'MoveLeft', actuator=True)
+        self.handler_move_right = await self.add_io(f'IO:Move Right {self.name}', 'MoveRight', actuator=True)
+        self.position = await self.add_io(f'IO:Position {self.name}', 'Position', 21474, ua.VariantType.Int16, actuator=True)
 
     async def _move_home_a(self):
         await self._move_position(8)
@@ -194,9 +336,17 @@ class Handler(BaseComponent):
         await self._move_raise()
         await self._move_handler_center()
 
-    async def _move_product(self):
-        await self._move_position(self._position)
-        self._position += 1
+    async def _pick_product(self):
+        # pega uma caixa do rack, do lado oposto da entrada
+        await self._move_handler_right()
+        await self._move_raise()
+        await self._move_handler_center()
+
+    async def _move_product(self, key: tuple):
+        position = self.free_position()
+        await self._move_position(position)
+        if position <= len(self.slots):
+            self.slots[position - 1] = key
 
     async def _release_product(self):
         # chegou na posição, baixa o elevador, retrai o handler e volta para a posicao
@@ -205,50 +355,67 @@ class Handler(BaseComponent):
         await self._move_handler_center()
 
     async def _move_position(self, position: int):
+        # ja parado na posicao (ex: estacionado na home da entrada), nao ha movimento para esperar
+        if position == self.at_position and not self._is_moving:
+            return
+
+        # um movimento abortado (re-slotting, estacionamento) pode ainda estar andando: o novo
+        # destino so muda o alvo, nao vai haver transicao parado -> movendo para esperar
+        moving = self._is_moving
         self._started_moving.clear()
-        self._stopped_moving.clear()
+        if not moving:
+            self._stopped_moving.clear()
 
-        await self.position.set_data_value(value=position, varianttype=VariantType.Int16)
+        # a posicao so vale depois de parar, um movimento cancelado no meio deixa None
+        self.at_position = None
+        await self.write(self.position, position, VariantType.Int16)
 
         try:
-            await asyncio.wait_for(self._started_moving.wait(), timeout=3.0)
-            print("[Handler]: Movimento detectado! Aguardando parada...")
-            
-            await self._stopped_moving.wait()
-            print(f"[Handler]: Movimento concluído. Elevador chegou na Posição {position}.")
+            with self.waiting(f'position {position}') as active_wait:
+                if not moving:
+                    await self.wait_running(self._started_moving, 3.0 * self.time_scale)
+                    print("[Handler]: Movimento detectado! Aguardando parada...")
+                
+                if self.watchdog is None:
+                    await self._stopped_moving.wait()
+
+                else:
+                    active_wait.recovered = await self.watchdog.guard(self, active_wait, self._stopped_moving, self._reread_moving)
+                print(f"[Handler]: Movimento concluído. Elevador chegou na Posição {position}.")
 
         except asyncio.exceptions.TimeoutError:
             print(f"[Handler]: Movimento não detectado para P{position}. Assumindo que já estava no local.")
             self._stopped_moving.set()
 
-        finally:
-            await asyncio.sleep(2)
+        # fora de um finally, assim o cancelamento de um movimento abortado nao espera o dwell
+        self.at_position = position
+        await self.dwell(2, after=f'position {position}')
     
     async def _move_handler_left(self):
         # movimenta para a esquerda e espera chegar no sensor
-        await self.handler_move_leff.set_value(True)
-        await self.edge_handler_left.wait()
-        await asyncio.sleep(2)
+        await self.write(self.handler_move_leff, True)
+        await self.wait_edge(self.edge_handler_left)
+        await self.dwell(2, after=self.edge_handler_left)
 
     async def _move_handler_center(self):
         # movimenta o handler para o centro
-        await self.handler_move_leff.set_value(False)
-        await self.handler_move_right.set_value(False)
-        await self.edge_handler_center.wait()
-        await asyncio.sleep(2)
+        await self.write(self.handler_move_leff, False)
+        await self.write(self.handler_move_right, False)
+        await self.wait_edge(self.edge_handler_center)
+        await self.dwell(2, after=self.edge_handler_center)
 
     async def _move_handler_right(self):
         # movimenta para a direita e espera chegar no sensor
-        await self.handler_move_right.set_value(True)
-        await self.edge_handler_right.wait()
-        await asyncio.sleep(2)
+        await self.write(self.handler_move_right, True)
+        await self.wait_edge(self.edge_handler_right)
+        await self.dwell(2, after=self.edge_handler_right)
 
     async def _move_raise(self):
-        await self.handler_raise.set_value(True)
-        await self.edge_moving_z.wait()
-        await asyncio.sleep(2)
+        await self.write(self.handler_raise, True)
+        await self.wait_edge(self.edge_moving_z)
+        await self.dwell(2, after=self.edge_moving_z)
 
     async def _move_down(self):
-        await self.handler_raise.set_value(False)
-        await self.edge_moving_z.wait()
-        await asyncio.sleep(2)
+        await self.write(self.handler_raise, False)
+        await self.wait_edge(self.edge_moving_z)
+        await self.dwell(2, after=self.edge_moving_z)
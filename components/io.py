@@ -0,0 +1,90 @@
+from typing import Any, Dict
+from asyncua import Node, Server, ua
+from datetime import datetime, timezone
+from enum import Enum, auto
+
+
+class IOBackendKind(Enum):
+    OPCUA = auto()      # Factory I/O como cliente OPC UA das variaveis de IO
+    MODBUS = auto()     # Factory I/O como servidor Modbus TCP, o servidor le e escreve coils/inputs
+
+
+class NodeIO:
+    """
+        Leitura e escrita de uma variavel de IO pela API do Node (servico de atributos completo).
+        Usado quando o servidor nao expoe o address space interno (cliente, servidor fake).
+    """
+    __slots__ = ('node', 'nodeid', 'varianttype')
+
+    def __init__(self, node: Node, varianttype: ua.VariantType):
+        self.node = node
+        self.nodeid = node.nodeid
+        self.varianttype = varianttype
+
+    async def write(self, value: Any):
+        await self.node.set_data_value(value=value, varianttype=self.varianttype)
+
+    async def read(self) -> Any:
+        return await self.node.read_value()
+
+
+class DirectIO(NodeIO):
+    """
+        Leitura e escrita direto no address space do servidor, no mesmo processo da logica de
+        controle. Os Variants dos booleanos sao montados uma vez no bind e a escrita vai direto
+        para write_attribute_value, sem WriteParameters, sessao e checagem de acesso; as
+        notificacoes das subscriptions continuam saindo normalmente.
+    """
+    __slots__ = ('aspace', 'variants')
+
+    def __init__(self, node: Node, varianttype: ua.VariantType, aspace):
+        super().__init__(node, varianttype)
+        self.aspace = aspace
+
+        self.variants: Dict[Any, ua.Variant] = {}
+        if varianttype == ua.VariantType.Boolean:
+            self.variants = {value: ua.Variant(value, varianttype) for value in (False, True)}
+
+    async def write(self, value: Any):
+        variant = self.variants.get(value)
+        if variant is None:
+            variant = ua.Variant(value, self.varianttype)
+
+        # mesmo ServerTimestamp que o servico de escrita colocaria
+        datavalue = ua.DataValue(variant, ServerTimestamp=datetime.now(timezone.utc))
+        status = await self.aspace.write_attribute_value(self.nodeid, ua.AttributeIds.Value, datavalue)
+        status.check()
+
+    async def read(self) -> Any:
+        return self.aspace.read_attribute_value(self.nodeid, ua.AttributeIds.Value).Value.Value
+
+
+def bind_io(server: Server, node: Node, varianttype: ua.VariantType, direct: bool = True) -> NodeIO:
+    """IO do node, pelo address space interno quando o servidor é deste processo."""
+    iserver = getattr(server, 'iserver', None)
+    if direct and iserver is not None:
+        return DirectIO(node, varianttype, iserver.aspace)
+
+    return NodeIO(node, varianttype)
+
+
+class IOBackend:
+    """
+        Liga as variaveis de IO dos componentes a planta. As variaveis OPC UA sempre existem
+        (snapshot, diagnosticos e clientes continuam vendo o IO), o backend decide de onde vem
+        o valor dos sensores e para onde vao as escritas dos atuadores.
+    """
+    def bind(self, server: Server, node: Node, varianttype: ua.VariantType, actuator: bool) -> NodeIO:
+        raise NotImplementedError
+
+    async def run(self):
+        """Task do backend (varredura, reconexao), sem nada a fazer por padrao."""
+
+
+class OpcUaBackend(IOBackend):
+    """O Factory I/O conecta como cliente OPC UA e le/escreve as proprias variaveis do servidor."""
+    def __init__(self, direct: bool = True):
+        self.direct = direct
+
+    def bind(self, server: Server, node: Node, varianttype: ua.VariantType, actuator: bool) -> NodeIO:
+        return bind_io(server, node, varianttype, self.direct)
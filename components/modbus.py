@@ -0,0 +1,352 @@
+from typing import Dict, Iterable, List, Optional, Union
+from pathlib import Path
+from asyncua import Node, Server, ua
+from components.io import IOBackend, NodeIO, bind_io
+from manager.metrics import Histogram
+
+import asyncio
+import json
+import struct
+import time
+
+
+READ_COILS = 0x01
+READ_DISCRETE_INPUTS = 0x02
+READ_HOLDING_REGISTERS = 0x03
+READ_INPUT_REGISTERS = 0x04
+WRITE_SINGLE_COIL = 0x05
+WRITE_SINGLE_REGISTER = 0x06
+WRITE_MULTIPLE_COILS = 0x0F
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+# limites por requisicao da especificacao Modbus
+MAX_READ_BITS = 2000
+MAX_WRITE_BITS = 1968
+MAX_READ_REGISTERS = 125
+MAX_WRITE_REGISTERS = 123
+
+MBAP = struct.Struct('>HHHB')
+
+
+class ModbusError(Exception):
+    """Resposta de excecao do servidor (funcao | 0x80, codigo de excecao)."""
+    def __init__(self, function: int, code: int):
+        super().__init__(f'modbus exception: function 0x{function:02x} code {code}')
+        self.function = function
+        self.code = code
+
+
+def pack_bits(values: List[bool]) -> bytes:
+    data = bytearray((len(values) + 7) // 8)
+    for i, value in enumerate(values):
+        if value:
+            data[i // 8] |= 1 << (i % 8)
+
+    return bytes(data)
+
+
+def unpack_bits(data: bytes, count: int) -> List[bool]:
+    return [bool(data[i // 8] >> (i % 8) & 1) for i in range(count)]
+
+
+def contiguous_runs(addresses: Iterable[int]) -> List[List[int]]:
+    """Enderecos agrupados em sequencias consecutivas, em ordem: [0, 1, 5] -> [[0, 1], [5]]."""
+    runs: List[List[int]] = []
+    for address in sorted(addresses):
+        if runs and address == runs[-1][-1] + 1:
+            runs[-1].append(address)
+        else:
+            runs.append([address])
+
+    return runs
+
+
+class ModbusClient:
+    """
+        Cliente Modbus TCP minimo (funcoes 1-6, 15 e 16) sobre asyncio streams, uma requisicao
+        por vez. Qualquer falha de conexao ou timeout fecha o socket e vira ConnectionError,
+        quem usa decide quando reconectar.
+    """
+    def __init__(self, host: str, port: int = 502, unit: int = 1, timeout: float = 1.0):
+        self.host = host
+        self.port = port
+        self.unit = unit
+        self.timeout = timeout
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+        self._transaction = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+
+    async def close(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+
+            except OSError:
+                pass
+
+    async def request(self, function: int, payload: bytes) -> bytes:
+        """Envia uma PDU e devolve os dados da resposta (sem o codigo da funcao)."""
+        async with self._lock:
+            # o close pode vir de fora no meio da requisicao, usa o socket do inicio dela
+            reader, writer = self._reader, self._writer
+            if writer is None:
+                raise ConnectionError(f'modbus {self.host}:{self.port} not connected')
+
+            self._transaction = (self._transaction + 1) & 0xFFFF
+            header = MBAP.pack(self._transaction, 0, len(payload) + 2, self.unit)
+
+            try:
+                writer.write(header + bytes([function]) + payload)
+                await writer.drain()
+
+                transaction, _, length, _ = MBAP.unpack(await asyncio.wait_for(reader.readexactly(MBAP.size), self.timeout))
+                pdu = await asyncio.wait_for(reader.readexactly(length - 1), self.timeout)
+
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as error:
+                await self.close()
+                raise ConnectionError(f'modbus {self.host}:{self.port}: {error!r}') from error
+
+            if transaction != self._transaction:
+                await self.close()
+                raise ConnectionError(f'modbus {self.host}:{self.port}: transaction mismatch')
+
+        if pdu[0] == function | 0x80:
+            raise ModbusError(function, pdu[1])
+
+        return pdu[1:]
+
+    async def _read_bits(self, function: int, address: int, count: int) -> List[bool]:
+        values: List[bool] = []
+        for start in range(address, address + count, MAX_READ_BITS):
+            size = min(MAX_READ_BITS, address + count - start)
+            data = await self.request(function, struct.pack('>HH', start, size))
+            values.extend(unpack_bits(data[1:], size))
+
+        return values
+
+    async def _read_registers(self, function: int, address: int, count: int) -> List[int]:
+        values: List[int] = []
+        for start in range(address, address + count, MAX_READ_REGISTERS):
+            size = min(MAX_READ_REGISTERS, address + count - start)
+            data = await self.request(function, struct.pack('>HH', start, size))
+            values.extend(struct.unpack(f'>{size}H', data[1:]))
+
+        return values
+
+    async def read_coils(self, address: int, count: int) -> List[bool]:
+        return await self._read_bits(READ_COILS, address, count)
+
+    async def read_discrete_inputs(self, address: int, count: int) -> List[bool]:
+        return await self._read_bits(READ_DISCRETE_INPUTS, address, count)
+
+    async def read_holding_registers(self, address: int, count: int) -> List[int]:
+        return await self._read_registers(READ_HOLDING_REGISTERS, address, count)
+
+    async def read_input_registers(self, address: int, count: int) -> List[int]:
+        return await self._read_registers(READ_INPUT_REGISTERS, address, count)
+
+    async def write_coil(self, address: int, value: bool):
+        await self.request(WRITE_SINGLE_COIL, struct.pack('>HH', address, 0xFF00 if value else 0x0000))
+
+    async def write_register(self, address: int, value: int):
+        await self.request(WRITE_SINGLE_REGISTER, struct.pack('>HH', address, value & 0xFFFF))
+
+    async def write_coils(self, address: int, values: List[bool]):
+        for offset in range(0, len(values), MAX_WRITE_BITS):
+            chunk = values[offset:offset + MAX_WRITE_BITS]
+            data = pack_bits(chunk)
+            await self.request(WRITE_MULTIPLE_COILS, struct.pack('>HHB', address + offset, len(chunk), len(data)) + data)
+
+    async def write_registers(self, address: int, values: List[int]):
+        for offset in range(0, len(values), MAX_WRITE_REGISTERS):
+            chunk = [value & 0xFFFF for value in values[offset:offset + MAX_WRITE_REGISTERS]]
+            payload = struct.pack(f'>HHB{len(chunk)}H', address + offset, len(chunk), len(chunk) * 2, *chunk)
+            await self.request(WRITE_MULTIPLE_REGISTERS, payload)
+
+
+class ModbusAddressMap:
+    """
+        Endereco Modbus de cada sinal (kind.name.signal) por tabela: 'coil' (BitOutput),
+        'input' (BitInput) e 'holding' (registros de saida). Sinais novos recebem o proximo
+        endereco livre da tabela; o mapa é salvo em JSON para configurar as tags do Factory I/O
+        e manter os enderecos entre execucoes.
+    """
+    TABLES = ('coil', 'input', 'holding')
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path is not None else None
+        self.tables: Dict[str, Dict[str, int]] = {table: {} for table in self.TABLES}
+
+    def address(self, table: str, key: str) -> int:
+        addresses = self.tables[table]
+        if key not in addresses:
+            addresses[key] = max(addresses.values(), default=-1) + 1
+
+        return addresses[key]
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        data = json.loads(self.path.read_text())
+        for table in self.TABLES:
+            self.tables[table].update(data.get(table, {}))
+
+    def save(self):
+        if self.path is None:
+            return
+
+        self.path.write_text(json.dumps(self.tables, indent=2, sort_keys=True))
+
+
+class ModbusCoilIO(NodeIO):
+    """Atuador booleano: escreve a coil e espelha o valor na variavel OPC UA."""
+    __slots__ = ('local', 'backend', 'address')
+
+    def __init__(self, local: NodeIO, backend: 'ModbusBackend', address: int):
+        super().__init__(local.node, local.varianttype)
+        self.local = local
+        self.backend = backend
+        self.address = address
+
+    async def write(self, value):
+        await self.local.write(value)
+        await self.backend.write_output(self.backend.client.write_coil, self.address, bool(value))
+
+    async def read(self):
+        return await self.local.read()
+
+
+class ModbusRegisterIO(ModbusCoilIO):
+    """Atuador numerico (posicao do handler): escreve o holding register."""
+    __slots__ = ()
+
+    async def write(self, value):
+        await self.local.write(value)
+        await self.backend.write_output(self.backend.client.write_register, self.address, int(value))
+
+
+class ModbusBackend(IOBackend):
+    """
+        Factory I/O como servidor Modbus TCP: atuadores booleanos em coils, sensores em
+        discrete inputs e a posicao do handler em holding register. As variaveis OPC UA
+        continuam existindo como espelho, entao ordens, snapshot, diagnosticos e os detectores
+        de borda (subscriptions internas) nao mudam.
+
+        A cada varredura todos os discrete inputs sao lidos em uma unica requisicao (ou uma por
+        2000 entradas) e so os que mudaram sao escritos nas variaveis OPC UA. Escritas feitas
+        sem conexao ficam no espelho e sao reenviadas na reconexao, uma escrita multipla por
+        sequencia de enderecos mapeados; enderecos fora do mapa nao sao tocados.
+    """
+    def __init__(self, client: ModbusClient, address_map: ModbusAddressMap, scan_period: float = 0.01, reconnect_delay: float = 1.0):
+        self.client = client
+        self.address_map = address_map
+        self.scan_period = scan_period
+        self.reconnect_delay = reconnect_delay
+
+        self.inputs: Dict[int, NodeIO] = {}
+        self.coils: Dict[int, NodeIO] = {}
+        self.registers: Dict[int, NodeIO] = {}
+        self.values: Optional[List[bool]] = None
+
+        self.scan_histogram = Histogram()
+        self.scans = 0
+        self.connects = 0
+        self.errors = 0
+
+    def bind(self, server: Server, node: Node, varianttype: ua.VariantType, actuator: bool) -> NodeIO:
+        local = bind_io(server, node, varianttype)
+        key = str(node.nodeid.Identifier)
+
+        if actuator and varianttype == ua.VariantType.Boolean:
+            address = self.address_map.address('coil', key)
+            self.coils[address] = local
+            return ModbusCoilIO(local, self, address)
+
+        if actuator:
+            address = self.address_map.address('holding', key)
+            self.registers[address] = local
+            return ModbusRegisterIO(local, self, address)
+
+        if varianttype == ua.VariantType.Boolean:
+            self.inputs[self.address_map.address('input', key)] = local
+
+        return local
+
+    async def write_output(self, write, address: int, value):
+        """Escrita de uma saida; sem conexao o valor fica no espelho ate a reconexao."""
+        if not self.client.connected:
+            return
+
+        try:
+            await write(address, value)
+
+        except (ConnectionError, ModbusError):
+            self.errors += 1
+
+    async def push_outputs(self):
+        """Reenvia as saidas mapeadas a partir do espelho OPC UA, em lote por sequencia de enderecos."""
+        for run in contiguous_runs(self.coils):
+            await self.client.write_coils(run[0], [bool(await self.coils[address].read()) for address in run])
+
+        for run in contiguous_runs(self.registers):
+            await self.client.write_registers(run[0], [int(await self.registers[address].read()) for address in run])
+
+    async def scan(self):
+        if not self.inputs:
+            return
+
+        values = await self.client.read_discrete_inputs(0, max(self.inputs) + 1)
+        if values == self.values:
+            return
+
+        previous, self.values = self.values, values
+        for address, local in self.inputs.items():
+            if previous is None or previous[address] != values[address]:
+                await local.write(values[address])
+
+    async def run(self):
+        while True:
+            if not self.client.connected:
+                try:
+                    await self.client.connect()
+                    await self.push_outputs()
+
+                except (OSError, asyncio.TimeoutError, ModbusError):
+                    self.errors += 1
+                    await self.client.close()
+                    await asyncio.sleep(self.reconnect_delay)
+                    continue
+
+                # depois de reconectar todos os sensores sao reescritos
+                self.connects += 1
+                self.values = None
+
+            started = time.monotonic()
+            try:
+                await self.scan()
+
+            except ConnectionError:
+                self.errors += 1
+                continue
+
+            except ModbusError:
+                # endereco fora da tabela do servidor, tenta de novo no proximo periodo
+                self.errors += 1
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            self.scan_histogram.observe(time.monotonic() - started)
+            self.scans += 1
+            await asyncio.sleep(self.scan_period)
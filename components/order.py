@@ -1,7 +1,10 @@
-from typing import Tuple, Callable, TypeAlias
+from typing import Deque, Optional, Tuple, Callable, TypeAlias
+from collections import deque
 from components.base import BoxType
 from enum import Enum, auto
 
+import time
+
 
 class CoverType(Enum):
 	WITH_COVER = auto()
@@ -14,17 +17,111 @@ class OrderState(Enum):
 	STORAGE = auto()
 	WITHDRAWAL = auto()
 	DELIVERY = auto()
+	COMPLETED = auto()
+	REJECTED = auto()
+
+
+class BoxRecord:
+	"""Rastreio de uma caixa da ordem, os enums sao guardados como inteiros pequenos."""
+	__slots__ = ('order_id', 'seq', '_box_type', 'delivery', 'started_at', 'finished_at')
+
+	def __init__(self, order_id: int, seq: int, box_type: BoxType, delivery: bool):
+		self.order_id = order_id
+		self.seq = seq
+		self._box_type = box_type.value
+		self.delivery = delivery
+		self.started_at = time.time()
+		self.finished_at = 0.0
+
+	@property
+	def box_type(self) -> BoxType:
+		return BoxType(self._box_type)
+
+	def __repr__(self):
+		return f"BoxRecord(order={self.order_id}, seq={self.seq}, box_type={self.box_type.name}, done={self.finished_at > 0})"
 
 
 class Order:
-	def __init__(self, order_id: int, box_type: BoxType, quantity: int, cover: CoverType, delivery: bool):
+	# sem __dict__: servidores de longa duracao acumulam muitas ordens
+	__slots__ = (
+		'order_id', '_box_type', 'quantity', '_cover', 'delivery', '_state', 'num_storage',
+		'boxes_started', 'boxes_done', 'created_at', 'updated_at', 'in_flight', 'listener', 'priority', 'due'
+	)
+
+	def __init__(self, order_id: int, box_type: BoxType, quantity: int, cover: CoverType, delivery: bool,
+			priority: int = 0, due: Optional[float] = None):
 		self.order_id = order_id
-		self.box_type = box_type
+		self._box_type = box_type.value
 		self.quantity = quantity
-		self.cover = cover
+		self._cover = cover.value
 		self.delivery = delivery
-		self.state = OrderState.WAIT
+		self._state = OrderState.WAIT.value
 		self.num_storage = None
+		self.boxes_started = 0
+		self.boxes_done = 0
+		self.created_at = time.time()
+		self.updated_at = self.created_at
+
+		# ordem das caixas nos feeders: prioridade maior primeiro, depois o prazo (epoch)
+		self.priority = priority
+		self.due = due if due is not None else self.created_at
+
+		# caixas em transito, na ordem em que sairam do feeder (a linha é FIFO)
+		self.in_flight: Optional[Deque[BoxRecord]] = None
+
+		# recebe as transicoes de estado e as caixas concluidas (manager.order_table.OrderTable)
+		self.listener = None
+
+	@property
+	def box_type(self) -> BoxType:
+		return BoxType(self._box_type)
+
+	@property
+	def cover(self) -> CoverType:
+		return CoverType(self._cover)
+
+	@property
+	def state(self) -> OrderState:
+		return OrderState(self._state)
+
+	def set_state(self, state: 'OrderState'):
+		if state.value == self._state:
+			return
+
+		previous = self.state
+		self._state = state.value
+		self.updated_at = time.time()
+
+		if self.listener is not None:
+			self.listener.on_state(self, previous)
+
+	def start_box(self) -> BoxRecord:
+		"""Uma caixa da ordem saiu do feeder."""
+		record = BoxRecord(self.order_id, self.boxes_started, self.box_type, self.delivery)
+		self.boxes_started += 1
+
+		if self.in_flight is None:
+			self.in_flight = deque()
+
+		self.in_flight.append(record)
+		return record
+
+	def box_finished(self):
+		"""Uma caixa da ordem chegou ao destino final (rack ou saida)."""
+		record = self.in_flight.popleft() if self.in_flight else BoxRecord(self.order_id, self.boxes_done, self.box_type, self.delivery)
+		record.finished_at = time.time()
+
+		self.boxes_done += 1
+		self.updated_at = record.finished_at
+
+		if not self.in_flight:
+			self.in_flight = None
+
+		if self.listener is not None:
+			self.listener.on_box(self, record)
+
+		if self.boxes_done >= self.quantity:
+			self.set_state(OrderState.COMPLETED)
 
 	def __repr__(self):
 		return f"Order(id={self.order_id}, product_type='{self.box_type}', quantity={self.quantity}, state='{self.state}', delivery='{self.delivery}')"
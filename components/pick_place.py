@@ -1,47 +1,146 @@
-from components.base import BaseComponent
-from asyncua import ua
+from typing import Optional
+from asyncua import Node
+from components.base import BaseComponent, EdgeDetector, EdgeType, EventSensorHandle
+from components.arm import ArmComponent
+from components.order import OrderFn, CoverType
+
+import asyncio
+import time
 
 
 class PickPlace(BaseComponent):
-    def __init__(self, name, server, namespace_index, base_node):
+    """
+        Estacao de tampas no fim da esteira de expedicao. A caixa parada no sensor de fim da
+        esteira anterior recebe a tampa e segue para o proximo estagio com o mesmo callback
+        de movimento, caixas sem tampa passam direto.
+
+        A pega da proxima tampa roda em paralelo com o transporte: assim que uma tampa é
+        colocada o PickPlace pede outra ao braco, pega e espera sobre o ponto de colocacao,
+        entao a caixa que chega so espera descer e soltar. O cycle_histogram mede apenas as
+        caixas que receberam tampa.
+
+        A esteira anterior pode entregar a caixa na fila antes dela chegar no fim (esteira
+        cheia), entao com box_sensor (o sensor de fim dessa esteira) a tampa so desce com a
+        caixa no sensor.
+    """
+    kind = 'PickPlace'
+
+    def __init__(self, name, server, namespace_index, base_node,
+                 queue_input: asyncio.Queue[OrderFn],
+                 queue_output: asyncio.Queue[OrderFn],
+                 arm: ArmComponent,
+                 box_sensor: Optional[Node] = None
+        ):
+
         super().__init__(name, server, namespace_index, base_node)
-    
-    async def run(self):
-        return await super().run()
-    
+
+        self.queue_input = queue_input
+        self.queue_output = queue_output
+        self.arm = arm
+        self.box_sensor = box_sensor
+
+        self.need_cover = asyncio.Event()
+        self.cover_ready = asyncio.Event()
+        self.covers_placed = 0
+
     async def build(self):
         # gera os atuadores
-        idx = self.namespace_index
-        
-        self.move_z = self.base_node.add_variable(idx, f'IO: MoveZ {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.move_z.set_writable(True)
-        self.nodes.append(self.move_z)
+        self.move_z = await self.add_io(f'IO: MoveZ {self.name}', 'MoveZ', actuator=True)
+        self.move_x = await self.add_io(f'IO: MoveX {self.name}', 'MoveX', actuator=True)
+        self.grab = await self.add_io(f'IO: Grab {self.name}', 'Grab', actuator=True)
+
+        # gera os sensores
+        self.moving_z = await self.add_io(f'IO: MovingZ {self.name}', 'MovingZ')
+        self.moving_x = await self.add_io(f'IO: MovingX {self.name}', 'MovingX')
+        self.item_detected = await self.add_io(f'IO: ItemDetected {self.name}', 'ItemDetected')
 
-        self.move_x = self.base_node.add_variable(idx, f'IO: MoveX {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.move_x.set_writable(True)
-        self.nodes.append(self.move_x)
+    async def create_detectors(self):
+        # os sensores Moving* ficam em 1 durante o movimento, a borda de descida confirma a chegada
+        self.z_detector = EdgeDetector(self.moving_z.nodeid, asyncio.Event(), EdgeType.FALLING)
+        self.x_detector = EdgeDetector(self.moving_x.nodeid, asyncio.Event(), EdgeType.FALLING)
+        self.item_detector = EdgeDetector(self.item_detected.nodeid, asyncio.Event(), EdgeType.RISING)
 
-        self.move_x_clock = self.base_node.add_variable(idx, f'IO: MoveX Clock {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.move_x_clock.set_writable(True) 
-        self.nodes.append(self.move_x_clock)
+        detectors = [self.z_detector, self.x_detector, self.item_detector]
+        sensors = [self.moving_z, self.moving_x, self.item_detected]
+        if self.box_sensor is not None:
+            self.box_detector = EdgeDetector(self.box_sensor.nodeid, asyncio.Event(), EdgeType.RISING)
+            detectors.append(self.box_detector)
+            sensors.append(self.box_sensor)
 
-        self.move_x_anticlock = self.base_node.add_variable(idx, f'IO: MoveX AntiClock {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.move_x_anticlock.set_writable(True)
-        self.nodes.append(self.move_x_anticlock)
+        handler = EventSensorHandle(self.server, detectors)
+        sub = await self.server.create_subscription(10, handler)
+        await sub.subscribe_data_change(sensors)
 
-        self.move_c_clock = self.base_node.add_variable(idx, f'IO: MoveC Clock {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.move_c_clock.set_writable(True)
-        self.nodes.append(self.move_c_clock)
+    async def _move_z(self, down: bool):
+        await self.write(self.move_z, down)
+        await self.wait_edge(self.z_detector)
 
-        self.move_c_anticlock = self.base_node.add_variable(idx, f'IO: MoveC AntiClock {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.move_c_anticlock.set_writable(True)
-        self.nodes.append(self.move_c_anticlock)
+    async def _move_x(self, to_pick: bool):
+        await self.write(self.move_x, to_pick)
+        await self.wait_edge(self.x_detector)
 
-        # gera os sensores
-        self.moving_z = self.base_node.add_variable(idx, f'IO: MovingZ {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.moving_z.set_writable(True)
+    async def pick_cover(self):
+        # pede a tampa ao braco enquanto vai para o ponto de pega
+        self.arm.requested.set()
+        await self._move_x(True)
+        await self.arm.fed.wait()
+        self.arm.fed.clear()
+
+        await self._move_z(True)
+        await self.write(self.grab, True)
+        await self.wait_edge(self.item_detector)
+        await self._move_z(False)
+
+        # espera com a tampa sobre o ponto de colocacao
+        await self._move_x(False)
+
+    async def wait_box(self):
+        """Espera a caixa chegar no sensor de fim da esteira anterior, se ainda nao chegou."""
+        if self.box_sensor is None:
+            return
+
+        # limpa antes de ler, uma borda entre a leitura e a espera fica no evento
+        self.box_detector.clear()
+        if not await self.read(self.box_sensor):
+            await self.wait_edge(self.box_detector, external=True)
+
+    async def place_cover(self):
+        await self._move_z(True)
+        await self.write(self.grab, False)
+        await self.dwell(0.3, after=self.z_detector)
+        await self._move_z(False)
+
+    async def task_prepick(self):
+        while True:
+            await self.need_cover.wait()
+            self.need_cover.clear()
+
+            await self.pick_cover()
+            self.cover_ready.set()
+
+    async def run(self):
+        await self.create_detectors()
+        await self.start_event.wait()
+
+        self.need_cover.set()
+        asyncio.create_task(self.task_prepick(), name=f'{self.name}:prepick')
+
+        while True:
+            order, move_prev_stage = await self.queue_input.get()
+            self.current_box = order.box_type
+
+            if order.cover == CoverType.WITH_COVER:
+                cycle_start = time.monotonic()
+                print(f'[PickPlace]: placing cover on order: {order}')
+
+                await self.cover_ready.wait()
+                self.cover_ready.clear()
+                await self.wait_box()
+                await self.place_cover()
 
-        self.moving_x = self.base_node.add_variable(idx, f'IO: MovingX {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.moving_x.set_writable(True)
+                self.covers_placed += 1
+                self.need_cover.set()
+                self.end_cycle(cycle_start)
 
-        
\ No newline at end of file
+            # a caixa continua parada na esteira anterior, o proximo estagio puxa com o mesmo callback
+            await self.queue_output.put((order, move_prev_stage))
@@ -6,6 +6,7 @@ from components.order import Order, OrderFn, MoveCallbackFn, CoverType
 from enum import Enum, auto
 
 import asyncio
+import time
 
 
 class Capabilities(Enum):
@@ -28,6 +29,8 @@ class TurnPosition(Enum):
 
 
 class BaseTurnTable(BaseComponent):
+    kind = 'TurnTable'
+
     def __init__(self, 
                  name, server, namespace_index, base_node,
                  capabilities: Set[Capabilities],
@@ -51,33 +54,21 @@ class BaseTurnTable(BaseComponent):
 
     async def build(self):
         # cria os movimentos
-        self.node_move_turn = await self.base_node.add_variable(self.namespace_index, f'IO: Rotate {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.node_move_turn.set_writable(True)
-        self.nodes.append(self.node_move_turn)
-
-        self.node_roll_plus = await self.base_node.add_variable(self.namespace_index, f'IO: Roll+ {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.node_roll_plus.set_writable(True)
-        self.nodes.append(self.node_roll_plus)
-
-        self.node_roll_minus = await self.base_node.add_variable(self.namespace_index, f'IO: Roll- {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.node_roll_minus.set_writable(True)
-        self.nodes.append(self.node_roll_minus)
+        self.node_move_turn = await self.add_io(f'IO: Rotate {self.name}', 'Rotate', actuator=True)
+        self.node_roll_plus = await self.add_io(f'IO: Roll+ {self.name}', 'RollPlus', actuator=True)
+        self.node_roll_minus = await self.add_io(f'IO: Roll- {self.name}', 'RollMinus', actuator=True)
 
         # cria os sensores
-        self.node_sensor_turn_zero = await self.base_node.add_variable(self.namespace_index, f'IO: Turn0 {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.node_sensor_turn_zero.set_writable(True)
+        self.node_sensor_turn_zero = await self.add_io(f'IO: Turn0 {self.name}', 'Turn0')
         self.sensors.append(self.node_sensor_turn_zero)
 
-        self.node_sensor_turn_nineteen = await self.base_node.add_variable(self.namespace_index, f'IO: Turn90 {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.node_sensor_turn_nineteen.set_writable(True)
+        self.node_sensor_turn_nineteen = await self.add_io(f'IO: Turn90 {self.name}', 'Turn90')
         self.sensors.append(self.node_sensor_turn_nineteen)
 
-        self.node_roll_front_limit = await self.base_node.add_variable(self.namespace_index, f'IO: LimitFront {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.node_roll_front_limit.set_writable(True)
+        self.node_roll_front_limit = await self.add_io(f'IO: LimitFront {self.name}', 'LimitFront')
         self.sensors.append(self.node_roll_front_limit)
 
-        self.node_roll_back_limit = await self.base_node.add_variable(self.namespace_index, f'IO: LimitBack {self.name}', False, varianttype=ua.VariantType.Boolean)
-        await self.node_roll_back_limit.set_writable(True)
+        self.node_roll_back_limit = await self.add_io(f'IO: LimitBack {self.name}', 'LimitBack')
         self.sensors.append(self.node_roll_back_limit)
 
     async def create_detectors(self):
@@ -90,30 +81,27 @@ class BaseTurnTable(BaseComponent):
         print(f'[Turntable]: procesando caixa em turn table {self.name}: {order.box_type}')
         front_detector, back_detector = detectors
 
-        await self.node_roll_minus.set_value(True)
+        await self.write(self.node_roll_minus, True)
         await move_prev_stage(True)
 
         # espera borda de descida do sensor de entrada, passou no primeiro, desliga a esteira anterior
-        await front_detector.event_trigger.wait()
-        front_detector.event_trigger.clear()         # renova o trigger
+        await self.wait_edge(front_detector)
         await move_prev_stage(False)
 
         # desliga o roll minus e espera a conveyor pegar esse item, desliga a esteira para o front
-        await back_detector.event_trigger.wait()
-        back_detector.event_trigger.clear()          # renova o trigger
-        await self.node_roll_minus.set_value(False)
+        await self.wait_edge(back_detector)
+        await self.write(self.node_roll_minus, False)
         
         async with self.sem_output:
             await self.queue_output.put((order, self.move_to_next))
-            await self.node_roll_minus.set_value(True)
+            await self.write(self.node_roll_minus, True)
         
-        # configura borda de descida, e espera a caixa passar toda
+        # configura borda de descida, e espera a caixa passar toda (depende do proximo estagio puxar)
         back_detector.set_trigger(EdgeType.FALLING)
-        await back_detector.event_trigger.wait()
-        back_detector.event_trigger.clear()
+        await self.wait_edge(back_detector, external=True)
 
-        await asyncio.sleep(0.3)
-        await self.node_roll_minus.set_value(False)
+        await self.dwell(0.3, after=back_detector)
+        await self.write(self.node_roll_minus, False)
 
     async def pass_green_box(self, order: Order, move_prev_stage: callable, detectors: List[EdgeDetector] = []):
         print(f'[TurnTable] procesando caixa em turn table {self.name}: {order.box_type}')
@@ -121,39 +109,35 @@ class BaseTurnTable(BaseComponent):
 
         # rodar para 90 graus, esperar sensor, mover para roll-  esperar chegar no sensor limit-,
         # rodar para 0, esperar chegar em 0, mover para frente e esperar passar toda
-        await self.node_move_turn.set_value(True)
-        await nineteen_detector.event_trigger.wait()
-        nineteen_detector.event_trigger.clear()
+        await self.write(self.node_move_turn, True)
+        await self.wait_edge(nineteen_detector)
 
         # move a esteira anterior e o rool
-        await asyncio.sleep(0.5)
-        await self.node_roll_minus.set_value(True)
+        await self.dwell(0.5, after=nineteen_detector)
+        await self.write(self.node_roll_minus, True)
         await move_prev_stage(True)
-        await back_detector.event_trigger.wait()
-        back_detector.event_trigger.clear()
+        await self.wait_edge(back_detector)
 
-        await self.node_roll_minus.set_value(False)
+        await self.write(self.node_roll_minus, False)
         await move_prev_stage(False)
-        await asyncio.sleep(0.5)
+        await self.dwell(0.5, after=back_detector)
 
         # volta a posição normal e espera a conveyor pega esse item
-        await self.node_move_turn.set_value(False)
-        await zero_detector.event_trigger.wait()
-        zero_detector.event_trigger.clear()
-        await asyncio.sleep(0.5)
+        await self.write(self.node_move_turn, False)
+        await self.wait_edge(zero_detector)
+        await self.dwell(0.5, after=zero_detector)
 
         async with self.sem_output:
             await self.queue_output.put((order, self.move_to_next))
 
         # move a caixa para o proximo
-        await self.node_roll_minus.set_value(True)
+        await self.write(self.node_roll_minus, True)
         back_detector.set_trigger(EdgeType.FALLING)     # agora é borda de descida
-        await back_detector.event_trigger.wait()
-        back_detector.event_trigger.clear()
+        await self.wait_edge(back_detector, external=True)
         front_detector.event_trigger.clear()
         
-        await asyncio.sleep(0.3)
-        await self.node_roll_minus.set_value(False)
+        await self.dwell(0.3, after=back_detector)
+        await self.write(self.node_roll_minus, False)
 
     async def pass_metal_box(self, order: Order, move_prev_stage: callable, detectors: List[EdgeDetector] = []):
         print(f'[TurnTable]: procesando caixa em turn table {self.name}: {order.box_type}')
@@ -161,41 +145,37 @@ class BaseTurnTable(BaseComponent):
 
         # rodar para 90 graus, esperar sensor, mover para roll+  esperar chegar no sensor limit+,
         # rodar para 0, esperar chegar em 0, mover para frente e esperar passar toda
-        await self.node_move_turn.set_value(True)
-        await nineteen_detector.event_trigger.wait()
-        nineteen_detector.event_trigger.clear()
+        await self.write(self.node_move_turn, True)
+        await self.wait_edge(nineteen_detector)
         back_detector.enable = False
 
         # move a esteira anterior e o rool
-        await asyncio.sleep(0.5)
-        await self.node_roll_plus.set_value(True)
+        await self.dwell(0.5, after=nineteen_detector)
+        await self.write(self.node_roll_plus, True)
         await move_prev_stage(True)
-        await front_detector.event_trigger.wait()
-        front_detector.event_trigger.clear()
+        await self.wait_edge(front_detector)
 
-        await self.node_roll_plus.set_value(False)
+        await self.write(self.node_roll_plus, False)
         await move_prev_stage(False)
-        await asyncio.sleep(0.5)
+        await self.dwell(0.5, after=front_detector)
 
         # volta a posição normal
-        await self.node_move_turn.set_value(False)
-        await zero_detector.event_trigger.wait()
-        zero_detector.event_trigger.clear()
-        await asyncio.sleep(0.5)
+        await self.write(self.node_move_turn, False)
+        await self.wait_edge(zero_detector)
+        await self.dwell(0.5, after=zero_detector)
 
         async with self.sem_output:
             await self.queue_output.put((order, self.move_to_next))
 
         # move a caixa para o proximo
         back_detector.enable = True
-        await self.node_roll_minus.set_value(True)
+        await self.write(self.node_roll_minus, True)
         # back_detector.set_trigger(EdgeType.FALLING)     # agora é borda de descida
         
-        await back_detector.event_trigger.wait()
-        back_detector.event_trigger.clear()
+        await self.wait_edge(back_detector, external=True)
         
-        await asyncio.sleep(0.3)
-        await self.node_roll_minus.set_value(False)
+        await self.dwell(0.3, after=back_detector)
+        await self.write(self.node_roll_minus, False)
 
     async def _set_rollers(self, direction: RollerDirection):
         """
@@ -203,36 +183,36 @@ class BaseTurnTable(BaseComponent):
         Esta função garante que um motor pare antes de o outro ligar.
         """
         if direction == RollerDirection.STOP:
-            await self.node_roll_minus.set_value(False)
-            await self.node_roll_plus.set_value(False)
+            await self.write(self.node_roll_minus, False)
+            await self.write(self.node_roll_plus, False)
         
         elif direction == RollerDirection.FORWARD:
-            await self.node_roll_minus.set_value(False) # Garante que o oposto está parado
-            await self.node_roll_plus.set_value(True)
+            await self.write(self.node_roll_minus, False) # Garante que o oposto está parado
+            await self.write(self.node_roll_plus, True)
         
         elif direction == RollerDirection.BACKWARD:
-            await self.node_roll_plus.set_value(False) # Garante que o oposto está parado
-            await self.node_roll_minus.set_value(True)
+            await self.write(self.node_roll_plus, False) # Garante que o oposto está parado
+            await self.write(self.node_roll_minus, True)
         
-        await asyncio.sleep(0.1)
+        await self.dwell(0.1)
 
     async def _rotate_to(self, position: TurnPosition, detectors: Dict[str, EdgeDetector]):
         """Gira a mesa para uma posição e espera pelo sensor de confirmação."""
         if position == TurnPosition.HOME:
-            await self.node_move_turn.set_value(False)
+            await self.write(self.node_move_turn, False)
             await self._wait_for_sensor(detectors['zero'])
 
         elif position == TurnPosition.NINETY:
-            await self.node_move_turn.set_value(True)
+            await self.write(self.node_move_turn, True)
             await self._wait_for_sensor(detectors['ninety'])
     
-    async def _wait_for_sensor(self, detector: EdgeDetector, new_edge: Optional[EdgeType] = None):
+    async def _wait_for_sensor(self, detector: EdgeDetector, new_edge: Optional[EdgeType] = None, external: bool = False):
         """
         Espera por um evento de sensor e limpa o gatilho.
         Opcionalmente, reconfigura o gatilho para a próxima detecção.
+        external: a borda depende do próximo estágio puxar a caixa (ver BaseComponent.wait_edge).
         """
-        await detector.event_trigger.wait()
-        detector.event_trigger.clear()
+        await self.wait_edge(detector, external=external)
         
         if new_edge:
             detector.set_trigger(new_edge)
@@ -377,11 +357,11 @@ class BaseTurnTable(BaseComponent):
         await self._wait_for_sensor(back_detector)
         await self._set_rollers(RollerDirection.STOP)
         await self._control_previous_stage(move_prev_stage, False)
-        await asyncio.sleep(0.5)
+        await self.dwell(0.5, after=back_detector)
 
         # gira 90 graus
         await self._rotate_to(TurnPosition.NINETY, {'ninety': nineteen_detector})
-        await asyncio.sleep(0.5)
+        await self.dwell(0.5, after=nineteen_detector)
 
         # passa para o proximo estagio e espera o proximo estagio puxar
         await self._transfer_to_next_stage(order)
@@ -390,10 +370,10 @@ class BaseTurnTable(BaseComponent):
         # reconfigura para borda de subida novamente e volta a posição normal
         back_detector.set_trigger(EdgeType.FALLING)
         await self._set_rollers(RollerDirection.BACKWARD)
-        await self._wait_for_sensor(back_detector, EdgeType.RISING)
+        await self._wait_for_sensor(back_detector, EdgeType.RISING, external=True)
         await self._set_rollers(RollerDirection.STOP)
 
-        await asyncio.sleep(1)
+        await self.dwell(1, after=back_detector)
         await self._rotate_to(TurnPosition.HOME, {'zero': zero_detector})
 
     async def _delivery(self, order: Order, move_prev_stage: MoveCallbackFn, detectors: List[EdgeDetector] = []):
@@ -408,8 +388,8 @@ class BaseTurnTable(BaseComponent):
         await self._transfer_to_next_stage(order)
 
         await self._set_rollers(RollerDirection.BACKWARD)
-        await self._wait_for_sensor(back_detector)
-        await asyncio.sleep(0.5)
+        await self._wait_for_sensor(back_detector, external=True)
+        await self.dwell(0.5, after=back_detector)
         await self._set_rollers(RollerDirection.STOP)
 
 
@@ -420,7 +400,9 @@ class TurnTable1(BaseTurnTable):
 
         while True:
             order, move_prev_stage = await self.queue_input.get()
-            await asyncio.sleep(1)
+            self.current_box = order.box_type
+            cycle_start = time.monotonic()
+            await self.dwell(1)
 
             box_type: BoxType = order.box_type
             print(f'[TurnTable1]: process order: {order}')
@@ -454,6 +436,8 @@ class TurnTable1(BaseTurnTable):
                 await self.pass_metal_box(order, move_prev_stage, [front_detector, back_detector, nineteen_detector, zero_detector])
                 self.handler.clear()
 
+            self.end_cycle(cycle_start)
+
 
 class TurnTable2(BaseTurnTable):
     async def run(self):
@@ -462,11 +446,14 @@ class TurnTable2(BaseTurnTable):
 
         while True:
             order, move_prev_stage = await self.queue_input.get()
-            await asyncio.sleep(1)
+            self.current_box = order.box_type
+            cycle_start = time.monotonic()
+            await self.dwell(1)
 
             capability = self._order_for_capability(order)
 
-            if capability == Capabilities.DELIVERY_NO_COVER or capability == Capabilities.STORAGE_COVER:
+            # tudo que precisa de tampa ou vai para entrega segue pela esteira de expedicao e pela estacao de tampas
+            if capability in (Capabilities.DELIVERY_NO_COVER, Capabilities.DELIVERY_COVER, Capabilities.STORAGE_COVER):
                 back_detector = EdgeDetector(self.node_roll_back_limit.nodeid, self.ev_limit_back_sensor, EdgeType.RISING)
                 self.handler.add_detect(back_detector)
 
@@ -482,6 +469,8 @@ class TurnTable2(BaseTurnTable):
                 await self._storage(order, move_prev_stage, [back_detector, nineteen_detector, zero_detector])
                 self.handler.clear()
 
+            self.end_cycle(cycle_start)
+
 
 class TurnTable3(BaseTurnTable):
     async def run(self):
@@ -490,7 +479,9 @@ class TurnTable3(BaseTurnTable):
 
         while True:
             order, move_prev_stage = await self.queue_input.get()
-            await asyncio.sleep(1)
+            self.current_box = order.box_type
+            cycle_start = time.monotonic()
+            await self.dwell(1)
 
             capability = self._order_for_capability(order)
 
@@ -503,9 +494,11 @@ class TurnTable3(BaseTurnTable):
                 await self._storage(order, move_prev_stage, [back_detector, nineteen_detector, zero_detector])
                 self.handler.clear()
 
-            if capability == Capabilities.DELIVERY_NO_COVER:
+            if capability in (Capabilities.DELIVERY_NO_COVER, Capabilities.DELIVERY_COVER):
                 back_detector = EdgeDetector(self.node_roll_back_limit.nodeid, self.ev_limit_back_sensor, EdgeType.RISING)
                 self.handler.add_detect(back_detector)
 
                 await self._delivery(order, move_prev_stage, [back_detector])
                 self.handler.clear()
+
+            self.end_cycle(cycle_start)
@@ -0,0 +1,137 @@
+from pathlib import Path
+from manager.security import EndpointConfig, SecurityMode
+from manager.admission import AdmissionPolicy
+from manager.make_ahead import MakeAheadPolicy
+from manager.parking import ParkingPolicy
+from components.io import IOBackendKind
+from manager.supervisor import LineConfig, LineMode
+from manager.merge import MergePolicy
+from components.base import BoxType
+
+
+BASE_DIR = Path(__file__).parent
+
+# par certificado/chave do servidor, reaproveitado entre execucoes
+# o certificado é gerado na primeira execucao (e renovado perto de expirar), nao vai para o repositorio
+CERTIFICATE_PATH = BASE_DIR / 'certificates/server_certificate.der'
+PRIVATE_KEY_PATH = BASE_DIR / 'certificates/server_private_key.pem'
+CERTIFICATE_RENEW_DAYS = 30
+CERTIFICATE_SUBJECT = {
+    "countryName": "BR",
+    "stateOrProvinceName": "Amazonas",
+    "localityName": "Manaus",
+    "organizationName": "Bar Ltd",
+}
+
+# certificados dos clientes confiaveis, separados do certificado do proprio servidor
+TRUSTED_DIR = BASE_DIR / 'certificates/trusted'
+
+
+# endpoints do servidor, o primeiro é o endpoint principal
+# ex: um endpoint sem seguranca para o lado do PLC / Factory I/O em uma rede isolada
+#   EndpointConfig(4841, [SecurityMode.NONE], anonymous=True)
+ENDPOINTS = [
+    EndpointConfig(4840, [SecurityMode.SIGN_AND_ENCRYPT], users=[(TRUSTED_DIR / 'test_user.der', 'test_user')]),
+]
+
+# linhas (celulas) atendidas, cada uma com a propria pasta de objetos e namespace
+# SHARED: todas no mesmo processo e endpoint; PROCESS: um processo por linha, portas deslocadas por port_offset
+# ex: LINES = [LineConfig('Cell1'), LineConfig('Cell2', port_offset=10)]
+LINES = [
+    LineConfig('Line'),
+]
+LINE_MODE = LineMode.SHARED
+
+# entrada do turntable de selecao: politica de escolha entre os feeders e vagas por feeder
+# WEIGHTED usa MERGE_WEIGHTS (peso 1 para os tipos ausentes), ROUTE_BALANCE alterna os ramos de storage e expedicao
+MERGE_POLICY = MergePolicy.ROUND_ROBIN
+MERGE_SLOTS = 1
+MERGE_WEIGHTS = {BoxType.GREEN: 1, BoxType.BLUE: 1, BoxType.METAL: 1}
+
+# feeders enchem o proximo container enquanto a caixa anterior ainda esta nas esteiras
+FEEDER_PIPELINED = False
+
+# producao antecipada: com a fila vazia cada feeder deixa uma caixa pronta no sensor de fim (no maximo uma)
+# FIXED antecipa todos os tipos, DEMAND so os tipos com pelo menos MAKE_AHEAD_MIN_SHARE das caixas
+# pedidas na ultima MAKE_AHEAD_WINDOW (s)
+MAKE_AHEAD_POLICY = MakeAheadPolicy.OFF
+MAKE_AHEAD_WINDOW = 3600.0
+MAKE_AHEAD_MIN_SHARE = 0.2
+
+# re-slotting do rack com o handler ocioso (sem ordens em andamento): as combinacoes tipo/tampa mais
+# pedidas na ultima RACK_SLOTTING_WINDOW (s) vao para as posicoes mais perto das homes 8 e 1, no maximo
+# RACK_SLOTTING_MAX_MOVES caixas por periodo ocioso; uma ordem nova aborta o movimento antes de pegar a caixa
+RACK_SLOTTING = False
+RACK_SLOTTING_WINDOW = 3600.0
+RACK_SLOTTING_MAX_MOVES = 4
+
+# onde o handler espera depois de HANDLER_IDLE_DELAY (s) ocioso: FIXED na posicao de idle,
+# LAST na home da ultima entrada atendida, PREDICTIVE na home da entrada (A: 8, B: 1) que deve
+# entregar a proxima caixa de storage, prevista pelas caixas ja na linha
+HANDLER_PARKING = ParkingPolicy.FIXED
+HANDLER_IDLE_DELAY = 60.0
+
+# periodo (s) da releitura dos atuadores que corrige o cache de escritas suprimidas
+ACTUATOR_RECONCILE_PERIOD = 5.0
+
+# tempo maximo esperado (s) de um passo de cada tipo de componente, usado pelo monitor de travamentos
+EXPECTED_STEP_TIME = {
+    'Feeder': 20.0,
+    'TurnTable': 15.0,
+    'Conveyor': 30.0,
+    'Handler': 20.0,
+    'PickPlace': 20.0,
+    'Arm': 10.0,
+}
+
+# watchdog das esperas de sensor: prazo = percentil 99 das duracoes aprendidas * WATCHDOG_FACTOR, ou o
+# EXPECTED_STEP_TIME do kind sem amostras; estourado, relê o sensor (borda perdida), reenvia os comandos
+# WATCHDOG_RETRIES vezes e por fim marca o estagio como isolado (jam) ate a borda chegar, sem desligar os
+# atuadores. WATCHDOG_OPERATOR_TIME (s) é o tempo parado ate um operador intervir, base do tempo de parada
+# evitado nos diagnosticos. Desligado por padrao, os prazos precisam ser conferidos na planta
+WATCHDOG = False
+WATCHDOG_FACTOR = 3.0
+WATCHDOG_RETRIES = 1
+WATCHDOG_OPERATOR_TIME = 120.0
+
+# periodo (s) de atualizacao dos nodes de diagnostico
+DIAGNOSTICS_PERIOD = 1.0
+
+# periodo (s) do ciclo do LineSnapshot (IO booleano, posicao do handler e filas em uma variavel)
+SNAPSHOT_PERIOD = 0.1
+
+# admissao de ordens: ordens que terminariam depois do horizonte (s) sao recusadas ou retidas
+ADMISSION_HORIZON = 3600.0
+ADMISSION_POLICY = AdmissionPolicy.DEFER
+
+# ordens finalizadas (concluidas ou recusadas) mantidas na tabela de consulta
+ORDER_RETENTION = 1000
+
+# memoria (bytes) dos arquivos colunares de ordens e caixas concluidas
+ORDER_ARCHIVE_BUDGET = 4 * 1024 * 1024
+
+# trace binario de sensores, atuadores e ordens (None desliga a gravacao)
+# ex: BASE_DIR / 'traces/line.fiot', reproduzido com: python -m manager.replay traces/line.fiot
+TRACE_PATH = None
+
+# backend de IO da planta: OPCUA (Factory I/O cliente do servidor) ou MODBUS (Factory I/O servidor Modbus TCP)
+# no MODBUS as ordens e diagnosticos continuam no OPC UA; o mapa de enderecos (gerado na primeira
+# execucao) mostra o endereco de cada coil, discrete input e holding register para as tags do Factory I/O
+# a porta de cada linha é MODBUS_PORT + port_offset
+IO_BACKEND = IOBackendKind.OPCUA
+MODBUS_HOST = '127.0.0.1'
+MODBUS_PORT = 502
+MODBUS_UNIT = 1
+MODBUS_TIMEOUT = 1.0            # s por requisicao
+MODBUS_SCAN_PERIOD = 0.01       # s entre leituras dos discrete inputs
+MODBUS_MAP_PATH = BASE_DIR / 'modbus_map.json'
+
+# perfil de tempos aprendido dos sensores, usado para adaptar os dwell fixos
+# False mantem os dwell ajustados a mao e o watchdog usa so EXPECTED_STEP_TIME
+TIMING = True
+TIMING_PROFILE_PATH = BASE_DIR / 'timing_profile.json'
+TIMING_PERCENTILE = 0.9         # percentil seguro das duracoes observadas
+TIMING_MARGIN = 0.1             # variacao do percentil sobre o baseline abaixo da qual o dwell nao muda
+TIMING_FLOOR = 0.05             # menor dwell permitido (s)
+TIMING_MIN_SAMPLES = 10         # amostras antes de adaptar
+TIMING_SAVE_PERIOD = 60.0       # periodo (s) de gravacao do perfil
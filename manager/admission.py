@@ -0,0 +1,139 @@
+from typing import Dict, List, Tuple
+from components.base import BaseComponent, BoxType
+from components.box_producer import BoxFeeder
+from components.handler import Handler
+from components.order import Order
+from enum import Enum, auto
+
+import time
+
+
+class AdmissionPolicy(Enum):
+    REJECT = auto()     # recusa ordens que terminariam depois do horizonte
+    DEFER = auto()      # aceita, mas segura a ordem ate caber no horizonte
+
+
+class AdmissionDecision(Enum):
+    ACCEPTED = auto()
+    DEFERRED = auto()
+    REJECTED = auto()
+
+
+class Estimate:
+    def __init__(self, start: float, finish: float):
+        self.start = start
+        self.finish = finish
+
+
+class AdmissionControl:
+    """
+        Estima quando uma ordem comeca e termina a partir das caixas ainda pendentes em
+        cada feeder e dos tempos de ciclo medidos (cycle_histogram dos componentes).
+        Cada feeder produz a sua cor em serie e todas as caixas passam pelo turntable de
+        selecao, entao o inicio é o maior dos dois backlogs e cada caixa custa o pior dos
+        dois ciclos. Enquanto nao ha amostras suficientes usa os tempos default.
+    """
+    def __init__(self,
+                 feeders: List[BoxFeeder],
+                 selector: BaseComponent,
+                 handler: Handler,
+                 horizon: float,
+                 policy: AdmissionPolicy = AdmissionPolicy.REJECT,
+                 default_feed_cycle: float = 20.0,
+                 default_line_cycle: float = 15.0,
+                 transit_time: float = 60.0,
+                 min_samples: int = 3
+        ):
+
+        self.feeders: Dict[BoxType, BoxFeeder] = {feeder.box_type: feeder for feeder in feeders}
+        self.selector = selector
+        self.handler = handler
+        self.horizon = horizon
+        self.policy = policy
+        self.default_feed_cycle = default_feed_cycle
+        self.default_line_cycle = default_line_cycle
+        self.transit_time = transit_time
+        self.min_samples = min_samples
+
+        # caixas aceitas por tipo (comparadas com feeder.boxes_done) e caixas reservadas no rack
+        self.admitted: Dict[BoxType, int] = {box_type: 0 for box_type in self.feeders}
+        self.storage_reserved = 0
+        self.deferred: List[Order] = []
+        self.rejected = 0
+
+    def _cycle(self, component: BaseComponent, default: float) -> float:
+        histogram = component.cycle_histogram
+        return histogram.mean if histogram.count >= self.min_samples else default
+
+    def feed_cycle(self, box_type: BoxType) -> float:
+        return self._cycle(self.feeders[box_type], self.default_feed_cycle)
+
+    def line_cycle(self) -> float:
+        return self._cycle(self.selector, self.default_line_cycle)
+
+    def backlog(self, box_type: BoxType) -> int:
+        """Caixas aceitas de um tipo que ainda nao sairam do feeder."""
+        return max(0, self.admitted[box_type] - self.feeders[box_type].boxes_done)
+
+    def storage_free(self) -> int:
+        # reservas ainda nao guardadas contam como ocupadas
+        return self.handler.rack_capacity - max(self.storage_reserved, self.handler.stored)
+
+    def estimate(self, box_type: BoxType, quantity: int, include_deferred: bool = True) -> Estimate:
+        """Inicio e fim estimados (epoch) de uma ordem que entrasse agora no fim das filas."""
+        feed_cycle = self.feed_cycle(box_type)
+        line_cycle = self.line_cycle()
+
+        backlog = {box: self.backlog(box) for box in self.feeders}
+        if include_deferred:
+            for order in self.deferred:
+                backlog[order.box_type] += order.quantity
+
+        start = max(backlog[box_type] * feed_cycle, sum(backlog.values()) * line_cycle)
+        finish = start + quantity * max(feed_cycle, line_cycle) + self.transit_time
+
+        now = time.time()
+        return Estimate(now + start, now + finish)
+
+    def admit(self, order: Order) -> Tuple[AdmissionDecision, Estimate, str]:
+        """
+            Decide se a ordem entra agora, fica retida ou é recusada.
+            Retorna (AdmissionDecision, Estimate, motivo).
+        """
+        estimate = self.estimate(order.box_type, order.quantity)
+
+        if not order.delivery and order.quantity > self.storage_free():
+            self.rejected += 1
+            return AdmissionDecision.REJECTED, estimate, f'rack full: {self.storage_free()} free positions'
+
+        if not order.delivery:
+            self.storage_reserved += order.quantity
+
+        if estimate.finish - time.time() > self.horizon:
+            if self.policy == AdmissionPolicy.REJECT:
+                if not order.delivery:
+                    self.storage_reserved -= order.quantity
+
+                self.rejected += 1
+                return AdmissionDecision.REJECTED, estimate, f'beyond horizon of {self.horizon:.0f}s'
+
+            self.deferred.append(order)
+            return AdmissionDecision.DEFERRED, estimate, 'deferred until it fits the horizon'
+
+        self.admitted[order.box_type] += order.quantity
+        return AdmissionDecision.ACCEPTED, estimate, 'accepted'
+
+    def release(self) -> List[Order]:
+        """Ordens retidas que agora cabem no horizonte, na ordem de chegada."""
+        released = []
+
+        for order in list(self.deferred):
+            estimate = self.estimate(order.box_type, order.quantity, include_deferred=False)
+            if estimate.finish - time.time() > self.horizon:
+                break
+
+            self.deferred.remove(order)
+            self.admitted[order.box_type] += order.quantity
+            released.append(order)
+
+        return released
@@ -0,0 +1,70 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from array import array
+
+
+class ColumnArchive:
+    """
+        Arquivo colunar de registros finalizados, uma array por coluna. O tamanho é fixo,
+        calculado pelo orcamento de memoria e alocado na criacao: quando enche, os registros
+        mais antigos sao sobrescritos (buffer circular).
+    """
+    def __init__(self, columns: List[Tuple[str, str]], budget_bytes: int):
+        """
+        :param columns: lista de (nome, typecode do modulo array), ex: [('order_id', 'I'), ('finished_at', 'd')]
+        :param budget_bytes: memoria maxima das colunas
+        """
+        self.names = [name for name, _ in columns]
+        self.row_bytes = sum(array(typecode).itemsize for _, typecode in columns)
+        self.capacity = max(1, budget_bytes // self.row_bytes)
+
+        self.columns: Dict[str, array] = {
+            name: array(typecode, bytes(array(typecode).itemsize * self.capacity)) for name, typecode in columns
+        }
+
+        self._head = 0          # proxima posicao a ser escrita
+        self.count = 0          # registros validos
+        self.overwritten = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return self.row_bytes * self.capacity
+
+    def append(self, *values):
+        head = self._head
+        for name, value in zip(self.names, values):
+            self.columns[name][head] = value
+
+        self._head = (head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+        else:
+            self.overwritten += 1
+
+    def _positions(self) -> Iterator[int]:
+        """Posicoes validas, do registro mais antigo para o mais novo."""
+        start = (self._head - self.count) % self.capacity
+        for i in range(self.count):
+            yield (start + i) % self.capacity
+
+    def row(self, position: int) -> Dict[str, float]:
+        return {name: self.columns[name][position] for name in self.names}
+
+    def rows(self) -> Iterator[Dict[str, float]]:
+        for position in self._positions():
+            yield self.row(position)
+
+    def find(self, column: str, value) -> List[Dict[str, float]]:
+        data = self.columns[column]
+        return [self.row(position) for position in self._positions() if data[position] == value]
+
+    def find_last(self, column: str, value) -> Optional[Dict[str, float]]:
+        data = self.columns[column]
+        for position in reversed(list(self._positions())):
+            if data[position] == value:
+                return self.row(position)
+
+        return None
@@ -0,0 +1,123 @@
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from asyncua import Server
+from asyncua.crypto.cert_gen import dump_private_key_as_pem, generate_private_key, generate_self_signed_app_certificate
+from cryptography import x509
+from cryptography.hazmat.primitives.serialization import Encoding, load_pem_private_key
+
+
+# cache da lista de confianca: caminho -> (mtime, certificado em DER)
+_trust_list_cache: Dict[Path, Tuple[float, bytes]] = {}
+
+
+def load_trusted_certificate(path: Path) -> bytes:
+    """
+        Retorna o certificado em DER, analisando o arquivo apenas quando ele muda.
+    """
+    path = Path(path)
+    mtime = path.stat().st_mtime
+    cached = _trust_list_cache.get(path)
+
+    if cached is None or cached[0] != mtime:
+        content = path.read_bytes()
+        if path.suffix == '.pem':
+            content = x509.load_pem_x509_certificate(content).public_bytes(Encoding.DER)
+
+        cached = (mtime, content)
+        _trust_list_cache[path] = cached
+
+    return cached[1]
+
+
+class CertificateManager:
+    """
+        Reaproveita o par certificado/chave do servidor entre execucoes.
+        So gera uma nova chave quando ela nao existe e so gera um novo certificado quando ele
+        nao existe, nao pertence a chave, nao contem a application uri ou esta a menos de
+        renew_days dias de expirar.
+    """
+    def __init__(self,
+                 certificate_path: Path,
+                 private_key_path: Path,
+                 app_uri: str,
+                 host_name: str,
+                 key_usage: List[x509.ObjectIdentifier],
+                 subject: Dict[str, str],
+                 renew_days: int = 30,
+                 valid_days: int = 365
+        ):
+
+        self.certificate_path = Path(certificate_path)
+        self.private_key_path = Path(private_key_path)
+        self.app_uri = app_uri
+        self.host_name = host_name
+        self.key_usage = key_usage
+        self.subject = subject
+        self.renew_days = renew_days
+        self.valid_days = valid_days
+
+        self.certificate: Optional[x509.Certificate] = None
+        self.private_key = None
+
+    def _load_private_key(self):
+        if self.private_key_path.is_file():
+            return load_pem_private_key(self.private_key_path.read_bytes(), password=None)
+
+        print(f'[Certificate]: generating private key {self.private_key_path}')
+        key = generate_private_key()
+        self.private_key_path.parent.mkdir(parents=True, exist_ok=True)
+        self.private_key_path.write_bytes(dump_private_key_as_pem(key))
+        return key
+
+    def _renew_reason(self, certificate: x509.Certificate) -> Optional[str]:
+        public_numbers = certificate.public_key().public_numbers()
+        if public_numbers != self.private_key.public_key().public_numbers():
+            return 'certificate does not match private key'
+
+        remaining = certificate.not_valid_after_utc - datetime.now(timezone.utc)
+        if remaining < timedelta(days=self.renew_days):
+            return f'certificate expires in {remaining.days} days'
+
+        try:
+            san = certificate.extensions.get_extension_for_class(x509.SubjectAlternativeName)
+            if self.app_uri not in san.value.get_values_for_type(x509.UniformResourceIdentifier):
+                return 'certificate does not contain the application uri'
+
+        except x509.ExtensionNotFound:
+            return 'certificate has no subject alternative name'
+
+        return None
+
+    def _generate_certificate(self) -> x509.Certificate:
+        subject_alt_names = [x509.UniformResourceIdentifier(self.app_uri), x509.DNSName(self.host_name)]
+        certificate = generate_self_signed_app_certificate(
+            self.private_key, self.app_uri, self.subject, subject_alt_names, extended=self.key_usage, days=self.valid_days)
+
+        self.certificate_path.write_bytes(certificate.public_bytes(Encoding.DER))
+        return certificate
+
+    def ensure(self) -> x509.Certificate:
+        """
+            Carrega o par existente ou gera o que for necessario. Retorna o certificado valido.
+        """
+        self.private_key = self._load_private_key()
+
+        reason = 'certificate not found'
+        if self.certificate_path.is_file():
+            certificate = x509.load_der_x509_certificate(self.certificate_path.read_bytes())
+            reason = self._renew_reason(certificate)
+
+        if reason is not None:
+            print(f'[Certificate]: generating certificate {self.certificate_path}: {reason}')
+            certificate = self._generate_certificate()
+
+        self.certificate = certificate
+        return certificate
+
+    async def load_into(self, server: Server):
+        if self.certificate is None:
+            self.ensure()
+
+        await server.load_certificate(self.certificate.public_bytes(Encoding.DER))
+        await server.load_private_key(dump_private_key_as_pem(self.private_key), format='pem')
@@ -0,0 +1,57 @@
+from typing import Any, Callable, List, Tuple
+from asyncua import Node, ua
+from components.base import make_node_id
+from manager.metrics import Histogram
+
+import asyncio
+
+
+class Diagnostics:
+    """
+        Objeto 'Diagnostics' no servidor. Os valores sao lidos de getters e publicados
+        periodicamente, escrevendo apenas o que mudou desde o ultimo ciclo.
+    """
+    def __init__(self, namespace_index: int, parent: Node, period: float = 1.0):
+        self.namespace_index = namespace_index
+        self.parent = parent
+        self.period = period
+        self.base_node: Node = None
+        self._values: List[Tuple[Node, Callable[[], Any], ua.VariantType]] = []
+        self._last = {}
+
+    async def build(self):
+        idx = self.namespace_index
+        self.base_node = await self.parent.add_object(make_node_id(idx, 'Diagnostics'), ua.QualifiedName('Diagnostics', idx))
+
+    async def add_value(self, name: str, getter: Callable[[], Any], varianttype: ua.VariantType, initial=None) -> Node:
+        idx = self.namespace_index
+        if initial is None:
+            initial = getter()
+
+        node = await self.base_node.add_variable(
+            make_node_id(idx, 'Diagnostics', name), ua.QualifiedName(name, idx), ua.Variant(initial, varianttype))
+        self._values.append((node, getter, varianttype))
+        return node
+
+    async def add_histogram(self, name: str, histogram: Histogram):
+        """Expoe um histograma como Bounds, Counts, Count, Mean, P99 e Max."""
+        await self.add_value(f'{name}.Bounds', lambda: histogram.bounds, ua.VariantType.Double)
+        await self.add_value(f'{name}.Counts', lambda: list(histogram.counts), ua.VariantType.UInt32)
+        await self.add_value(f'{name}.Count', lambda: histogram.count, ua.VariantType.UInt32)
+        await self.add_value(f'{name}.Mean', lambda: histogram.mean, ua.VariantType.Double)
+        await self.add_value(f'{name}.P99', lambda: histogram.percentile(0.99), ua.VariantType.Double)
+        await self.add_value(f'{name}.Max', lambda: histogram.max, ua.VariantType.Double)
+
+    async def publish(self):
+        for node, getter, varianttype in self._values:
+            value = getter()
+            if self._last.get(node.nodeid) == value:
+                continue
+
+            self._last[node.nodeid] = value
+            await node.write_value(ua.Variant(value, varianttype))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.period)
+            await self.publish()
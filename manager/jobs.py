@@ -0,0 +1,66 @@
+from typing import List, Tuple
+from components.order import Order
+
+import asyncio
+import heapq
+import itertools
+
+
+class JobQueue:
+    """
+        Fila de caixas de um feeder. O feeder pega uma caixa por vez, na ordem de
+        (prioridade maior primeiro, prazo, chegada), entao uma ordem urgente passa na frente
+        das caixas que faltam de uma ordem longa do mesmo tipo.
+
+        Cada ordem ocupa uma unica entrada no heap com as caixas que faltam iniciar; depois
+        de cada get a entrada volta com a mesma chave, o que equivale a expandir a ordem em
+        uma entrada por caixa sem ocupar memoria por caixa.
+    """
+    def __init__(self):
+        self._heap: List[Tuple[int, float, int, Order]] = []
+        self._seq = itertools.count()
+        self._remaining = {}
+        self._available = asyncio.Event()
+
+    def qsize(self) -> int:
+        """Caixas que ainda nao sairam do feeder."""
+        return sum(self._remaining.values())
+
+    def empty(self) -> bool:
+        return not self._heap
+
+    def put_nowait(self, order: Order):
+        remaining = order.quantity - order.boxes_started
+        if remaining <= 0:
+            return
+
+        self._remaining[order.order_id] = remaining
+        heapq.heappush(self._heap, (-order.priority, order.due, next(self._seq), order))
+        self._available.set()
+
+    async def put(self, order: Order):
+        self.put_nowait(order)
+
+    def get_nowait(self) -> Order:
+        """Ordem da proxima caixa a produzir."""
+        if not self._heap:
+            raise asyncio.QueueEmpty
+
+        key = self._heap[0]
+        order = key[3]
+        remaining = self._remaining[order.order_id] - 1
+
+        if remaining > 0:
+            self._remaining[order.order_id] = remaining
+        else:
+            del self._remaining[order.order_id]
+            heapq.heappop(self._heap)
+
+        return order
+
+    async def get(self) -> Order:
+        while not self._heap:
+            self._available.clear()
+            await self._available.wait()
+
+        return self.get_nowait()
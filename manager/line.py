@@ -0,0 +1,511 @@
+from typing import Dict, List, Optional, TypeAlias, Callable
+from dataclasses import dataclass, fields
+from enum import Enum
+from asyncua import Node, Server, ua, uamethod
+from components.base import BaseComponent, make_node_id
+from components.box_producer import BoxFeeder, BoxType
+from components.turn_table import TurnTable1, TurnTable2, TurnTable3, Capabilities
+from components.conveyor import Conveyor, ConveyorDirection, ConveyorAccess
+from components.handler import Handler
+from components.arm import ArmComponent
+from components.pick_place import PickPlace
+from components.order import Order, OrderFn, OrderState, CoverType
+from components.io import IOBackend, NodeIO, bind_io
+from manager.order import ProcessOrder
+from manager.admission import AdmissionControl, AdmissionPolicy
+from manager.order_table import OrderTable
+from manager.snapshot import LineSnapshot
+from manager.merge import FeederMerge, MergePolicy
+from manager.jobs import JobQueue
+from manager.make_ahead import MakeAhead, MakeAheadPolicy
+from manager.slotting import RackSlotting
+from manager.parking import HandlerParking, ParkingPolicy
+
+import asyncio
+
+
+RoutingStrategy: TypeAlias = Callable[[Order], bool]
+
+
+class QueueRouter:
+    """
+        Roteia ordens para a fila de 'delivery' ou 'storage'
+        com base em uma estratégia de lógica injetada.
+    """
+    def __init__(self,
+                 queue_storage: asyncio.Queue[OrderFn],
+                 queue_delivery: asyncio.Queue[OrderFn],
+                 sem_storage: asyncio.Semaphore,
+                 sem_delivery: asyncio.Semaphore,
+                 routing_strategy: RoutingStrategy
+    ):
+
+        self.queue_storage = queue_storage
+        self.queue_delivery = queue_delivery
+        self.sem_storage = sem_storage
+        self.sem_delivery = sem_delivery
+        self.routing_strategy = routing_strategy
+
+    async def put(self, item: OrderFn):
+        order, fn = item
+
+        if self.routing_strategy(order):
+            print(f'[QueueRouter]: router order: {order} to queue delivery: {self.queue_delivery}')
+            async with self.sem_delivery:
+                await self.queue_delivery.put((order, fn))
+
+        else:
+            print(f'[QueueRouter]: router order: {order} to queue storage: {self.queue_storage}')
+            async with self.sem_storage:
+                await self.queue_storage.put((order, fn))
+
+
+async def task_delivery_exit(queue: asyncio.Queue[OrderFn]):
+    while True:
+        order, _ = await queue.get()
+        order.set_state(OrderState.DELIVERY)
+        order.box_finished()
+        await asyncio.sleep(5)
+
+
+async def add_object(parent: Node, idx: int, browse_name: str, *path: str) -> Node:
+    # objetos com NodeId de string deterministico, derivado do caminho
+    return await parent.add_object(make_node_id(idx, *path), ua.QualifiedName(browse_name, idx))
+
+
+async def add_button(parent: Node, idx: int, browse_name: str, *path: str) -> Node:
+    node = await parent.add_variable(make_node_id(idx, *path), ua.QualifiedName(browse_name, idx), False, varianttype=ua.VariantType.Boolean)
+    await node.set_writable()
+    return node
+
+
+def default_router(order: Order) -> bool:
+    return order.delivery or order.cover == CoverType.WITH_COVER
+
+
+def simple_delivery(order: Order) -> bool:
+    return order.delivery
+
+
+@dataclass
+class LineSettings:
+    """Ajustes de uma linha, o servidor monta a partir das constantes de config.py."""
+    admission_horizon: float = 3600.0
+    admission_policy: AdmissionPolicy = AdmissionPolicy.DEFER
+    order_retention: int = 1000
+    order_archive_budget: int = 4 * 1024 * 1024
+    snapshot_period: float = 0.1
+    merge_policy: MergePolicy = MergePolicy.ROUND_ROBIN
+    merge_slots: int = 1
+    merge_weights: Optional[Dict[BoxType, int]] = None
+    feeder_pipelined: bool = False
+    make_ahead_policy: MakeAheadPolicy = MakeAheadPolicy.OFF
+    make_ahead_window: float = 3600.0
+    make_ahead_min_share: float = 0.2
+    reconcile_period: float = 5.0
+    rack_slotting: bool = False
+    rack_slotting_window: float = 3600.0
+    rack_slotting_max_moves: int = 4
+    parking_policy: ParkingPolicy = ParkingPolicy.FIXED
+    handler_idle_delay: float = 60.0
+
+    def to_dict(self) -> Dict:
+        """Ajustes em JSON, enums e BoxType pelo nome. Vai no registro LINE do trace."""
+        data = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, Enum):
+                value = value.name
+            elif field.name == 'merge_weights' and value is not None:
+                value = {box_type.name: weight for box_type, weight in value.items()}
+
+            data[field.name] = value
+
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LineSettings':
+        """Inverso de to_dict, ValueError com ajustes que esta versao nao conhece."""
+        names = {field.name for field in fields(cls)}
+        unknown = set(data) - names
+        if unknown:
+            raise ValueError(f'unknown line settings: {", ".join(sorted(unknown))}')
+
+        values = {}
+        for field in fields(cls):
+            if field.name not in data:
+                continue
+
+            value = data[field.name]
+            try:
+                if isinstance(field.default, Enum):
+                    value = type(field.default)[value]
+                elif field.name == 'merge_weights' and value is not None:
+                    value = {BoxType[name]: weight for name, weight in value.items()}
+
+            except KeyError as error:
+                raise ValueError(f'unknown value for {field.name}: {error}') from None
+
+            values[field.name] = value
+
+        return cls(**values)
+
+
+class Line:
+    """
+        Uma celula completa: filas, componentes, botoes de start/stop e o metodo CreateOrder.
+        Serve tanto para o servidor real quanto para o servidor fake do replay.
+
+        Tudo fica dentro da pasta de objetos da linha (NodeId 'Line' no namespace dela), entao
+        varias linhas podem dividir o mesmo servidor, cada uma com o proprio namespace_index.
+    """
+    def __init__(self, server: Server, namespace_index: int, parent: Node, settings: Optional[LineSettings] = None,
+                 name: str = 'Line', recorder=None, io_backend: Optional[IOBackend] = None):
+        settings = settings if settings is not None else LineSettings()
+        self.server = server
+        self.namespace_index = namespace_index
+        self.parent = parent
+        self.settings = settings
+        self.name = name
+        self.node: Node = None
+        self.recorder = recorder
+        self.orders = OrderTable(settings.order_retention, settings.order_archive_budget)
+        self.merge: FeederMerge = None
+        self.make_ahead: Optional[MakeAhead] = None
+        if settings.make_ahead_policy != MakeAheadPolicy.OFF:
+            self.make_ahead = MakeAhead(
+                settings.make_ahead_policy, settings.make_ahead_window, settings.make_ahead_min_share)
+        self.snapshot: LineSnapshot = None
+        self.io_backend = io_backend
+        self.slotting: Optional[RackSlotting] = None
+        if settings.rack_slotting:
+            self.slotting = RackSlotting(settings.rack_slotting_window, max_moves=settings.rack_slotting_max_moves)
+        self.parking: Optional[HandlerParking] = None
+        if settings.parking_policy != ParkingPolicy.FIXED:
+            self.parking = HandlerParking(settings.parking_policy, self.orders)
+        self.queues: Dict[str, asyncio.Queue] = {}
+
+        self.process_order: ProcessOrder = None
+        self.producers: List[BaseComponent] = []
+        self.turns_table: List[BaseComponent] = []
+        self.conveyors: List[BaseComponent] = []
+        self.handler: Handler = None
+        self.cover_arm: ArmComponent = None
+        self.cover_station: PickPlace = None
+        self.tasks: List[asyncio.Task] = []
+        self.queue_delivery_exit: asyncio.Queue[OrderFn] = None
+
+        self.btn_start_process: Node = None
+        self.btn_stop_process: Node = None
+        self.start_io: NodeIO = None
+        self.stop_io: NodeIO = None
+
+    @property
+    def components(self) -> List[BaseComponent]:
+        return [*self.producers, *self.turns_table, *self.conveyors, self.cover_arm, self.cover_station, self.handler]
+
+    async def build(self):
+        server = self.server
+        idx = self.namespace_index
+        settings = self.settings
+        self.node = await add_object(self.parent, idx, self.name, 'Line')
+        objects_node = self.node
+
+        # o replay monta a linha a partir deste registro, com os mesmos ajustes e perfil de tempos
+        if self.recorder is not None:
+            timing = BaseComponent.timing
+            self.recorder.line(idx, {
+                'name': self.name,
+                'settings': settings.to_dict(),
+                'timing': timing.snapshot(f'{self.name}.') if timing is not None else None,
+                'watchdog': BaseComponent.watchdog is not None,
+            })
+
+        # caixas a produzir por feeder, uma por vez, por prioridade e prazo
+        queue_oder_green = JobQueue()
+        queue_oder_blue = JobQueue()
+        queue_oder_metal = JobQueue()
+
+        # feeders -> turntable, vagas limitadas por feeder; route balance equilibra os ramos do TurnTable2
+        self.merge = FeederMerge(
+            [BoxType.GREEN, BoxType.BLUE, BoxType.METAL], settings.merge_policy, settings.merge_slots, settings.merge_weights, default_router)
+        queue_turntable1_conveyor1: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)     # turntable_select -> conveyor_input
+        sem_turntable1_conveyor1 = asyncio.Semaphore(value=2)
+
+        queue_conveyor1_turntable2: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)     # conveyor_input -> turntable_nocover
+        queue_turntable2_storage: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)       # turntable2 -> roller_a_storage
+        queue_turntable2_delivery: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)      # turntable2 -> conveyor_delivery
+        sem_conveyor_a_storage = asyncio.Semaphore(value=2)
+        sem_conveyor_a_delivery = asyncio.Semaphore(value=2)
+        queue_turntable2_router = QueueRouter(
+            queue_turntable2_storage, queue_turntable2_delivery, sem_conveyor_a_storage, sem_conveyor_a_delivery, default_router)
+
+        queue_roller_a_acc_a: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)           # roller_a_storage -> roller_access_a
+        queue_acc_a_handler: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)            # roller_access_a -> handler
+        sem_acc_a_handler = asyncio.Semaphore(2)
+
+        queue_dispatch_cover: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)           # conveyor_delivery -> cover station
+        queue_dispatch_turntable3: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)      # cover station -> turntable3
+        queue_turntable3_storage: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)       # turntable3 -> roller_b_storage
+        queue_turntable3_delivery: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)      # turntable3 -> delivery_conveyor
+        sem_converyor_b_storage = asyncio.Semaphore(2)
+        sem_converyor_b_delivery = asyncio.Semaphore(2)
+        queue_turntable3_router = QueueRouter(
+            queue_turntable3_storage, queue_turntable3_delivery, sem_converyor_b_storage, sem_converyor_b_delivery, simple_delivery)
+
+        queue_roller_b_acc_b: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)           # roller_b_storage -> roller_access_b
+        queue_acc_b_handler: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)            # roller_access_b -> handler
+        sem_acc_b_handler = asyncio.Semaphore(2)
+
+        self.queue_delivery_exit = asyncio.Queue(maxsize=1)                                # representa a fila de entrega final
+
+        # filas entre estagios, publicadas no LineSnapshot
+        self.queues = {
+            'Jobs.GREEN': queue_oder_green,
+            'Jobs.BLUE': queue_oder_blue,
+            'Jobs.METAL': queue_oder_metal,
+            'Feeder.Select': self.merge,
+            'Select.Input': queue_turntable1_conveyor1,
+            'Input.NoCover': queue_conveyor1_turntable2,
+            'NoCover.RollerA': queue_turntable2_storage,
+            'NoCover.Dispatch': queue_turntable2_delivery,
+            'RollerA.AccA': queue_roller_a_acc_a,
+            'AccA.Handler': queue_acc_a_handler,
+            'Dispatch.Cover': queue_dispatch_cover,
+            'Cover.WithCover': queue_dispatch_turntable3,
+            'WithCover.RollerB': queue_turntable3_storage,
+            'WithCover.Exit': queue_turntable3_delivery,
+            'RollerB.AccB': queue_roller_b_acc_b,
+            'AccB.Handler': queue_acc_b_handler,
+            'Exit.Delivery': self.queue_delivery_exit,
+        }
+
+        self.process_order = ProcessOrder(queue_oder_green, queue_oder_blue, queue_oder_metal, recorder=self.recorder, orders=self.orders,
+                                          namespace_index=idx)
+
+        green_producer = await add_object(objects_node, idx, 'Green Producer', 'GreenProducer')
+        blue_producer = await add_object(objects_node, idx, 'Blue Producer', 'BlueProducer')
+        metal_producer = await add_object(objects_node, idx, 'Metal Producer', 'MetalProducer')
+        node_turns_table = await add_object(objects_node, idx, 'TurnsTable', 'TurnsTable')
+        node_input_conveyors = await add_object(objects_node, idx, 'Conveyors', 'Conveyors')
+        node_cover_station = await add_object(objects_node, idx, 'Cover Station', 'CoverStation')
+        node_handler = await add_object(objects_node, idx, 'Handler', 'Handler')
+        node_methods = await add_object(objects_node, idx, 'Methods', 'Methods')
+        await self.orders.build(server, idx, objects_node)
+
+        self.producers = [
+            BoxFeeder(queue_oder_green, BoxType.GREEN, server, idx, green_producer, 2, 4, self.merge.slot(BoxType.GREEN), settings.feeder_pipelined, self.make_ahead),
+            BoxFeeder(queue_oder_blue, BoxType.BLUE, server, idx, blue_producer, 2, 2, self.merge.slot(BoxType.BLUE), settings.feeder_pipelined, self.make_ahead),
+            BoxFeeder(queue_oder_metal, BoxType.METAL, server, idx, metal_producer, 2, 4, self.merge.slot(BoxType.METAL), settings.feeder_pipelined, self.make_ahead)
+        ]
+
+        for producer in self.producers:
+            await self.build_component(producer)
+
+        self.turns_table = [
+            TurnTable1('Select', server, idx, node_turns_table, {Capabilities.PASS}, self.merge, queue_turntable1_conveyor1, sem_turntable1_conveyor1),
+            TurnTable2('NoCover', server, idx, node_turns_table, {Capabilities.DELIVERY_NO_COVER, Capabilities.STORAGE_NO_COVER}, queue_conveyor1_turntable2, queue_turntable2_router, asyncio.Semaphore()),
+            TurnTable3('WithCover', server, idx, node_turns_table, {Capabilities.DELIVERY_NO_COVER, Capabilities.DELIVERY_COVER, Capabilities.STORAGE_COVER}, queue_dispatch_turntable3, queue_turntable3_router, asyncio.Semaphore())
+        ]
+
+        for turn_table in self.turns_table:
+            turn_table.base_node = await add_object(node_turns_table, idx, f'TurnTable {turn_table.name}', 'TurnsTable', turn_table.name)
+            await self.build_component(turn_table)
+
+        args_conveyors = [server, idx, node_input_conveyors]
+        self.conveyors = [
+            Conveyor('InputConveyor', *args_conveyors, 2, 2, {ConveyorDirection.FORWARD}, queue_turntable1_conveyor1, queue_conveyor1_turntable2, sem_turntable1_conveyor1),
+            Conveyor('RollerAConveyor', *args_conveyors, 1, 4, {ConveyorDirection.FORWARD, ConveyorDirection.BACKWARD}, queue_turntable2_storage, queue_roller_a_acc_a, sem_conveyor_a_storage),
+            ConveyorAccess('AccAConveyor', *args_conveyors, 1, 1, {ConveyorDirection.FORWARD, ConveyorDirection.BACKWARD}, queue_roller_a_acc_a, queue_acc_a_handler, sem_acc_a_handler),
+            Conveyor('DispaConveyor', *args_conveyors, 1, 4, {ConveyorDirection.FORWARD}, queue_turntable2_delivery, queue_dispatch_cover, sem_conveyor_a_delivery),
+            Conveyor('RollerBConveyor', *args_conveyors, 1, 4, {ConveyorDirection.FORWARD, ConveyorDirection.BACKWARD}, queue_turntable3_storage, queue_roller_b_acc_b, sem_converyor_b_storage),
+            ConveyorAccess('AccBConveyor', *args_conveyors, 1, 1, {ConveyorDirection.FORWARD, ConveyorDirection.BACKWARD},  queue_roller_b_acc_b,queue_acc_b_handler, sem_acc_b_handler),
+            ConveyorAccess('ExitConveyor', *args_conveyors, 1, 1, {ConveyorDirection.FORWARD}, queue_turntable3_delivery, self.queue_delivery_exit, asyncio.Semaphore(), wait_next_stage=False)
+        ]
+
+        for conveyor in self.conveyors:
+            conveyor.base_node = await add_object(node_input_conveyors, idx, f'Conveyor {conveyor.name}', 'Conveyors', conveyor.name)
+            await self.build_component(conveyor)
+
+        # estacao de tampas no fim da esteira de expedicao, o braco alimenta as tampas
+        self.cover_arm = ArmComponent('CoverFeed', server, idx, node_cover_station)
+        self.cover_station = PickPlace('Cover', server, idx, node_cover_station, queue_dispatch_cover, queue_dispatch_turntable3, self.cover_arm,
+                                    self.conveyors[3].sensors[1])
+        await self.build_component(self.cover_arm)
+        await self.build_component(self.cover_station)
+
+        self.handler = Handler('Handler', server, idx, node_handler, queue_acc_a_handler, queue_acc_b_handler, sem_acc_a_handler, sem_acc_b_handler)
+        await self.build_component(self.handler)
+
+        # re-slotting do rack so com a linha sem ordens em andamento
+        if self.slotting is not None:
+            self.process_order.slotting = self.slotting
+            self.handler.slotting = self.slotting
+            self.handler.pending_jobs = lambda: self.orders.active() > 0
+
+        self.handler.parking = self.parking
+        self.handler.idle_delay = settings.handler_idle_delay
+
+        # todas as caixas passam pelo turntable de selecao, ele limita a vazao da linha
+        self.process_order.admission = AdmissionControl(
+            self.producers, self.turns_table[0], self.handler, settings.admission_horizon, settings.admission_policy)
+
+        self.snapshot = LineSnapshot(idx, objects_node, self.components, self.handler.position, self.queues, settings.snapshot_period)
+        await self.snapshot.build()
+
+        self.btn_start_process = await add_button(objects_node, idx, 'IO:Botao Start Process', 'Line', 'StartProcess')
+        self.btn_stop_process = await add_button(objects_node, idx, 'IO:Botao Stop Process', 'Line', 'StopProcess')
+        self.start_io = bind_io(server, self.btn_start_process, ua.VariantType.Boolean)
+        self.stop_io = bind_io(server, self.btn_stop_process, ua.VariantType.Boolean)
+
+        input_args = [
+            ua.Argument('ProductType', ua.NodeId(ua.VariantType.Int16)),
+            ua.Argument('Quantity', ua.NodeId(ua.VariantType.Int16)),
+            ua.Argument('Cover', ua.NodeId(ua.VariantType.Boolean)),
+            ua.Argument('Delivery', ua.NodeId(ua.VariantType.Boolean)),
+        ]
+
+        output_args = [
+            ua.Argument('Status', ua.NodeId(ua.VariantType.Boolean)),
+            ua.Argument('Message', ua.NodeId(ua.VariantType.String)),
+            ua.Argument('EstimatedStart', ua.NodeId(ua.VariantType.DateTime)),
+            ua.Argument('EstimatedFinish', ua.NodeId(ua.VariantType.DateTime))
+        ]
+
+        await node_methods.add_method(
+            make_node_id(idx, 'Methods', 'CreateOrder'), ua.QualifiedName('CreateOrder', idx),
+            uamethod(self.process_order.handle_new_order), input_args, output_args)
+
+        priority_input_args = [
+            *input_args,
+            ua.Argument('Priority', ua.NodeId(ua.VariantType.Byte)),
+            ua.Argument('DueTime', ua.NodeId(ua.VariantType.DateTime)),
+        ]
+
+        await node_methods.add_method(
+            make_node_id(idx, 'Methods', 'CreatePriorityOrder'), ua.QualifiedName('CreatePriorityOrder', idx),
+            uamethod(self.process_order.handle_priority_order), priority_input_args, output_args)
+
+        status_output_args = [
+            ua.Argument('Found', ua.NodeId(ua.VariantType.Boolean)),
+            ua.Argument('State', ua.NodeId(ua.VariantType.String)),
+            ua.Argument('BoxType', ua.NodeId(ua.VariantType.String)),
+            ua.Argument('BoxesDone', ua.NodeId(ua.VariantType.UInt32)),
+            ua.Argument('Quantity', ua.NodeId(ua.VariantType.UInt32)),
+            ua.Argument('Updated', ua.NodeId(ua.VariantType.DateTime)),
+        ]
+
+        await node_methods.add_method(
+            make_node_id(idx, 'Methods', 'GetOrderStatus'), ua.QualifiedName('GetOrderStatus', idx),
+            uamethod(self.process_order.get_order_status),
+            [ua.Argument('OrderId', ua.NodeId(ua.VariantType.UInt32))], status_output_args)
+
+        list_output_args = [
+            ua.Argument('OrderIds', ua.NodeId(ua.VariantType.UInt32), ValueRank=1),
+            ua.Argument('States', ua.NodeId(ua.VariantType.String), ValueRank=1),
+        ]
+
+        await node_methods.add_method(
+            make_node_id(idx, 'Methods', 'ListOrders'), ua.QualifiedName('ListOrders', idx),
+            uamethod(self.process_order.list_orders),
+            [ua.Argument('State', ua.NodeId(ua.VariantType.String)), ua.Argument('Limit', ua.NodeId(ua.VariantType.UInt32))],
+            list_output_args)
+
+    async def build_component(self, component: BaseComponent):
+        """Build de um componente com o backend de IO da linha (o padrao da classe quando None)."""
+        if self.io_backend is not None:
+            component.io_backend = self.io_backend
+
+        component.line_name = self.name
+        await component.build()
+
+    def start_tasks(self):
+        """Cria as tasks dos componentes, que ficam esperando o start_event."""
+        for component in self.components:
+            self.tasks.append(asyncio.create_task(component.run(), name=f'{self.name}.{component.name}'))
+
+        self.tasks.append(asyncio.create_task(task_delivery_exit(self.queue_delivery_exit), name=f'{self.name}.delivery_exit'))
+        self.tasks.append(asyncio.create_task(self.process_order.run(), name=f'{self.name}.admission'))
+        self.tasks.append(asyncio.create_task(self.orders.run(), name=f'{self.name}.order_events'))
+        self.tasks.append(asyncio.create_task(self.snapshot.run(), name=f'{self.name}.snapshot'))
+        self.tasks.append(asyncio.create_task(self.run_reconcile(), name=f'{self.name}.reconcile'))
+        if self.io_backend is not None:
+            self.tasks.append(asyncio.create_task(self.io_backend.run(), name=f'{self.name}.io'))
+
+    def start(self):
+        for component in self.components:
+            component.start_event.set()
+            component.start_event.clear()
+
+    async def pause(self):
+        for component in self.components:
+            await component.pause()
+
+    async def resume(self):
+        for component in self.components:
+            await component.resume()
+
+    async def reconcile(self):
+        """Sincroniza os valores comandados dos atuadores com os valores atuais dos nodes."""
+        for component in self.components:
+            await component.reconcile()
+
+    async def run_reconcile(self):
+        """
+            Reconciliacao periodica: uma escrita de outro cliente ou um reset do Factory I/O
+            durante uma reconexao nao deixa uma escrita suprimida por engano por mais de um periodo.
+        """
+        while True:
+            await asyncio.sleep(self.settings.reconcile_period)
+            await self.reconcile()
+
+    @property
+    def writes_issued(self) -> int:
+        return sum(component.writes_issued for component in self.components)
+
+    @property
+    def writes_suppressed(self) -> int:
+        return sum(component.writes_suppressed for component in self.components)
+
+    def total(self, counter: str):
+        """Soma de um contador dos componentes, ex: total('missed_edges')."""
+        return sum(getattr(component, counter) for component in self.components)
+
+    async def run_controls(self):
+        """
+            Le os botoes da linha.
+            start: primeira vez libera os componentes, depois retoma da pausa
+            stop: pausa, congela os atuadores mantendo filas, subscriptions e caixas em transito
+        """
+        process_run = False
+        process_started = False
+
+        while True:
+            value_start_button: bool = await self.start_io.read()
+            value_stop_button: bool = await self.stop_io.read()
+
+            if value_start_button and process_run is False:
+                process_run = True
+
+                if process_started is False:
+                    print(f'[{self.name}]: iniciando processo')
+                    process_started = True
+                    await self.reconcile()
+                    self.start()
+
+                else:
+                    print(f'[{self.name}]: retomando processo')
+                    await self.resume()
+                    await self.reconcile()
+
+                continue
+
+            if value_stop_button and process_run is True:
+                print(f'[{self.name}]: pausando processo')
+
+                process_run = False
+                await self.pause()
+
+                continue
+
+            await asyncio.sleep(0.01)
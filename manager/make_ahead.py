@@ -0,0 +1,64 @@
+from typing import Deque, Dict, Tuple
+from collections import deque
+from components.base import BoxType
+from components.order import Order
+from enum import Enum, auto
+
+import time
+
+
+class MakeAheadPolicy(Enum):
+    OFF = auto()        # so produz com ordem
+    FIXED = auto()      # mantem uma caixa de cada tipo pronta
+    DEMAND = auto()     # so para os tipos com parte relevante da demanda recente
+
+
+class MakeAhead:
+    """
+        Producao antecipada: com a fila do feeder vazia ele produz caixas sem ordem e deixa
+        paradas nas proprias esteiras; a proxima ordem do tipo recebe a caixa ja pronta e
+        pula o enchimento e o transporte do feeder. Cada feeder guarda no maximo uma caixa
+        (BoxFeeder.park_capacity), parada no sensor de fim.
+
+        A demanda recente é a quantidade de caixas por tipo das ordens iniciadas na janela
+        'window' (s). No modo DEMAND um tipo so é antecipado se tiver pelo menos 'min_share'
+        das caixas da janela.
+    """
+    def __init__(self, policy: MakeAheadPolicy = MakeAheadPolicy.OFF, window: float = 3600.0,
+                 min_share: float = 0.2, period: float = 1.0):
+        self.policy = policy
+        self.window = window
+        self.min_share = min_share
+        self.period = period
+
+        self.demand: Deque[Tuple[float, BoxType, int]] = deque()
+        self.produced = 0
+        self.hits = 0
+
+    def observe(self, order: Order):
+        self.demand.append((time.monotonic(), order.box_type, order.quantity))
+
+    def _expire(self):
+        limit = time.monotonic() - self.window
+        while self.demand and self.demand[0][0] < limit:
+            self.demand.popleft()
+
+    def shares(self) -> Dict[BoxType, float]:
+        self._expire()
+        total = sum(quantity for _, _, quantity in self.demand)
+        shares = {box_type: 0.0 for box_type in BoxType}
+        if total:
+            for _, box_type, quantity in self.demand:
+                shares[box_type] += quantity / total
+
+        return shares
+
+    def wanted(self, box_type: BoxType) -> bool:
+        """O tipo deve ter uma caixa antecipada."""
+        if self.policy == MakeAheadPolicy.FIXED:
+            return True
+
+        if self.policy == MakeAheadPolicy.DEMAND:
+            return self.shares()[box_type] >= self.min_share
+
+        return False
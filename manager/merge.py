@@ -0,0 +1,150 @@
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+from collections import deque
+from components.base import BoxType
+from components.order import Order, OrderFn
+from manager.metrics import Histogram
+from enum import Enum, auto
+
+import asyncio
+import time
+
+
+class MergePolicy(Enum):
+    ROUND_ROBIN = auto()    # um feeder por vez, na ordem
+    WEIGHTED = auto()       # round robin ponderado pelos pesos de cada BoxType
+    ROUTE_BALANCE = auto()  # prefere caixas do ramo (TurnTable2/3) que recebeu menos caixas recentemente
+
+
+class FeederSlot:
+    """
+        Vagas de um feeder na entrada do turntable de selecao. Com as vagas cheias o put
+        bloqueia e o feeder para. O tempo bloqueado vai do put ate o turntable pegar a caixa.
+    """
+    def __init__(self, merge: 'FeederMerge', box_type: BoxType, size: int):
+        self.merge = merge
+        self.box_type = box_type
+        self.size = size
+        self.items: Deque[Tuple[OrderFn, float]] = deque()
+        self.not_full = asyncio.Event()
+        self.not_full.set()
+
+        self.blocked_histogram = Histogram()
+        self.blocked_time = 0.0
+        self.boxes = 0
+
+    def qsize(self) -> int:
+        return len(self.items)
+
+    async def put(self, item: OrderFn):
+        since = time.monotonic()
+        while len(self.items) >= self.size:
+            self.not_full.clear()
+            await self.not_full.wait()
+
+        self.items.append((item, since))
+        self.merge.available.set()
+
+    def take(self) -> OrderFn:
+        item, since = self.items.popleft()
+        self.not_full.set()
+
+        blocked = time.monotonic() - since
+        self.blocked_histogram.observe(blocked)
+        self.blocked_time += blocked
+        self.boxes += 1
+        return item
+
+
+class FeederMerge:
+    """
+        Junta as caixas dos feeders na entrada do turntable de selecao. Cada feeder tem as
+        proprias vagas (slot) e o turntable escolhe de qual feeder pegar pela politica, assim
+        uma ordem longa de um tipo nao segura os outros feeders.
+        Tem a mesma interface de fila usada pelos componentes: slot(box_type).put(), get() e qsize().
+    """
+    def __init__(self,
+                 box_types: List[BoxType],
+                 policy: MergePolicy = MergePolicy.ROUND_ROBIN,
+                 slot_size: int = 1,
+                 weights: Optional[Dict[BoxType, int]] = None,
+                 branch_of: Optional[Callable[[Order], Hashable]] = None,
+                 window: int = 6
+        ):
+
+        self.policy = policy
+        self.slots: Dict[BoxType, FeederSlot] = {box_type: FeederSlot(self, box_type, slot_size) for box_type in box_types}
+        self.order = list(self.slots)
+        self.weights = {box_type: (weights or {}).get(box_type, 1) for box_type in self.order}
+        self.branch_of = branch_of
+        self.available = asyncio.Event()
+
+        self._next = 0
+        self._credit = {box_type: 0 for box_type in self.order}
+        self._recent: Deque[Hashable] = deque(maxlen=window)
+
+    def slot(self, box_type: BoxType) -> FeederSlot:
+        return self.slots[box_type]
+
+    def qsize(self) -> int:
+        return sum(slot.qsize() for slot in self.slots.values())
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def _round_robin(self, ready: List[BoxType]) -> BoxType:
+        count = len(self.order)
+        for i in range(count):
+            box_type = self.order[(self._next + i) % count]
+            if box_type in ready:
+                self._next = (self.order.index(box_type) + 1) % count
+                return box_type
+
+    def _weighted(self, ready: List[BoxType]) -> BoxType:
+        # round robin ponderado suave: cada feeder pronto ganha o seu peso, o maior credito é servido
+        for box_type in ready:
+            self._credit[box_type] += self.weights[box_type]
+
+        chosen = max(ready, key=lambda box_type: self._credit[box_type])
+        self._credit[chosen] -= sum(self.weights[box_type] for box_type in ready)
+        return chosen
+
+    def _route_balance(self, ready: List[BoxType]) -> BoxType:
+        if self.branch_of is None:
+            return self._round_robin(ready)
+
+        def load(box_type: BoxType) -> int:
+            order, _ = self.slots[box_type].items[0][0]
+            return self._recent.count(self.branch_of(order))
+
+        least = min(load(box_type) for box_type in ready)
+        return self._round_robin([box_type for box_type in ready if load(box_type) == least])
+
+    def _choose(self) -> BoxType:
+        ready = [box_type for box_type in self.order if self.slots[box_type].items]
+
+        if len(ready) == 1:
+            chosen = ready[0]
+            self._next = (self.order.index(chosen) + 1) % len(self.order)
+
+        elif self.policy == MergePolicy.WEIGHTED:
+            chosen = self._weighted(ready)
+
+        elif self.policy == MergePolicy.ROUTE_BALANCE:
+            chosen = self._route_balance(ready)
+
+        else:
+            chosen = self._round_robin(ready)
+
+        return chosen
+
+    async def get(self) -> OrderFn:
+        while self.empty():
+            self.available.clear()
+            await self.available.wait()
+
+        item = self.slots[self._choose()].take()
+        if self.branch_of is not None:
+            order, _ = item
+            self._recent.append(self.branch_of(order))
+
+        return item
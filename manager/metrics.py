@@ -0,0 +1,52 @@
+from typing import List, Optional
+
+import bisect
+
+
+# limites padrao dos buckets em segundos, de 1 ms ate 60 s
+DEFAULT_BOUNDS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+
+class Histogram:
+    """
+        Histograma de buckets fixos, barato o suficiente para ser atualizado no loop de controle.
+        counts[i] conta as amostras <= bounds[i], o ultimo bucket conta o que passou do maior limite.
+    """
+    def __init__(self, bounds: Optional[List[float]] = None):
+        self.bounds = list(bounds or DEFAULT_BOUNDS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Percentil aproximado pelo limite superior do bucket (0 < p <= 1)."""
+        if self.count == 0:
+            return 0.0
+
+        target = p * self.count
+        accumulated = 0
+        for i, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= target:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
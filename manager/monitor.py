@@ -0,0 +1,85 @@
+from typing import Dict, List, Optional
+from components.base import BaseComponent
+from manager.metrics import Histogram
+
+import asyncio
+import io
+import time
+
+
+class LoopMonitor:
+    """
+        Mede continuamente o atraso do event loop e a saude das tasks dos componentes.
+        Um componente esta travado quando uma espera de sensor passa do tempo esperado
+        para o passo (expected_step por kind do componente). Nesse caso a pilha da task
+        que esta esperando é capturada e impressa uma unica vez.
+    """
+    def __init__(self,
+                 components: List[BaseComponent],
+                 expected_step: Dict[str, float],
+                 default_step: float = 30.0,
+                 interval: float = 0.1
+        ):
+
+        self.components = components
+        self.expected_step = expected_step
+        self.default_step = default_step
+        self.interval = interval
+        self.tasks: List[asyncio.Task] = []
+
+        self.lag_histogram = Histogram()
+        self.stalls = 0
+        self.failed_tasks = 0
+        self.last_stall = ''
+
+    def track(self, task: asyncio.Task):
+        self.tasks.append(task)
+
+    def expected_for(self, component: BaseComponent) -> float:
+        return self.expected_step.get(component.kind, self.default_step)
+
+    def _report_stall(self, component: BaseComponent, label: str, elapsed: float, task: Optional[asyncio.Task]):
+        stack = io.StringIO()
+        if task is not None:
+            task.print_stack(file=stack)
+
+        self.stalls += 1
+        self.last_stall = f'{component.kind}.{component.name} waiting {label} for {elapsed:.1f}s\n{stack.getvalue()}'
+        print(f'[Monitor]: stall detected: {self.last_stall}')
+
+    def check_components(self):
+        now = time.monotonic()
+
+        for component in self.components:
+            if component.paused:
+                continue
+
+            expected = self.expected_for(component)
+            for active_wait in list(component.active_waits.values()):
+                elapsed = now - active_wait.since
+                if elapsed > expected and not active_wait.reported:
+                    active_wait.reported = True
+                    self._report_stall(component, active_wait.label, elapsed, active_wait.task)
+
+    def check_tasks(self):
+        for task in list(self.tasks):
+            if not task.done():
+                continue
+
+            self.tasks.remove(task)
+            if not task.cancelled() and task.exception() is not None:
+                self.failed_tasks += 1
+                print(f'[Monitor]: task {task.get_name()} failed: {task.exception()!r}')
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+
+            # tudo que passou do intervalo foi tempo em que o loop estava ocupado com outra coisa
+            self.lag_histogram.observe(max(0.0, loop.time() - start - self.interval))
+
+            self.check_components()
+            self.check_tasks()
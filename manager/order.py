@@ -1,42 +1,175 @@
-from typing import Tuple
+from typing import Optional, Tuple
 from asyncua import uamethod, ua
 from components.base import BoxType
-from components.order import Order, CoverType
+from components.order import Order, OrderState, CoverType
+from manager.admission import AdmissionDecision
+from manager.order_table import OrderTable
+from manager.jobs import JobQueue
+from datetime import datetime, timezone
 
 import asyncio
 
 
 class ProcessOrder:
 	def __init__(self,
-		order_queue_green: asyncio.Queue[Order], 
-		order_queue_blue: asyncio.Queue[Order], 
-		order_queue_metal: asyncio.Queue[Order]
+		order_queue_green: JobQueue,
+		order_queue_blue: JobQueue,
+		order_queue_metal: JobQueue,
+		recorder=None,
+		orders: OrderTable = None,
+		namespace_index: int = 0
 	):
 		self.order_queue_green = order_queue_green
 		self.order_queue_blue = order_queue_blue
 		self.order_queue_metal = order_queue_metal
 		self.order_id = 1
-		
-	async def handle_new_order(
-		self, parent,  box_type: BoxType, quantity: int, cover: bool, delivery: bool) -> Tuple[ua.Variant, ua.Variant]:
-		
-		# Cria o pedido
+		self.recorder = recorder
+		self.namespace_index = namespace_index
+		self.orders = orders
+
+		# manager.admission.AdmissionControl, None aceita tudo
+		self.admission = None
+
+		# manager.slotting.RackSlotting, recebe a demanda por tipo/tampa
+		self.slotting = None
+
+	def create_order(self, box_type: BoxType, quantity: int, cover: bool, delivery: bool,
+			priority: int = 0, due: Optional[float] = None) -> Order:
 		box_type = BoxType(box_type)
 		cover_type = CoverType.WITH_COVER if cover else CoverType.NO_COVER
-		order: Order = Order(self.order_id, box_type, quantity, cover_type, delivery)
+		order: Order = Order(self.order_id, box_type, quantity, cover_type, delivery, priority, due)
 		self.order_id += 1
 
-		# Coloca o pedido na fila para o worker processar
-		if box_type == BoxType.GREEN:
+		if self.orders is not None:
+			self.orders.add(order)
+
+		if self.slotting is not None:
+			self.slotting.observe(order)
+
+		return order
+
+	async def enqueue(self, order: Order):
+		if self.recorder is not None:
+			self.recorder.order(
+				order.order_id, order.box_type.value, order.quantity, order.cover == CoverType.WITH_COVER, order.delivery, order.priority,
+				self.namespace_index)
+
+		# Coloca as caixas do pedido na fila do feeder, consumidas uma a uma
+		if order.box_type == BoxType.GREEN:
 			await self.order_queue_green.put(order)
-		elif box_type == BoxType.BLUE:
+		elif order.box_type == BoxType.BLUE:
 			await self.order_queue_blue.put(order)
-		elif box_type == BoxType.METAL:
+		elif order.box_type == BoxType.METAL:
 			await self.order_queue_metal.put(order)
 
 		print(f"[Method] Order received and enqueue: {order}")
 
+	async def handle_new_order(
+		self, parent,  box_type: BoxType, quantity: int, cover: bool, delivery: bool) -> Tuple[ua.Variant, ...]:
+
+		return await self.new_order(box_type, quantity, cover, delivery)
+
+	async def handle_priority_order(
+		self, parent, box_type: BoxType, quantity: int, cover: bool, delivery: bool,
+		priority: int, due: Optional[datetime]) -> Tuple[ua.Variant, ...]:
+		"""Como CreateOrder, com prioridade (maior passa na frente) e prazo; prazo vazio usa a hora da chegada."""
+		due_time = None
+		if due is not None and due.year > 1601:
+			due_time = (due if due.tzinfo else due.replace(tzinfo=timezone.utc)).timestamp()
+
+		return await self.new_order(box_type, quantity, cover, delivery, priority, due_time)
+
+	async def new_order(
+		self, box_type: BoxType, quantity: int, cover: bool, delivery: bool,
+		priority: int = 0, due: Optional[float] = None) -> Tuple[ua.Variant, ...]:
+
+		# quantidade 0 nunca completaria a ordem e negativa nao cabe no arquivo de ordens
+		if quantity < 1:
+			now = datetime.now(timezone.utc)
+			print(f"[Method] Order rejected: invalid quantity {quantity}")
+			return self._result(False, f"Invalid quantity {quantity}, must be at least 1.", now, now)
+
+		# Cria o pedido
+		order = self.create_order(box_type, quantity, cover, delivery, priority, due)
+		box_type = order.box_type
+
+		if self.admission is None:
+			await self.enqueue(order)
+			now = datetime.now(timezone.utc)
+			return self._result(True, f"Order {order.order_id} received for {quantity}x type {box_type.name}.", now, now)
+
+		# admissao: estima inicio/fim e recusa ou segura ordens alem do horizonte / capacidade do rack
+		decision, estimate, reason = self.admission.admit(order)
+		start = datetime.fromtimestamp(estimate.start, timezone.utc)
+		finish = datetime.fromtimestamp(estimate.finish, timezone.utc)
+
+		if decision == AdmissionDecision.REJECTED:
+			print(f"[Method] Order rejected: {order}, {reason}")
+			order.set_state(OrderState.REJECTED)
+			return self._result(False, f"Order {order.order_id} rejected: {reason}.", start, finish)
+
+		if decision == AdmissionDecision.ACCEPTED:
+			await self.enqueue(order)
+
+		else:
+			print(f"[Method] Order deferred: {order}")
+
+		return self._result(True, f"Order {order.order_id} {reason}: {quantity}x type {box_type.name}.", start, finish)
+
+	def _result(self, status: bool, message: str, start: datetime, finish: datetime) -> Tuple[ua.Variant, ...]:
+		return (
+			ua.Variant(status, ua.VariantType.Boolean), 
+			ua.Variant(message, ua.VariantType.String),
+			ua.Variant(start, ua.VariantType.DateTime),
+			ua.Variant(finish, ua.VariantType.DateTime)
+		)
+
+	async def get_order_status(self, parent, order_id: int) -> Tuple[ua.Variant, ...]:
+		status = self.orders.status(order_id) if self.orders is not None else None
+		if status is None:
+			return (
+				ua.Variant(False, ua.VariantType.Boolean),
+				ua.Variant('', ua.VariantType.String),
+				ua.Variant('', ua.VariantType.String),
+				ua.Variant(0, ua.VariantType.UInt32),
+				ua.Variant(0, ua.VariantType.UInt32),
+				ua.Variant(datetime.fromtimestamp(0, timezone.utc), ua.VariantType.DateTime)
+			)
+
+		state, box_type, boxes_done, quantity, updated_at = status
 		return (
-			ua.Variant(True, ua.VariantType.Boolean), 
-			ua.Variant(f"Order received for {quantity}x type {box_type.name} received.", ua.VariantType.String)
+			ua.Variant(True, ua.VariantType.Boolean),
+			ua.Variant(state.name, ua.VariantType.String),
+			ua.Variant(box_type.name, ua.VariantType.String),
+			ua.Variant(boxes_done, ua.VariantType.UInt32),
+			ua.Variant(quantity, ua.VariantType.UInt32),
+			ua.Variant(datetime.fromtimestamp(updated_at, timezone.utc), ua.VariantType.DateTime)
 		)
+
+	async def list_orders(self, parent, state: str, limit: int) -> Tuple[ua.Variant, ...]:
+		"""Ordens mais recentes primeiro, state vazio lista todas."""
+		orders = []
+		if self.orders is not None:
+			filter_state = None
+			if state:
+				if state.upper() not in OrderState.__members__:
+					raise ua.UaStatusCodeError(ua.StatusCodes.BadInvalidArgument)
+
+				filter_state = OrderState[state.upper()]
+
+			orders = self.orders.list(filter_state, limit)
+
+		return (
+			ua.Variant([order.order_id for order in orders], ua.VariantType.UInt32),
+			ua.Variant([order.state.name for order in orders], ua.VariantType.String)
+		)
+
+	async def run(self, period: float = 1.0):
+		"""Libera as ordens retidas pela admissao quando passam a caber no horizonte."""
+		while True:
+			await asyncio.sleep(period)
+			if self.admission is None:
+				continue
+
+			for order in self.admission.release():
+				await self.enqueue(order)
@@ -0,0 +1,159 @@
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from asyncua import Node, ua
+from collections import deque
+from components.base import BoxType, make_node_id
+from components.order import Order, OrderState, BoxRecord
+from manager.archive import ColumnArchive
+
+import asyncio
+import sys
+
+
+FINAL_STATES = (OrderState.COMPLETED, OrderState.REJECTED)
+
+
+class OrderTable:
+    """
+        Tabela das ordens em memoria, indexada por id e por estado. Ordens em andamento
+        ficam sempre na tabela, das finalizadas (concluidas ou recusadas) so as 'retention'
+        mais recentes sao mantidas como objetos; as mais antigas e os registros das caixas
+        concluidas vao para arquivos colunares com orcamento de memoria fixo.
+
+        Recebe as transicoes de estado e as caixas concluidas das proprias ordens
+        (order.listener) e publica eventos OPC UA, fora do caminho de controle: os
+        eventos sao enfileirados e emitidos pela task run().
+    """
+    def __init__(self, retention: int = 1000, archive_budget: int = 4 * 1024 * 1024):
+        self.retention = retention
+        self.orders: Dict[int, Order] = {}
+        self.by_state: Dict[OrderState, Set[int]] = {state: set() for state in OrderState}
+        self.finished: Deque[int] = deque()
+
+        # 3/4 do orcamento para as caixas, 1/4 para as ordens
+        self.box_archive = ColumnArchive([
+            ('order_id', 'I'), ('seq', 'H'), ('box_type', 'B'), ('delivery', 'B'),
+            ('started_at', 'd'), ('finished_at', 'd'),
+        ], archive_budget * 3 // 4)
+
+        self.order_archive = ColumnArchive([
+            ('order_id', 'I'), ('box_type', 'B'), ('cover', 'B'), ('delivery', 'B'), ('state', 'B'),
+            ('quantity', 'H'), ('boxes_done', 'H'), ('created_at', 'd'), ('updated_at', 'd'),
+        ], archive_budget // 4)
+
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._state_event = None
+        self._box_event = None
+
+    async def build(self, server, namespace_index: int, parent: Node):
+        """Cria os tipos de evento e os geradores, emitidos pelo objeto 'Orders'."""
+        idx = namespace_index
+        fields = [
+            ('OrderId', ua.VariantType.UInt32),
+            ('State', ua.VariantType.String),
+            ('BoxType', ua.VariantType.String),
+            ('BoxesDone', ua.VariantType.UInt32),
+            ('Quantity', ua.VariantType.UInt32),
+        ]
+
+        node = await parent.add_object(make_node_id(idx, 'Orders'), ua.QualifiedName('Orders', idx))
+        state_type = await server.create_custom_event_type(idx, 'OrderStateEvent', ua.ObjectIds.BaseEventType, fields)
+        box_type = await server.create_custom_event_type(idx, 'OrderBoxEvent', ua.ObjectIds.BaseEventType, fields)
+
+        self._state_event = await server.get_event_generator(state_type, node)
+        self._box_event = await server.get_event_generator(box_type, node)
+
+    def add(self, order: Order):
+        order.listener = self
+        self.orders[order.order_id] = order
+        self.by_state[order.state].add(order.order_id)
+
+    def get(self, order_id: int) -> Optional[Order]:
+        return self.orders.get(order_id)
+
+    def status(self, order_id: int) -> Optional[Tuple[OrderState, BoxType, int, int, float]]:
+        """(estado, tipo, caixas concluidas, quantidade, ultima atualizacao), da tabela ou do arquivo."""
+        order = self.orders.get(order_id)
+        if order is not None:
+            return order.state, order.box_type, order.boxes_done, order.quantity, order.updated_at
+
+        row = self.order_archive.find_last('order_id', order_id)
+        if row is None:
+            return None
+
+        return OrderState(row['state']), BoxType(row['box_type']), row['boxes_done'], row['quantity'], row['updated_at']
+
+    def active(self) -> int:
+        """Ordens ainda nao finalizadas."""
+        return len(self.orders) - sum(len(self.by_state[state]) for state in FINAL_STATES)
+
+    def list(self, state: Optional[OrderState] = None, limit: int = 0) -> List[Order]:
+        """Ordens (mais recentes primeiro), opcionalmente filtradas por estado."""
+        ids = self.by_state[state] if state is not None else self.orders.keys()
+        ids = sorted(ids, reverse=True)
+
+        if limit:
+            ids = ids[:limit]
+
+        return [self.orders[order_id] for order_id in ids]
+
+    def on_state(self, order: Order, previous: OrderState):
+        self.by_state[previous].discard(order.order_id)
+        self.by_state[order.state].add(order.order_id)
+
+        if order.state in FINAL_STATES:
+            self.finished.append(order.order_id)
+            self._evict()
+
+        self._emit(self._state_event, order, f'Order {order.order_id}: {previous.name} -> {order.state.name}')
+
+    def on_box(self, order: Order, record: BoxRecord):
+        self.box_archive.append(
+            record.order_id, record.seq, record._box_type, record.delivery, record.started_at, record.finished_at)
+
+        self._emit(self._box_event, order, f'Order {order.order_id}: box {order.boxes_done}/{order.quantity} done')
+
+    def _emit(self, generator, order: Order, message: str):
+        # copia os campos agora, a ordem continua mudando ate o evento sair
+        if generator is not None:
+            fields = (order.order_id, order.state.name, order.box_type.name, order.boxes_done, order.quantity)
+            self._events.put_nowait((generator, fields, message))
+
+    def _evict(self):
+        while len(self.finished) > self.retention:
+            order = self.orders.pop(self.finished.popleft(), None)
+            if order is not None:
+                self.by_state[order.state].discard(order.order_id)
+                order.listener = None
+
+                self.order_archive.append(
+                    order.order_id, order._box_type, order._cover, order.delivery, order._state,
+                    order.quantity, order.boxes_done, order.created_at, order.updated_at)
+
+    def memory_report(self) -> Dict[str, float]:
+        """Memoria das ordens mantidas como objeto e dos arquivos colunares."""
+        live_bytes = 0
+        for order in self.orders.values():
+            live_bytes += sys.getsizeof(order)
+            if order.in_flight:
+                live_bytes += sys.getsizeof(order.in_flight) + sum(sys.getsizeof(record) for record in order.in_flight)
+
+        live = len(self.orders)
+        return {
+            'live_orders': live,
+            'live_bytes': live_bytes,
+            'bytes_per_live_order': live_bytes / live if live else 0.0,
+            'archived_orders': len(self.order_archive),
+            'bytes_per_archived_order': self.order_archive.row_bytes,
+            'archived_boxes': len(self.box_archive),
+            'bytes_per_archived_box': self.box_archive.row_bytes,
+            'archive_bytes': self.order_archive.nbytes + self.box_archive.nbytes,
+        }
+
+    async def run(self):
+        while True:
+            generator, fields, message = await self._events.get()
+
+            event = generator.event
+            event.OrderId, event.State, event.BoxType, event.BoxesDone, event.Quantity = fields
+
+            await generator.trigger(message=message)
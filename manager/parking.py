@@ -0,0 +1,89 @@
+from typing import Dict, Optional, Tuple
+from components.order import CoverType, Order, OrderState
+from manager.order_table import OrderTable
+from enum import Enum, auto
+
+import time
+
+
+class ParkingPolicy(Enum):
+    FIXED = auto()          # posicao fixa de idle do handler (idle_position)
+    LAST = auto()           # home da ultima entrada atendida
+    PREDICTIVE = auto()     # home da entrada que deve entregar a proxima caixa
+
+
+# ordens que ainda podem mandar caixas para o rack
+ACTIVE_STATES = (OrderState.WAIT, OrderState.PRODUCTION, OrderState.STORAGE)
+
+
+class HandlerParking:
+    """
+        Onde o handler ocioso espera. Caixas de storage sem tampa chegam pela entrada A
+        (TurnTable2, home 8) e com tampa pela entrada B (TurnTable3, home 1).
+
+        No modo PREDICTIVE a previsao olha as caixas ja na linha (in_flight das ordens ativas):
+        chegada estimada = saida do feeder + tempo de transito da rota, aprendido das caixas
+        que ja chegaram (media movel). Sem caixas na linha vale a proxima ordem a produzir,
+        na mesma ordem das filas dos feeders; sem nenhuma, a home da ultima entrada.
+    """
+    def __init__(self, policy: ParkingPolicy, orders: OrderTable, home_a: int = 8, home_b: int = 1, alpha: float = 0.2):
+        self.policy = policy
+        self.orders = orders
+        self.home_a = home_a
+        self.home_b = home_b
+        self.alpha = alpha
+
+        # tempo de transito (s) feeder -> handler por home, 0 ate a primeira caixa
+        self.transit: Dict[int, float] = {home_a: 0.0, home_b: 0.0}
+        self.parks = 0
+        self.hits = 0
+        self.misses = 0
+
+    def home(self, order: Order) -> int:
+        return self.home_b if order.cover == CoverType.WITH_COVER else self.home_a
+
+    def arrived(self, home: int, order: Order, parked_at: Optional[int]):
+        """Caixa da ordem chegou na entrada 'home'; parked_at é onde o handler estava estacionado (None se nao estava)."""
+        if order.in_flight:
+            transit = time.time() - order.in_flight[0].started_at
+            self.transit[home] += self.alpha * (transit - self.transit[home]) if self.transit[home] else transit
+
+        if parked_at is None:
+            return
+
+        if parked_at == home:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def predict(self) -> Optional[int]:
+        """Home da entrada que deve entregar a proxima caixa de storage, None sem ordens de storage."""
+        best: Optional[Tuple[tuple, int]] = None
+
+        for state in ACTIVE_STATES:
+            for order_id in self.orders.by_state[state]:
+                order = self.orders.orders[order_id]
+                if order.delivery:
+                    continue
+
+                home = self.home(order)
+                if order.in_flight:
+                    key = (0, order.in_flight[0].started_at + self.transit[home])
+
+                elif order.boxes_started < order.quantity:
+                    key = (1, -order.priority, order.due)
+
+                else:
+                    continue
+
+                if best is None or key < best[0]:
+                    best = (key, home)
+
+        return best[1] if best is not None else None
+
+    def position(self, idle_position: int, last_home: int) -> int:
+        if self.policy == ParkingPolicy.FIXED:
+            return idle_position
+
+        home = self.predict() if self.policy == ParkingPolicy.PREDICTIVE else None
+        return home if home is not None else last_home
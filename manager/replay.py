@@ -0,0 +1,224 @@
+from typing import Dict, List, Optional
+from asyncua.ua import NodeId
+from components.base import BaseComponent
+from manager.line import Line, LineSettings
+from manager.timing import TimingProfile
+from manager.trace import RecordKind, TraceRecord, read_trace, actuator_sequence
+from simulation.fake_server import FakeServer
+
+import argparse
+import asyncio
+import sys
+
+
+class ReplayCapture:
+    """Recorder usado durante o replay, guarda apenas as escritas dos atuadores."""
+    def __init__(self):
+        self.actuators: Dict[str, List[int]] = {}
+
+    def sensor(self, node_id: NodeId, value: int):
+        pass
+
+    def actuator(self, node_id: NodeId, value: int):
+        self.actuators.setdefault(node_id.to_string(), []).append(int(value))
+
+    def order(self, *args, **kwargs):
+        pass
+
+    def line(self, *args, **kwargs):
+        pass
+
+
+class ReplayTiming(TimingProfile):
+    """Perfil de tempos do replay, as duracoes medidas no relogio acelerado voltam para o relogio da planta."""
+    def __init__(self, speed: float, **params):
+        super().__init__(None, **params)
+        self.speed = speed
+
+    def observe(self, key: str, seconds: float):
+        super().observe(key, seconds * self.speed)
+
+
+class Divergence:
+    def __init__(self, node_id: str, index: int, expected: Optional[int], replayed: Optional[int]):
+        self.node_id = node_id
+        self.index = index
+        self.expected = expected
+        self.replayed = replayed
+
+    def __repr__(self):
+        return f'{self.node_id} write #{self.index}: recorded={self.expected} replayed={self.replayed}'
+
+
+def compare(recorded: Dict[str, List[int]], replayed: Dict[str, List[int]]) -> List[Divergence]:
+    """Primeira escrita diferente de cada atuador (ou a primeira que falta / sobra)."""
+    divergences = []
+
+    for node_id in sorted(set(recorded) | set(replayed)):
+        expected = recorded.get(node_id, [])
+        actual = replayed.get(node_id, [])
+
+        for index in range(max(len(expected), len(actual))):
+            a = expected[index] if index < len(expected) else None
+            b = actual[index] if index < len(actual) else None
+            if a != b:
+                divergences.append(Divergence(node_id, index, a, b))
+                break
+
+    return divergences
+
+
+class ReplayDriver:
+    """
+        Reproduz um trace gravado contra o servidor fake: monta as mesmas linhas, injeta as
+        ordens e as notificacoes de sensor nos tempos gravados divididos por speed e compara
+        as escritas dos atuadores com as gravadas. Os tempos fixos dos componentes sao
+        acelerados pelo mesmo fator (BaseComponent.time_scale).
+
+        Cada registro LINE vira uma linha no mesmo namespace, com os ajustes e o perfil de
+        tempos gravados. Traces da versao 1 nao tem esses registros e sao reproduzidos com uma
+        linha padrao, desde que tenham um unico namespace. ValueError para traces que o replay
+        nao reproduz: IO de namespace sem linha, ajustes diferentes entre sessoes ou watchdog
+        ligado (as recuperacoes dele nao ficam no trace).
+    """
+    def __init__(self, records: List[TraceRecord], speed: float = 10.0, settle: float = 1.0):
+        self.records = records
+        self.speed = speed
+        self.settle = settle
+        self.capture = ReplayCapture()
+
+    @classmethod
+    def from_file(cls, path: str, speed: float = 10.0, settle: float = 1.0) -> 'ReplayDriver':
+        return cls(list(read_trace(path)), speed, settle)
+
+    def lines(self) -> Dict[int, Dict]:
+        """Registro LINE gravado de cada namespace, ValueError se o trace nao pode ser reproduzido."""
+        lines: Dict[int, Dict] = {}
+        for record in self.records:
+            if record.kind == RecordKind.LINE and lines.setdefault(record.value, record.line) != record.line:
+                raise ValueError(f'namespace {record.value} was recorded with different line settings in two sessions')
+
+        namespaces = {NodeId.from_string(record.node_id).NamespaceIndex for record in self.records if record.node_id is not None}
+        if not lines:
+            if len(namespaces) > 1:
+                raise ValueError(f'trace without line records has IO from namespaces {sorted(namespaces)}')
+
+            idx = namespaces.pop() if namespaces else 2
+            return {idx: {'name': 'Line', 'settings': {}, 'timing': None, 'watchdog': False}}
+
+        missing = namespaces - set(lines)
+        if missing:
+            raise ValueError(f'trace has IO from namespaces without a line record: {sorted(missing)}')
+
+        for info in lines.values():
+            if info['watchdog']:
+                raise ValueError(f'line {info["name"]} was recorded with the watchdog on, its recoveries are not in the trace')
+
+        return lines
+
+    def timing(self, lines: Dict[int, Dict]) -> Optional[ReplayTiming]:
+        """Perfil de tempos de todas as linhas como estava no inicio da gravacao, None se estava desligado."""
+        snapshots = [info['timing'] for info in lines.values()]
+        if all(snapshot is None for snapshot in snapshots):
+            return None
+
+        params = [{key: value for key, value in snapshot.items() if key != 'entries'} for snapshot in snapshots if snapshot is not None]
+        if len(snapshots) != len(params) or any(other != params[0] for other in params):
+            raise ValueError('lines were recorded with different timing profiles')
+
+        timing = ReplayTiming(self.speed, **params[0])
+        for snapshot in snapshots:
+            timing.restore(snapshot['entries'])
+
+        return timing
+
+    async def run(self) -> List[Divergence]:
+        recorded = self.lines()
+        server = FakeServer()
+        while len(server.namespaces) <= max(recorded):
+            server.register_namespace(f'urn:fake:replay:{len(server.namespaces)}')
+
+        # o perfil de tempos gravado reproduz os dwell adaptados, o watchdog nao entra no replay
+        previous = BaseComponent.time_scale, BaseComponent.recorder, BaseComponent.timing, BaseComponent.watchdog
+        BaseComponent.time_scale = 1.0 / self.speed
+        BaseComponent.recorder = self.capture
+        BaseComponent.timing = self.timing(recorded)
+        BaseComponent.watchdog = None
+
+        lines: Dict[int, Line] = {}
+        for idx, info in sorted(recorded.items()):
+            line = Line(server, idx, server.get_objects_node(), LineSettings.from_dict(info['settings']), name=info['name'])
+            await line.build()
+            line.start_tasks()
+            lines[idx] = line
+
+        # ordens da versao 1 nao tem namespace, vao para a unica linha
+        default = next(iter(lines.values()))
+
+        try:
+            await asyncio.sleep(0)
+            for line in lines.values():
+                line.start()
+
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+
+            for record in self.records:
+                delay = start + record.timestamp / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                if record.kind == RecordKind.SENSOR:
+                    server.set_sensor(record.node_id, record.value)
+
+                elif record.kind == RecordKind.ORDER:
+                    # as ordens gravadas ja passaram pela admissao, entram direto nas filas
+                    _, box_type, quantity, cover, delivery, priority = record.order
+                    line = lines.get(record.value, default)
+                    order = line.process_order.create_order(box_type, quantity, bool(cover), bool(delivery), priority)
+                    await line.process_order.enqueue(order)
+
+            # deixa a ultima sequencia terminar antes de comparar
+            await asyncio.sleep(self.settle / self.speed)
+
+        finally:
+            tasks = [task for line in lines.values() for task in line.tasks]
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+            BaseComponent.time_scale, BaseComponent.recorder, BaseComponent.timing, BaseComponent.watchdog = previous
+
+        return compare(actuator_sequence(self.records), self.capture.actuators)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reproduz um trace de IO gravado contra o servidor fake')
+    parser.add_argument('trace')
+    parser.add_argument('--speed', type=float, default=10.0, help='fator de aceleracao do tempo')
+    parser.add_argument('--settle', type=float, default=1.0, help='tempo (s, no relogio gravado) esperado depois do ultimo registro')
+    args = parser.parse_args()
+
+    driver = ReplayDriver.from_file(args.trace, args.speed, args.settle)
+    try:
+        divergences = asyncio.run(driver.run())
+
+    except ValueError as error:
+        print(f'cannot replay {args.trace}: {error}')
+        return 2
+
+    writes = sum(len(values) for values in driver.capture.actuators.values())
+    print(f'{len(driver.records)} records replayed at {args.speed}x, {writes} actuator writes')
+
+    if not divergences:
+        print('no divergences')
+        return 0
+
+    for divergence in divergences:
+        print(f'divergence: {divergence}')
+
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
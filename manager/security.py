@@ -0,0 +1,143 @@
+from typing import Dict, List, Tuple
+from dataclasses import dataclass, field
+from asyncua import Server, ua
+from asyncua.crypto.permission_rules import User, UserRole
+from asyncua.server.binary_server_asyncio import BinaryServer
+from manager.certificate import load_trusted_certificate
+from importlib.metadata import version
+from enum import Enum
+
+
+# start_endpoints usa internos do asyncua (Server._policies, Server._get_bind_socket_info e
+# BinaryServer.set_policies), conferidos com a versao fixada em requirements.txt
+ASYNCUA_VERSION = '1.1.8'
+
+
+class SecurityMode(Enum):
+    NONE = ua.SecurityPolicyType.NoSecurity
+    SIGN = ua.SecurityPolicyType.Basic256Sha256_Sign
+    SIGN_AND_ENCRYPT = ua.SecurityPolicyType.Basic256Sha256_SignAndEncrypt
+
+    @property
+    def message_mode(self) -> ua.MessageSecurityMode:
+        if self == SecurityMode.NONE:
+            return ua.MessageSecurityMode.None_
+
+        elif self == SecurityMode.SIGN:
+            return ua.MessageSecurityMode.Sign
+
+        return ua.MessageSecurityMode.SignAndEncrypt
+
+
+@dataclass
+class EndpointConfig:
+    """
+        Um endpoint (porta) do servidor com os modos de seguranca aceitos.
+        users: lista de (certificado, nome) dos clientes confiaveis desse endpoint
+        anonymous: aceita clientes sem certificado (apenas faz sentido com SecurityMode.NONE)
+    """
+    port: int
+    modes: List[SecurityMode]
+    users: List[Tuple[str, str]] = field(default_factory=list)
+    anonymous: bool = False
+
+    def url(self, host: str = '0.0.0.0') -> str:
+        return f'opc.tcp://{host}:{self.port}'
+
+
+class EndpointUserManager:
+    """
+        Gerencia os usuarios de todos os endpoints.
+        Canais sem seguranca nao tem certificado, entao sao aceitos somente se algum endpoint
+        SecurityMode.NONE permitir anonimos. Canais assinados precisam de um certificado conhecido,
+        a nao ser que nenhum usuario tenha sido configurado.
+
+        O asyncua tem um unico user manager e o get_user nao recebe o canal, entao a lista de
+        usuarios é a uniao dos endpoints: um cliente confiavel em um endpoint é aceito em todos
+        os endpoints cujos modos ele consiga negociar.
+    """
+    def __init__(self, endpoints: List[EndpointConfig]):
+        self.endpoints = endpoints
+        self.allow_anonymous = any(ep.anonymous and SecurityMode.NONE in ep.modes for ep in endpoints)
+        self._trusted_certificates: Dict[bytes, User] = {}
+
+    async def load(self):
+        for endpoint in self.endpoints:
+            for certificate_path, name in endpoint.users:
+                certificate = load_trusted_certificate(certificate_path)
+                self._trusted_certificates[certificate] = User(role=UserRole.User, name=name)
+
+    def get_user(self, iserver, username=None, password=None, certificate=None):
+        if not certificate:
+            return User(role=UserRole.User, name='anonymous') if self.allow_anonymous else None
+
+        if not self._trusted_certificates:
+            return User(role=UserRole.User)
+
+        return self._trusted_certificates.get(certificate)
+
+
+def configure_endpoints(server: Server, endpoints: List[EndpointConfig]):
+    """
+        Configura o endpoint principal (primeiro da lista) com a uniao dos modos de todos os endpoints,
+        assim o servidor cria as politicas de seguranca de todos eles. Deve ser chamado antes de server.start().
+    """
+    modes: List[SecurityMode] = []
+    for endpoint in endpoints:
+        for mode in endpoint.modes:
+            if mode not in modes:
+                modes.append(mode)
+
+    server.set_endpoint(endpoints[0].url())
+    server.set_security_policy([mode.value for mode in modes])
+
+    # o usuario é identificado pelo certificado do canal, token anonimo continua aceito
+    server.set_identity_tokens([ua.AnonymousIdentityToken, ua.X509IdentityToken])
+
+
+def _check_internals(server: Server):
+    installed = version('asyncua')
+    missing = [name for name in ('_policies', '_get_bind_socket_info') if not hasattr(server, name)]
+    if not hasattr(BinaryServer, 'set_policies'):
+        missing.append('BinaryServer.set_policies')
+
+    if missing:
+        raise RuntimeError(f'asyncua {installed} does not provide {missing}, '
+                           f'multiple endpoints require asyncua=={ASYNCUA_VERSION}')
+
+    if installed != ASYNCUA_VERSION:
+        print(f'[Security]: asyncua {installed} installed, endpoints were checked with {ASYNCUA_VERSION}')
+
+
+def _policies_for(server: Server, endpoint: EndpointConfig) -> list:
+    message_modes = {mode.message_mode for mode in endpoint.modes}
+    return [policy for policy in server._policies if policy.mode in message_modes]
+
+
+async def start_endpoints(server: Server, endpoints: List[EndpointConfig]) -> List[BinaryServer]:
+    """
+        Restringe o endpoint principal aos seus proprios modos e abre uma porta extra
+        para cada endpoint adicional, todas compartilhando o mesmo espaco de enderecamento.
+        Deve ser chamado depois de server.start().
+
+        Com um unico endpoint os modos ja sao os dele e nada disso é necessario; com mais de um
+        os internos do asyncua sao conferidos antes, para nunca deixar o endpoint principal
+        aceitando os modos (mais fracos) dos outros.
+    """
+    if len(endpoints) == 1:
+        return []
+
+    _check_internals(server)
+    server.bserver.set_policies(_policies_for(server, endpoints[0]))
+
+    listeners = []
+    for endpoint in endpoints[1:]:
+        host, _ = server._get_bind_socket_info()
+        listener = BinaryServer(server.iserver, host, endpoint.port, server.limits)
+        listener.set_policies(_policies_for(server, endpoint))
+
+        await listener.start()
+        listeners.append(listener)
+        print(f'[Security]: endpoint {endpoint.url(host)} modes: {[mode.name for mode in endpoint.modes]}')
+
+    return listeners
@@ -0,0 +1,95 @@
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+from collections import deque
+from components.base import BoxType
+from components.order import CoverType, Order
+
+import time
+
+
+# combinacao guardada no rack: (tipo da caixa, com ou sem tampa)
+SlotKey = Tuple[BoxType, CoverType]
+
+
+class RackSlotting:
+    """
+        Re-slotting do rack com o handler ocioso: as combinacoes tipo/tampa mais pedidas na
+        janela 'window' (s) ficam nas posicoes mais perto das homes (8 da entrada A e 1 da
+        entrada B), assim as retiradas nos periodos de pico andam menos.
+
+        plan() devolve um movimento por vez, (origem, destino), ou None quando nao ha o que
+        melhorar. Cada movimento poe uma caixa mais pedida numa posicao mais proxima ou tira
+        uma caixa menos pedida de uma posicao que deveria ser de outra, entao com a demanda
+        parada o plano converge. 'max_moves' limita os movimentos por periodo ocioso; 'aborted'
+        conta os movimentos interrompidos por um job antes de pegar a caixa.
+    """
+    def __init__(self, window: float = 3600.0, homes: Sequence[int] = (8, 1), max_moves: int = 4):
+        self.window = window
+        self.homes = tuple(homes)
+        self.max_moves = max_moves
+
+        self.demand: Deque[Tuple[float, SlotKey, int]] = deque()
+        self.moves = 0
+        self.aborted = 0
+
+    def observe(self, order: Order):
+        self.demand.append((time.monotonic(), (order.box_type, order.cover), order.quantity))
+
+    def _expire(self):
+        limit = time.monotonic() - self.window
+        while self.demand and self.demand[0][0] < limit:
+            self.demand.popleft()
+
+    def counts(self) -> Dict[SlotKey, int]:
+        """Caixas pedidas por combinacao na janela."""
+        self._expire()
+        counts: Dict[SlotKey, int] = {}
+        for _, key, quantity in self.demand:
+            counts[key] = counts.get(key, 0) + quantity
+
+        return counts
+
+    def distance(self, position: int) -> int:
+        """Deslocamento da posicao ate a home mais proxima."""
+        return min(abs(position - home) for home in self.homes)
+
+    def plan(self, slots: List[Optional[SlotKey]]) -> Optional[Tuple[int, int]]:
+        """Proximo movimento (posicao de origem, posicao de destino) para o rack 'slots' (posicao i + 1)."""
+        counts = self.counts()
+        if not counts:
+            return None
+
+        def demand(position: int) -> int:
+            key = slots[position - 1]
+            return -1 if key is None else counts.get(key, 0)
+
+        positions = sorted(range(1, len(slots) + 1), key=lambda position: (self.distance(position), position))
+        free = [position for position in positions if slots[position - 1] is None]
+        if not free:
+            return None
+
+        # demanda que cada posicao deveria ter: caixas da mais pedida para a menos, das posicoes mais proximas para as mais longe
+        ideal = sorted((demand(position) for position in positions if slots[position - 1] is not None), reverse=True)
+
+        for rank, position in enumerate(positions):
+            # caixas que ninguem pediu na janela nao sao movidas
+            if rank >= len(ideal) or ideal[rank] <= 0:
+                return None
+
+            if demand(position) >= ideal[rank]:
+                continue
+
+            # a caixa mais pedida entre as posicoes mais longe vem para ca
+            source = max(positions[rank + 1:], key=demand)
+            if slots[position - 1] is None:
+                return source, position
+
+            # posicao ocupada por uma caixa menos pedida: ela vai para a primeira posicao livre
+            # a partir da que seria dela, assim nao precisa ser movida de novo
+            if demand(position) <= 0:
+                return position, free[-1]
+
+            start = max(rank + 1, ideal.index(demand(position)))
+            target = next((other for other in positions[start:] if slots[other - 1] is None), free[-1])
+            return position, target
+
+        return None
@@ -0,0 +1,93 @@
+from typing import Dict, List, Optional, Tuple
+from asyncua import Node, ua
+from components.base import BaseComponent, make_node_id
+
+import asyncio
+import struct
+
+
+class LineSnapshot:
+    """
+        Estado da linha inteira em uma unica variavel ByteString, assim um cliente acompanha
+        a linha com uma so subscription em vez de uma por sinal:
+
+            bits do IO booleano (bit i = sinal i, LSB primeiro) | posicao do handler (int16) | profundidade das filas (uint16 cada)
+
+        A ordem dos sinais e das filas é publicada uma vez em 'LineSnapshot.Layout'.
+        A cada ciclo o snapshot é remontado e so é escrito quando mudou.
+    """
+    def __init__(self,
+                 namespace_index: int,
+                 parent: Node,
+                 components: List[BaseComponent],
+                 position: Node,
+                 queues: Dict[str, asyncio.Queue],
+                 period: float = 0.1
+        ):
+
+        self.namespace_index = namespace_index
+        self.parent = parent
+        self.position = position
+        self.queues = queues
+        self.period = period
+
+        self.io: List[Tuple[str, Node]] = [entry for component in components for entry in component.io]
+        self.readers = [component.bindings[node.nodeid] for component in components for _, node in component.io]
+        self.position_reader = next(
+            (component.bindings[position.nodeid] for component in components if position.nodeid in component.bindings), None)
+        self._tail = struct.Struct(f'<h{len(queues)}H')
+
+        self.node: Node = None
+        self.last: Optional[bytes] = None
+        self.updates = 0
+
+    @property
+    def layout(self) -> List[str]:
+        return [name for name, _ in self.io] + ['Handler.Position'] + [f'Queue.{name}' for name in self.queues]
+
+    async def build(self):
+        idx = self.namespace_index
+        self.node = await self.parent.add_variable(
+            make_node_id(idx, 'LineSnapshot'), ua.QualifiedName('LineSnapshot', idx), ua.Variant(b'', ua.VariantType.ByteString))
+
+        await self.parent.add_variable(
+            make_node_id(idx, 'LineSnapshot', 'Layout'), ua.QualifiedName('LineSnapshot.Layout', idx),
+            ua.Variant(self.layout, ua.VariantType.String))
+
+    async def pack(self) -> bytes:
+        bits = 0
+        for i, reader in enumerate(self.readers):
+            if await reader.read():
+                bits |= 1 << i
+
+        if self.position_reader is not None:
+            position = await self.position_reader.read()
+        else:
+            position = await self.position.read_value()
+        depths = [min(queue.qsize(), 0xFFFF) for queue in self.queues.values()]
+
+        return bits.to_bytes((len(self.io) + 7) // 8, 'little') + self._tail.pack(position, *depths)
+
+    def unpack(self, data: bytes) -> Dict[str, int]:
+        """Decodifica um snapshot no mesmo formato do layout, usado por clientes Python e testes manuais."""
+        size = (len(self.io) + 7) // 8
+        bits = int.from_bytes(data[:size], 'little')
+        tail = self._tail.unpack(data[size:])
+
+        values = {name: (bits >> i) & 1 for i, (name, _) in enumerate(self.io)}
+        values.update(zip(self.layout[len(self.io):], tail))
+        return values
+
+    async def publish(self):
+        data = await self.pack()
+        if data == self.last:
+            return
+
+        self.last = data
+        self.updates += 1
+        await self.node.write_value(ua.Variant(data, ua.VariantType.ByteString))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.period)
+            await self.publish()
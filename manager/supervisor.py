@@ -0,0 +1,116 @@
+from typing import Callable, Dict, List, Optional, Union
+from dataclasses import dataclass, replace
+from enum import Enum, auto
+from pathlib import Path
+from manager.security import EndpointConfig
+
+import multiprocessing
+import multiprocessing.connection
+import time
+
+
+@dataclass
+class LineConfig:
+    """
+        Uma linha (celula) supervisionada.
+        port_offset: somado as portas dos endpoints quando a linha roda no proprio processo
+    """
+    name: str
+    port_offset: int = 0
+
+
+class LineMode(Enum):
+    SHARED = auto()     # todas as linhas no mesmo processo e servidor, um namespace por linha
+    PROCESS = auto()    # um processo por linha, cada um com o proprio servidor e endpoints
+
+
+# alvo executado em cada processo: (linhas, endpoints, tag), tag separa os arquivos de cada processo
+ServeFn = Callable[[List[LineConfig], List[EndpointConfig], Optional[str]], None]
+
+
+def line_endpoints(endpoints: List[EndpointConfig], line: LineConfig) -> List[EndpointConfig]:
+    return [replace(endpoint, port=endpoint.port + line.port_offset) for endpoint in endpoints]
+
+
+def line_path(path: Optional[Union[str, Path]], tag: Optional[str]) -> Optional[Path]:
+    """Arquivo proprio de um processo, ex: traces/line.fiot -> traces/line.Cell2.fiot"""
+    if path is None:
+        return None
+
+    path = Path(path)
+    if tag is None:
+        return path
+
+    return path.with_name(f'{path.stem}.{tag}{path.suffix}')
+
+
+class Supervisor:
+    """
+        Executa as linhas configuradas. No modo SHARED todas as linhas rodam no processo atual,
+        em um unico servidor. No modo PROCESS cada linha roda em um processo separado com os
+        endpoints deslocados por port_offset; um processo que termina com erro é reiniciado
+        depois de restart_delay.
+    """
+    def __init__(self,
+                 lines: List[LineConfig],
+                 endpoints: List[EndpointConfig],
+                 mode: LineMode,
+                 serve: ServeFn,
+                 restart_delay: float = 5.0
+        ):
+
+        names = [line.name for line in lines]
+        if not lines or len(set(names)) != len(names):
+            raise ValueError(f'line names must be unique and not empty: {names}')
+
+        if mode == LineMode.PROCESS:
+            ports = [endpoint.port for line in lines for endpoint in line_endpoints(endpoints, line)]
+            if len(set(ports)) != len(ports):
+                raise ValueError(f'endpoint ports overlap between lines: {ports}')
+
+        self.lines = lines
+        self.endpoints = endpoints
+        self.mode = mode
+        self.serve = serve
+        self.restart_delay = restart_delay
+        self.processes: Dict[str, multiprocessing.Process] = {}
+        self.restarts = 0
+
+    def _spawn(self, line: LineConfig) -> multiprocessing.Process:
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(
+            target=self.serve, args=([line], line_endpoints(self.endpoints, line), line.name), name=line.name)
+
+        process.start()
+        print(f'[Supervisor]: line {line.name} started, pid {process.pid}')
+        return process
+
+    def run(self):
+        if self.mode == LineMode.SHARED:
+            self.serve(self.lines, self.endpoints, None)
+            return
+
+        lines = {line.name: line for line in self.lines}
+        self.processes = {name: self._spawn(line) for name, line in lines.items()}
+
+        try:
+            while self.processes:
+                sentinels = {process.sentinel: name for name, process in self.processes.items()}
+                for sentinel in multiprocessing.connection.wait(list(sentinels)):
+                    name = sentinels[sentinel]
+                    process = self.processes.pop(name)
+                    process.join()
+
+                    if process.exitcode == 0:
+                        print(f'[Supervisor]: line {name} finished')
+                        continue
+
+                    print(f'[Supervisor]: line {name} exited with code {process.exitcode}, restarting')
+                    time.sleep(self.restart_delay)
+                    self.restarts += 1
+                    self.processes[name] = self._spawn(lines[name])
+
+        finally:
+            for process in self.processes.values():
+                process.terminate()
+                process.join()
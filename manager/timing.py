@@ -0,0 +1,118 @@
+from typing import Deque, Dict, Optional, Union
+from collections import deque
+from pathlib import Path
+
+import asyncio
+import json
+
+
+class TimingProfile:
+    """
+        Perfil de tempos da planta. Guarda as duracoes observadas entre o comando e a borda
+        de sensor que confirma o movimento, por componente, sinal e BoxType.
+
+        Os tempos fixos (dwell) depois de um movimento confirmado sao escalados pela
+        velocidade atual desse movimento: quando uma chave junta min_samples amostras, o
+        percentil delas vira o baseline (o tempo do movimento quando as constantes foram
+        ajustadas). Enquanto o percentil atual ficar dentro de 'margin' do baseline a planta
+        nao mudou e vale o default; fora disso o dwell é default * percentil / baseline,
+        nunca abaixo de floor. Amostras e baselines sao persistidos em JSON entre execucoes.
+    """
+    def __init__(self,
+                 path: Optional[Union[str, Path]] = None,
+                 percentile: float = 0.9,
+                 margin: float = 0.1,
+                 floor: float = 0.05,
+                 min_samples: int = 10,
+                 window: int = 200
+        ):
+
+        self.path = Path(path) if path is not None else None
+        self.percentile = percentile
+        self.margin = margin
+        self.floor = floor
+        self.min_samples = min_samples
+        self.window = window
+
+        self.samples: Dict[str, Deque[float]] = {}
+        self.baselines: Dict[str, float] = {}
+        self._dirty = False
+
+    def observe(self, key: str, seconds: float):
+        samples = self.samples.get(key)
+        if samples is None:
+            samples = self.samples[key] = deque(maxlen=self.window)
+
+        samples.append(seconds)
+        self._dirty = True
+
+        if key not in self.baselines and len(samples) >= self.min_samples:
+            self.baselines[key] = self.quantile(key)
+
+    def quantile(self, key: str, p: Optional[float] = None) -> Optional[float]:
+        samples = self.samples.get(key)
+        if not samples:
+            return None
+
+        ordered = sorted(samples)
+        p = self.percentile if p is None else p
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def dwell(self, key: str, default: float) -> float:
+        """Tempo de espera adaptado para a chave, ou o default enquanto nao houver baseline."""
+        baseline = self.baselines.get(key)
+        if not baseline:
+            return default
+
+        scale = self.quantile(key) / baseline
+        if abs(scale - 1.0) <= self.margin:
+            return default
+
+        return max(self.floor, default * scale)
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        self.restore(json.loads(self.path.read_text()))
+
+    def restore(self, data: Dict):
+        for key, entry in data.items():
+            self.samples[key] = deque(entry.get('samples', []), maxlen=self.window)
+            if entry.get('baseline'):
+                self.baselines[key] = entry['baseline']
+
+    def entries(self, prefix: str = '') -> Dict:
+        """Amostras e baseline das chaves que comecam com prefix, no formato do arquivo."""
+        return {
+            key: {'baseline': self.baselines.get(key), 'samples': list(samples)}
+            for key, samples in self.samples.items() if key.startswith(prefix)
+        }
+
+    def snapshot(self, prefix: str = '') -> Dict:
+        """Parametros e entradas das chaves com o prefixo, gravados no trace para o replay."""
+        return {
+            'percentile': self.percentile,
+            'margin': self.margin,
+            'floor': self.floor,
+            'min_samples': self.min_samples,
+            'window': self.window,
+            'entries': self.entries(prefix),
+        }
+
+    def save(self):
+        if self.path is None or not self._dirty:
+            return
+
+        data = self.entries()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(data, indent=1, sort_keys=True))
+        tmp.replace(self.path)
+        self._dirty = False
+
+    async def run(self, period: float = 60.0):
+        while True:
+            await asyncio.sleep(period)
+            self.save()
@@ -0,0 +1,184 @@
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+from asyncua.ua import NodeId
+from enum import IntEnum
+
+import json
+import struct
+import time
+
+
+MAGIC = b'FIOT'
+VERSION = 2
+
+
+class RecordKind(IntEnum):
+    NODE = 0        # define o indice de um NodeId
+    SENSOR = 1      # notificacao de sensor
+    ACTUATOR = 2    # escrita de atuador
+    ORDER = 3       # nova ordem de producao
+    LINE = 4        # namespace, nome e ajustes de uma linha, gravado no build
+
+
+HEADER = struct.Struct('<4sBd')             # magic, versao, epoch do inicio
+KIND = struct.Struct('<B')
+NODE = struct.Struct('<HH')                 # indice, tamanho do NodeId em bytes
+VALUE = struct.Struct('<dHi')               # tempo relativo, indice do node, valor
+ORDER = struct.Struct('<dHIBHBBB')          # tempo relativo, namespace, id, box type, quantidade, cover, delivery, prioridade
+ORDER_V1 = struct.Struct('<dIBHBBB')        # versao 1, sem o namespace
+LINE = struct.Struct('<HI')                 # namespace, tamanho do JSON em bytes
+
+
+class TraceRecorder:
+    """
+        Grava as notificacoes de sensores, escritas de atuadores e ordens em um log binario
+        append-only. Os NodeIds sao gravados uma unica vez e depois referenciados por indice,
+        cada amostra ocupa 15 bytes. O buffer so vai para o disco a cada flush_every registros.
+
+        Cada linha grava um registro LINE no build (namespace, nome, LineSettings, perfil de
+        tempos e se o watchdog estava ligado), o replay monta as mesmas linhas a partir deles.
+    """
+    def __init__(self, path: Union[str, Path], flush_every: int = 256):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.start = time.monotonic()
+        self._indexes: Dict[NodeId, int] = {}
+        self._buffer = bytearray()
+        self._pending = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: BinaryIO = open(self.path, 'ab')
+        self._buffer += HEADER.pack(MAGIC, VERSION, time.time())
+
+    def _index(self, node_id: NodeId) -> int:
+        index = self._indexes.get(node_id)
+        if index is None:
+            index = len(self._indexes)
+            self._indexes[node_id] = index
+
+            encoded = node_id.to_string().encode()
+            self._buffer += KIND.pack(RecordKind.NODE) + NODE.pack(index, len(encoded)) + encoded
+
+        return index
+
+    def _append(self, record: bytes):
+        self._buffer += record
+        self._pending += 1
+
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def sensor(self, node_id: NodeId, value: int):
+        index = self._index(node_id)
+        self._append(KIND.pack(RecordKind.SENSOR) + VALUE.pack(time.monotonic() - self.start, index, int(value)))
+
+    def actuator(self, node_id: NodeId, value: int):
+        index = self._index(node_id)
+        self._append(KIND.pack(RecordKind.ACTUATOR) + VALUE.pack(time.monotonic() - self.start, index, int(value)))
+
+    def order(self, order_id: int, box_type: int, quantity: int, cover: bool, delivery: bool, priority: int = 0,
+              namespace_index: int = 0):
+        self._append(KIND.pack(RecordKind.ORDER) + ORDER.pack(
+            time.monotonic() - self.start, namespace_index, order_id, box_type, quantity, cover, delivery, priority))
+
+    def line(self, namespace_index: int, info: Dict):
+        encoded = json.dumps(info, sort_keys=True).encode()
+        self._append(KIND.pack(RecordKind.LINE) + LINE.pack(namespace_index, len(encoded)) + encoded)
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer.clear()
+
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class TraceRecord:
+    """Um registro do trace. Em ORDER e LINE, value é o namespace da linha (-1 nas ordens da versao 1)."""
+    __slots__ = ('kind', 'timestamp', 'node_id', 'value', 'order', 'line')
+
+    def __init__(self, kind: RecordKind, timestamp: float, node_id: Optional[str] = None, value: int = 0,
+                 order: Optional[Tuple] = None, line: Optional[Dict] = None):
+        self.kind = kind
+        self.timestamp = timestamp
+        self.node_id = node_id
+        self.value = value
+        self.order = order
+        self.line = line
+
+    def __repr__(self):
+        return f'TraceRecord({self.kind.name}, t={self.timestamp:.3f}, node={self.node_id}, value={self.value}, order={self.order})'
+
+
+def read_trace(path: Union[str, Path]) -> Iterator[TraceRecord]:
+    """
+        Le um trace gravado pelo TraceRecorder. Um arquivo pode conter varias sessoes
+        (cada execucao adiciona um cabecalho), os tempos continuam de onde a sessao anterior parou.
+        Traces da versao 1 (sem registros LINE e sem o namespace das ordens) continuam legiveis.
+    """
+    data = Path(path).read_bytes()
+    offset = 0
+    nodes: Dict[int, str] = {}
+    session_offset = 0.0
+    last_timestamp = 0.0
+    version = VERSION
+
+    while offset < len(data):
+        if data[offset:offset + 4] == MAGIC:
+            _, version, _ = HEADER.unpack_from(data, offset)
+            if version not in (1, VERSION):
+                raise ValueError(f'unsupported trace version: {version}')
+
+            offset += HEADER.size
+            nodes = {}
+            session_offset = last_timestamp
+            continue
+
+        kind = RecordKind(data[offset])
+        offset += KIND.size
+
+        if kind == RecordKind.NODE:
+            index, size = NODE.unpack_from(data, offset)
+            offset += NODE.size
+            nodes[index] = data[offset:offset + size].decode()
+            offset += size
+
+        elif kind == RecordKind.LINE:
+            namespace_index, size = LINE.unpack_from(data, offset)
+            offset += LINE.size
+            info = json.loads(data[offset:offset + size])
+            offset += size
+            yield TraceRecord(kind, last_timestamp, value=namespace_index, line=info)
+
+        elif kind == RecordKind.ORDER and version == 1:
+            timestamp, *order = ORDER_V1.unpack_from(data, offset)
+            offset += ORDER_V1.size
+            last_timestamp = session_offset + timestamp
+            yield TraceRecord(kind, last_timestamp, value=-1, order=tuple(order))
+
+        elif kind == RecordKind.ORDER:
+            timestamp, namespace_index, *order = ORDER.unpack_from(data, offset)
+            offset += ORDER.size
+            last_timestamp = session_offset + timestamp
+            yield TraceRecord(kind, last_timestamp, value=namespace_index, order=tuple(order))
+
+        else:
+            timestamp, index, value = VALUE.unpack_from(data, offset)
+            offset += VALUE.size
+            last_timestamp = session_offset + timestamp
+            yield TraceRecord(kind, last_timestamp, nodes[index], value)
+
+
+def actuator_sequence(records: List[TraceRecord]) -> Dict[str, List[int]]:
+    """Sequencia de valores escritos em cada atuador, usada para comparar decisoes."""
+    sequence: Dict[str, List[int]] = {}
+    for record in records:
+        if record.kind == RecordKind.ACTUATOR:
+            sequence.setdefault(record.node_id, []).append(record.value)
+
+    return sequence
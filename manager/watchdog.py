@@ -0,0 +1,133 @@
+from typing import Awaitable, Callable, Dict
+
+import asyncio
+import time
+
+
+class Watchdog:
+    """
+        Prazo para as esperas de sensor dos componentes (BaseComponent.watchdog). Sem ele uma
+        borda perdida congela o estagio e tudo antes dele ate alguem apertar stop.
+
+        O prazo de uma espera é o percentil 'percentile' das duracoes aprendidas no perfil de
+        tempos vezes 'factor' (nunca abaixo de 'floor'), ou o tempo esperado do passo do kind
+        (EXPECTED_STEP_TIME) enquanto nao houver amostras. Cada espera tem o proprio inicio
+        (ActiveWait.armed_at): o inicio dela, ou nas esperas 'external', que dependem de outro
+        estagio (ex: o turntable puxar a caixa), o primeiro comando que esse estagio manda para
+        o componente; sem esse comando a espera nao tem prazo.
+
+        Estourado o prazo:
+          1. relê o sensor: se ja esta no estado esperado a notificacao foi perdida (missed edge)
+          2. reenvia os comandos dos atuadores do componente e espera de novo ('retries' vezes)
+          3. nada mudou: jam, o estagio fica marcado como isolado ate a borda chegar. Os atuadores
+             ficam como estao, desligar o movimento esperado impediria a borda de chegar
+
+        Cada recuperacao automatica conta como tempo de parada evitado o 'operator_time' (s) que
+        o estagio ficaria parado ate a intervencao de um operador, menos o atraso ate recuperar.
+    """
+    def __init__(self,
+                 expected_step: Dict[str, float],
+                 default_step: float = 30.0,
+                 factor: float = 3.0,
+                 percentile: float = 0.99,
+                 floor: float = 1.0,
+                 retries: int = 1,
+                 operator_time: float = 120.0,
+                 poll: float = 0.5
+        ):
+
+        self.expected_step = expected_step
+        self.default_step = default_step
+        self.factor = factor
+        self.percentile = percentile
+        self.floor = floor
+        self.retries = retries
+        self.operator_time = operator_time
+        self.poll = poll
+
+    def limit(self, component, label: str) -> float:
+        """Prazo (s) da espera, do comando ate a borda."""
+        timing = component.timing
+        if timing is not None:
+            key = component.timing_key(label)
+            samples = timing.samples.get(key)
+            if samples is not None and len(samples) >= timing.min_samples:
+                return max(self.floor * component.time_scale, timing.quantile(key, self.percentile) * self.factor)
+
+        return self.expected_step.get(component.kind, self.default_step) * component.time_scale
+
+    def _avoided(self, component, deadline: float):
+        component.downtime_avoided += max(0.0, self.operator_time - (time.monotonic() - deadline))
+
+    async def guard(self, component, active_wait, event: asyncio.Event, reread: Callable[[], Awaitable[None]]) -> bool:
+        """
+            Espera 'event' com prazo e recuperacao. active_wait é a espera registrada em
+            component.waiting(); reread relê o sensor e dispara o evento se a borda ja aconteceu.
+            Retorna True se o watchdog precisou intervir.
+        """
+        label = active_wait.label
+        limit = self.limit(component, label)
+        attempts = 0
+        deadline = None
+
+        while not event.is_set():
+            armed_at = active_wait.armed_at
+            if armed_at is None or component.paused:
+                timeout = self.poll * component.time_scale
+            else:
+                deadline = armed_at + limit
+                timeout = max(0.0, deadline - time.monotonic())
+
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+                break
+
+            except asyncio.TimeoutError:
+                pass
+
+            if armed_at is None or component.paused or time.monotonic() < deadline:
+                continue
+
+            component.watchdog_timeouts += 1
+            await reread()
+            if event.is_set():
+                print(f'[Watchdog]: {component.kind}.{component.name} missed edge on {label}, recovered by re-reading the sensor')
+                component.missed_edges += 1
+                self._avoided(component, deadline)
+                return True
+
+            if attempts < self.retries:
+                attempts += 1
+                print(f'[Watchdog]: {component.kind}.{component.name} timeout on {label}, retrying the motion')
+                await component.resend()
+                active_wait.armed_at = time.monotonic()
+                continue
+
+            component.jams += 1
+            await self.isolate(component, label, event, reread)
+            return True
+
+        if attempts:
+            component.motion_retries += 1
+            self._avoided(component, deadline)
+
+        return bool(attempts)
+
+    async def isolate(self, component, label: str, event: asyncio.Event, reread: Callable[[], Awaitable[None]]):
+        """
+            Jam: marca o componente como isolado e espera a borda (o operador libera a caixa),
+            relendo o sensor. Nada é pausado: os vizinhos continuam comandando este componente
+            e so os estagios que dependem da caixa travada esperam por ela.
+        """
+        print(f'[Watchdog]: {component.kind}.{component.name} jammed on {label}, stage isolated')
+        component.isolated = True
+
+        while not event.is_set():
+            try:
+                await asyncio.wait_for(event.wait(), self.poll * component.time_scale)
+
+            except asyncio.TimeoutError:
+                await reread()
+
+        component.isolated = False
+        print(f'[Watchdog]: {component.kind}.{component.name} {label} cleared, stage released')
@@ -1,144 +1,157 @@
-from typing import List, TypeAlias, Callable
-from pathlib import Path
-from asyncua import Server, ua, uamethod
-from asyncua.server.user_managers import CertificateUserManager
-from asyncua.crypto.cert_gen import setup_self_signed_certificate
+from typing import List, Optional
+from asyncua import Server, ua
 from asyncua.crypto.validator import CertificateValidator, CertificateValidatorOptions
 from cryptography.x509.oid import ExtendedKeyUsageOID
 from components.base import BaseComponent
-from components.box_producer import BoxFeeder, BoxType
-from components.turn_table import BaseTurnTable, TurnTable1, TurnTable2, TurnTable3, Capabilities
-from components.conveyor import Conveyor, ConveyorDirection, ConveyorAccess
-from components.handler import Handler
-from components.order import Order, OrderFn, CoverType
-from manager.order import ProcessOrder
+from manager.line import Line, LineSettings
+from manager.trace import TraceRecorder
+from manager.timing import TimingProfile
+from manager.security import EndpointConfig, EndpointUserManager, configure_endpoints, start_endpoints
+from manager.certificate import CertificateManager
+from manager.diagnostics import Diagnostics
+from manager.monitor import LoopMonitor
+from manager.watchdog import Watchdog
+from manager.supervisor import LineConfig, Supervisor, line_path
+from components.io import IOBackend, IOBackendKind
+from components.modbus import ModbusAddressMap, ModbusBackend, ModbusClient
+from config import LINES, LINE_MODE, ENDPOINTS, CERTIFICATE_PATH, PRIVATE_KEY_PATH, CERTIFICATE_RENEW_DAYS, CERTIFICATE_SUBJECT
+from config import MERGE_POLICY, MERGE_SLOTS, MERGE_WEIGHTS, FEEDER_PIPELINED
+from config import MAKE_AHEAD_POLICY, MAKE_AHEAD_WINDOW, MAKE_AHEAD_MIN_SHARE
+from config import ACTUATOR_RECONCILE_PERIOD, RACK_SLOTTING, RACK_SLOTTING_WINDOW, RACK_SLOTTING_MAX_MOVES
+from config import HANDLER_PARKING, HANDLER_IDLE_DELAY
+from config import WATCHDOG, WATCHDOG_FACTOR, WATCHDOG_RETRIES, WATCHDOG_OPERATOR_TIME
+from config import IO_BACKEND, MODBUS_HOST, MODBUS_PORT, MODBUS_UNIT, MODBUS_TIMEOUT, MODBUS_SCAN_PERIOD, MODBUS_MAP_PATH
+from config import EXPECTED_STEP_TIME, DIAGNOSTICS_PERIOD, SNAPSHOT_PERIOD, TRACE_PATH, ADMISSION_HORIZON, ADMISSION_POLICY, ORDER_RETENTION, ORDER_ARCHIVE_BUDGET
+from config import TIMING, TIMING_PROFILE_PATH, TIMING_PERCENTILE, TIMING_MARGIN, TIMING_FLOOR, TIMING_MIN_SAMPLES, TIMING_SAVE_PERIOD
 
 import asyncio
 import socket
 
 
-RoutingStrategy: TypeAlias = Callable[[Order], bool]
-
-
-class QueueRouter:
-    """
-        Roteia ordens para a fila de 'delivery' ou 'storage'
-        com base em uma estratégia de lógica injetada.
-    """
-    def __init__(self,
-                 queue_storage: asyncio.Queue[OrderFn], 
-                 queue_delivery: asyncio.Queue[OrderFn],
-                 sem_storage: asyncio.Semaphore,
-                 sem_delivery: asyncio.Semaphore,
-                 routing_strategy: RoutingStrategy 
-    ):
-        
-        self.queue_storage = queue_storage
-        self.queue_delivery = queue_delivery
-        self.sem_storage = sem_storage
-        self.sem_delivery = sem_delivery
-        self.routing_strategy = routing_strategy
-
-    async def put(self, item: OrderFn):
-        order, fn = item
-
-        if self.routing_strategy(order):
-            print(f'[QueueRouter]: router order: {order} to queue delivery: {self.queue_delivery}')
-            async with self.sem_delivery:
-                await self.queue_delivery.put((order, fn))
-        
-        else:
-            print(f'[QueueRouter]: router order: {order} to queue storage: {self.queue_storage}')
-            async with self.sem_storage:
-                await self.queue_storage.put((order, fn))
-
-
-async def task_delivery_exit(queue: asyncio.Queue[OrderFn]):
-    while True:
-        order, _ = await queue.get()
-        await asyncio.sleep(5)
-
-
-def default_router(order: Order) -> bool:
-    return order.delivery or order.cover == CoverType.WITH_COVER
-
-
-def simple_delivery(order: Order) -> bool:
-    return order.delivery
-
-
-async def main():
-    cert_base = Path(__file__).parent
-    server_cert = Path(cert_base / "certificates/server_certicate.der")
-    server_private_key = Path(cert_base / "certificates/server_private_key.pem")
+def certificate_manager_for(host_name: str, server_app_uri: str) -> CertificateManager:
+    return CertificateManager(
+        CERTIFICATE_PATH,
+        PRIVATE_KEY_PATH,
+        server_app_uri,
+        host_name,
+        [ExtendedKeyUsageOID.CLIENT_AUTH, ExtendedKeyUsageOID.SERVER_AUTH],
+        CERTIFICATE_SUBJECT,
+        renew_days=CERTIFICATE_RENEW_DAYS
+    )
 
-    cert_user_manager = CertificateUserManager()
-    await cert_user_manager.add_user('certificates/server_certificate.der', name='test_user')
 
+def line_settings() -> LineSettings:
+    """Ajustes das linhas a partir de config.py."""
+    return LineSettings(
+        admission_horizon=ADMISSION_HORIZON, admission_policy=ADMISSION_POLICY,
+        order_retention=ORDER_RETENTION, order_archive_budget=ORDER_ARCHIVE_BUDGET, snapshot_period=SNAPSHOT_PERIOD,
+        merge_policy=MERGE_POLICY, merge_slots=MERGE_SLOTS, merge_weights=MERGE_WEIGHTS, feeder_pipelined=FEEDER_PIPELINED,
+        make_ahead_policy=MAKE_AHEAD_POLICY,
+        make_ahead_window=MAKE_AHEAD_WINDOW, make_ahead_min_share=MAKE_AHEAD_MIN_SHARE,
+        reconcile_period=ACTUATOR_RECONCILE_PERIOD,
+        rack_slotting=RACK_SLOTTING, rack_slotting_window=RACK_SLOTTING_WINDOW, rack_slotting_max_moves=RACK_SLOTTING_MAX_MOVES,
+        parking_policy=HANDLER_PARKING, handler_idle_delay=HANDLER_IDLE_DELAY)
+
+
+def io_backend_for(config: LineConfig, position: int, tag: Optional[str]) -> Optional[IOBackend]:
+    """Backend de IO da linha, None mantem o OPC UA padrao dos componentes."""
+    if IO_BACKEND != IOBackendKind.MODBUS:
+        return None
+
+    # cada linha tem o proprio Factory I/O e o proprio mapa de enderecos
+    address_map = ModbusAddressMap(line_path(MODBUS_MAP_PATH, config.name if position else tag))
+    address_map.load()
+
+    client = ModbusClient(MODBUS_HOST, MODBUS_PORT + config.port_offset, MODBUS_UNIT, MODBUS_TIMEOUT)
+    return ModbusBackend(client, address_map, MODBUS_SCAN_PERIOD)
+
+
+async def build_diagnostics(line: Line, monitor: LoopMonitor) -> Diagnostics:
+    """Nodes de diagnostico da linha, dentro da pasta dela. O monitor é do processo, compartilhado entre as linhas."""
+    diagnostics = Diagnostics(line.namespace_index, line.node, DIAGNOSTICS_PERIOD)
+    await diagnostics.build()
+    await diagnostics.add_histogram('LoopLag', monitor.lag_histogram)
+    await diagnostics.add_value('Stalls', lambda: monitor.stalls, ua.VariantType.UInt32)
+    await diagnostics.add_value('FailedTasks', lambda: monitor.failed_tasks, ua.VariantType.UInt32)
+    await diagnostics.add_value('LastStall', lambda: monitor.last_stall, ua.VariantType.String)
+
+    for component in line.components:
+        await diagnostics.add_histogram(f'Stage.{component.kind}.{component.name}.Wait', component.wait_histogram)
+        await diagnostics.add_histogram(f'Stage.{component.kind}.{component.name}.Reaction', component.reaction_histogram)
+        await diagnostics.add_histogram(f'Stage.{component.kind}.{component.name}.Cycle', component.cycle_histogram)
+
+    admission = line.process_order.admission
+    for box_type, slot in line.merge.slots.items():
+        await diagnostics.add_histogram(f'Merge.{box_type.name}.Blocked', slot.blocked_histogram)
+        await diagnostics.add_value(f'Merge.{box_type.name}.BlockedTime', lambda slot=slot: slot.blocked_time, ua.VariantType.Double)
+
+    make_ahead = line.make_ahead
+    if make_ahead is not None:
+        for producer in line.producers:
+            await diagnostics.add_value(f'MakeAhead.{producer.box_type.name}.Parked', lambda producer=producer: producer.parked, ua.VariantType.UInt32)
+        await diagnostics.add_value('MakeAhead.Produced', lambda: make_ahead.produced, ua.VariantType.UInt32)
+        await diagnostics.add_value('MakeAhead.Hits', lambda: make_ahead.hits, ua.VariantType.UInt32)
+
+    slotting = line.slotting
+    if slotting is not None:
+        await diagnostics.add_value('Slotting.Moves', lambda: slotting.moves, ua.VariantType.UInt32)
+        await diagnostics.add_value('Slotting.Aborted', lambda: slotting.aborted, ua.VariantType.UInt32)
+
+    parking = line.parking
+    if parking is not None:
+        await diagnostics.add_value('Parking.Parks', lambda: parking.parks, ua.VariantType.UInt32)
+        await diagnostics.add_value('Parking.Hits', lambda: parking.hits, ua.VariantType.UInt32)
+        await diagnostics.add_value('Parking.Misses', lambda: parking.misses, ua.VariantType.UInt32)
+
+    backend = line.io_backend
+    if isinstance(backend, ModbusBackend):
+        await diagnostics.add_histogram('Modbus.Scan', backend.scan_histogram)
+        await diagnostics.add_value('Modbus.Scans', lambda: backend.scans, ua.VariantType.UInt32)
+        await diagnostics.add_value('Modbus.Connects', lambda: backend.connects, ua.VariantType.UInt32)
+        await diagnostics.add_value('Modbus.Errors', lambda: backend.errors, ua.VariantType.UInt32)
+
+    await diagnostics.add_value('Watchdog.Timeouts', lambda: line.total('watchdog_timeouts'), ua.VariantType.UInt32)
+    await diagnostics.add_value('Watchdog.MissedEdges', lambda: line.total('missed_edges'), ua.VariantType.UInt32)
+    await diagnostics.add_value('Watchdog.Retries', lambda: line.total('motion_retries'), ua.VariantType.UInt32)
+    await diagnostics.add_value('Watchdog.Jams', lambda: line.total('jams'), ua.VariantType.UInt32)
+    await diagnostics.add_value('Watchdog.Isolated', lambda: line.total('isolated'), ua.VariantType.UInt32)
+    await diagnostics.add_value('Watchdog.DowntimeAvoided', lambda: float(line.total('downtime_avoided')), ua.VariantType.Double)
+    await diagnostics.add_value('Writes.Issued', lambda: line.writes_issued, ua.VariantType.UInt32)
+    await diagnostics.add_value('Writes.Suppressed', lambda: line.writes_suppressed, ua.VariantType.UInt32)
+    await diagnostics.add_value('Cover.Placed', lambda: line.cover_station.covers_placed, ua.VariantType.UInt32)
+    await diagnostics.add_value('Snapshot.Updates', lambda: line.snapshot.updates, ua.VariantType.UInt32)
+    await diagnostics.add_value('Admission.Deferred', lambda: len(admission.deferred), ua.VariantType.UInt32)
+    await diagnostics.add_value('Admission.Rejected', lambda: admission.rejected, ua.VariantType.UInt32)
+
+    orders = line.orders
+    await diagnostics.add_value('Memory.LiveOrders', lambda: len(orders.orders), ua.VariantType.UInt32)
+    await diagnostics.add_value('Memory.BytesPerLiveOrder', lambda: orders.memory_report()['bytes_per_live_order'], ua.VariantType.Double)
+    await diagnostics.add_value('Memory.ArchivedOrders', lambda: len(orders.order_archive), ua.VariantType.UInt32)
+    await diagnostics.add_value('Memory.ArchivedBoxes', lambda: len(orders.box_archive), ua.VariantType.UInt32)
+    await diagnostics.add_value('Memory.ArchiveBytes', lambda: orders.order_archive.nbytes + orders.box_archive.nbytes, ua.VariantType.UInt32)
+
+    return diagnostics
+
+
+async def serve(lines: List[LineConfig], endpoints: List[EndpointConfig], tag: Optional[str] = None):
+    """Um servidor com as linhas dadas, cada uma no proprio namespace. tag separa os arquivos de trace e de tempos."""
     host_name = socket.gethostname()
     server_app_uri = f"alisonalmeida@{host_name}"
 
-    # queues for productions
-    queue_oder_green: asyncio.Queue[Order] = asyncio.Queue()
-    queue_oder_blue: asyncio.Queue[Order] = asyncio.Queue()
-    queue_oder_metal: asyncio.Queue[Order] = asyncio.Queue()
-
-    queue_producer_turntable: asyncio.Queue[OrderFn] = asyncio.Queue()                # feeder -> turntable
-    queue_turntable1_conveyor1: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)     # turntable_select -> conveyor_input
-    sem_turntable1_conveyor1 = asyncio.Semaphore(value=2)
-
-    queue_conveyor1_turntable2: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)     # conveyor_input -> turntable_nocover
-    queue_turntable2_storage: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)       # turntable2 -> roller_a_storage
-    queue_turntable2_delivery: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)      # turntable2 -> conveyor_delivery
-    sem_conveyor_a_storage = asyncio.Semaphore(value=2)
-    sem_conveyor_a_delivery = asyncio.Semaphore(value=2)
-    queue_turntable2_router = QueueRouter(
-        queue_turntable2_storage, queue_turntable2_delivery, sem_conveyor_a_storage, sem_conveyor_a_delivery, default_router)
-
-    queue_roller_a_acc_a: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)           # roller_a_storage -> roller_access_a
-    queue_acc_a_handler: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)            # roller_access_a -> handler
-    sem_acc_a_handler = asyncio.Semaphore(2)  
-    
-    queue_dispatch_turntable3: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)      # conveyor_delivery -> turntable3
-    queue_turntable3_storage: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)       # turntable3 -> roller_b_storage
-    queue_turntable3_delivery: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)      # turntable3 -> delivery_conveyor
-    sem_converyor_b_storage = asyncio.Semaphore(2)
-    sem_converyor_b_delivery = asyncio.Semaphore(2)
-    queue_turntable3_router = QueueRouter(
-        queue_turntable3_storage, queue_turntable3_delivery, sem_converyor_b_storage, sem_converyor_b_delivery, simple_delivery)  
-
-    queue_roller_b_acc_b: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)           # roller_b_storage -> roller_access_b
-    queue_acc_b_handler: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)            # roller_access_b -> handler
-    sem_acc_b_handler = asyncio.Semaphore(2) 
-
-    queue_delivery_exit: asyncio.Queue[OrderFn] = asyncio.Queue(maxsize=1)            # representa a fila de entrega final
-
-    server = Server()
-    process_order = ProcessOrder(queue_oder_green, queue_oder_blue, queue_oder_metal)
+    # carrega o certificado existente, so gera um novo se estiver faltando ou perto de expirar
+    certificate_manager = certificate_manager_for(host_name, server_app_uri)
+    certificate_manager.ensure()
+
+    user_manager = EndpointUserManager(endpoints)
+    await user_manager.load()
+
+    server = Server(user_manager=user_manager)
     await server.init()
 
     await server.set_application_uri(server_app_uri)
-    server.set_endpoint('opc.tcp://0.0.0.0:4840')
-    server.set_security_policy([ua.SecurityPolicyType.Basic256Sha256_SignAndEncrypt])
-    
-    idx = await server.get_namespace_index(server_app_uri)
+    configure_endpoints(server, endpoints)
 
-    await setup_self_signed_certificate(
-        server_private_key,
-        server_cert,
-        server_app_uri,
-        host_name,
-        [ExtendedKeyUsageOID.CLIENT_AUTH, ExtendedKeyUsageOID.SERVER_AUTH],
-        {
-            "countryName": "BR",
-            "stateOrProvinceName": "Amazonas",
-            "localityName": "Manaus",
-            "organizationName": "Bar Ltd",
-        },
-    )
-
-    await server.load_certificate(str(server_cert))
-    await server.load_private_key(str(server_private_key))
+    await certificate_manager.load_into(server)
 
     validator = CertificateValidator(
             options=CertificateValidatorOptions.EXT_VALIDATION | CertificateValidatorOptions.PEER_CLIENT
@@ -147,157 +160,75 @@ async def main():
     server.set_certificate_validator(validator)
 
     objects_node = server.get_objects_node()
-    green_producer = await objects_node.add_object(idx, 'Green Producer')
-    blue_producer = await objects_node.add_object(idx, 'Blue Producer')
-    metal_producer = await objects_node.add_object(idx, 'Metal Producer')
-    node_turns_table = await objects_node.add_object(idx, 'TurnsTable')
-    node_input_conveyors = await objects_node.add_object(idx, 'Conveyors')
-    node_handler = await objects_node.add_object(idx, 'Handler')
-    node_methods = await objects_node.add_object(idx, 'Methods')
-
-    tasks: List[asyncio.Task] = []
-    
-    producers: List[BaseComponent] = [
-        BoxFeeder(queue_oder_green, BoxType.GREEN, server, idx, green_producer, 2, 4, queue_producer_turntable),
-        BoxFeeder(queue_oder_blue, BoxType.BLUE, server, idx, blue_producer, 2, 2, queue_producer_turntable),
-        BoxFeeder(queue_oder_metal, BoxType.METAL, server, idx, metal_producer, 2, 4, queue_producer_turntable)
-    ]
-
-    for i, producer in enumerate(producers):
-        await producer.build()
-        task = asyncio.create_task(producer.run(), name=producer.name)
-        tasks.append(task)
-
-    turns_table: List[BaseComponent] = [
-        TurnTable1('Select', server, idx, node_turns_table, {Capabilities.PASS}, queue_producer_turntable, queue_turntable1_conveyor1, sem_turntable1_conveyor1),
-        TurnTable2('NoCover', server, idx, node_turns_table, {Capabilities.DELIVERY_NO_COVER, Capabilities.STORAGE_NO_COVER}, queue_conveyor1_turntable2, queue_turntable2_router, asyncio.Semaphore()),
-        TurnTable3('WithCover', server, idx, node_turns_table, {Capabilities.DELIVERY_NO_COVER, Capabilities.STORAGE_COVER}, queue_dispatch_turntable3, queue_turntable3_router, asyncio.Semaphore())
-    ]
-
-    for _, turn_table in enumerate(turns_table):
-        base_node = await node_turns_table.add_object(idx, f'TurnTable {turn_table.name}')
-        turn_table.base_node = base_node
-
-        await turn_table.build()
-
-        task = asyncio.create_task(turn_table.run(), name=turn_table.name)
-        tasks.append(task)
-
-    args_conveyors = [server, idx, node_input_conveyors]
-    conveyors: List[BaseComponent] = [
-        Conveyor('InputConveyor', *args_conveyors, 2, 2, {ConveyorDirection.FORWARD}, queue_turntable1_conveyor1, queue_conveyor1_turntable2, sem_turntable1_conveyor1),
-        Conveyor('RollerAConveyor', *args_conveyors, 1, 4, {ConveyorDirection.FORWARD, ConveyorDirection.BACKWARD}, queue_turntable2_storage, queue_roller_a_acc_a, sem_conveyor_a_storage),
-        ConveyorAccess('AccAConveyor', *args_conveyors, 1, 1, {ConveyorDirection.FORWARD, ConveyorDirection.BACKWARD}, queue_roller_a_acc_a, queue_acc_a_handler, sem_acc_a_handler),
-        Conveyor('DispaConveyor', *args_conveyors, 1, 4, {ConveyorDirection.FORWARD}, queue_turntable2_delivery, queue_dispatch_turntable3, sem_conveyor_a_delivery),
-        Conveyor('RollerBConveyor', *args_conveyors, 1, 4, {ConveyorDirection.FORWARD, ConveyorDirection.BACKWARD}, queue_turntable3_storage, queue_roller_b_acc_b, sem_converyor_b_storage),
-        ConveyorAccess('AccBConveyor', *args_conveyors, 1, 1, {ConveyorDirection.FORWARD, ConveyorDirection.BACKWARD},  queue_roller_b_acc_b,queue_acc_b_handler, sem_acc_b_handler),
-        ConveyorAccess('ExitConveyor', *args_conveyors, 1, 1, {ConveyorDirection.FORWARD}, queue_turntable3_delivery, queue_delivery_exit, asyncio.Semaphore(), wait_next_stage=False)
-    ]
-    
-    for conveyor in conveyors:
-        base_node = await node_input_conveyors.add_object(idx, f'Conveyor {conveyor.name}')
-        conveyor.base_node = base_node
-
-        await conveyor.build()
-        task = asyncio.create_task(conveyor.run(), name=conveyor.name)
-        tasks.append(task)
-
-    handler = Handler('Handler', server, idx, node_handler, queue_acc_a_handler, queue_acc_b_handler, sem_acc_a_handler, sem_acc_b_handler)
-    await handler.build()
-
-    task = asyncio.create_task(handler.run(), name=handler.name)
-    tasks.append(task)
-
-    btn_start_process = await objects_node.add_variable(idx, 'IO:Botao Start Process', False, varianttype=ua.VariantType.Boolean)
-    await btn_start_process.set_writable()
-
-    btn_stop_process = await objects_node.add_variable(idx, 'IO:Botao Stop Process', False, varianttype=ua.VariantType.Boolean)
-    await btn_stop_process.set_writable()
-
-    input_args = [
-        ua.Argument('ProductType', ua.NodeId(ua.VariantType.Int16)),
-        ua.Argument('Quantity', ua.NodeId(ua.VariantType.Int16)),
-        ua.Argument('Cover', ua.NodeId(ua.VariantType.Boolean)),
-        ua.Argument('Delivery', ua.NodeId(ua.VariantType.Boolean)),
-    ]
-    
-    output_args = [
-        ua.Argument('Status', ua.NodeId(ua.VariantType.Boolean)),
-        ua.Argument('Message', ua.NodeId(ua.VariantType.String))
-    ]
-
-    await node_methods.add_method(idx, 'CreateOrder', uamethod(process_order.handle_new_order), input_args, output_args)
+    # gravacao de IO e ordens, desligada por padrao (TRACE_PATH = None)
+    trace_path = line_path(TRACE_PATH, tag)
+    recorder = TraceRecorder(trace_path) if trace_path is not None else None
+    BaseComponent.recorder = recorder
+
+    # duracoes comando -> sensor aprendidas, persistidas entre execucoes
+    timing = None
+    if TIMING:
+        timing = TimingProfile(line_path(TIMING_PROFILE_PATH, tag), TIMING_PERCENTILE, TIMING_MARGIN, TIMING_FLOOR, TIMING_MIN_SAMPLES)
+        timing.load()
+    BaseComponent.timing = timing
+
+    # prazo e recuperacao automatica das esperas de sensor
+    if WATCHDOG:
+        BaseComponent.watchdog = Watchdog(EXPECTED_STEP_TIME, factor=WATCHDOG_FACTOR, retries=WATCHDOG_RETRIES, operator_time=WATCHDOG_OPERATOR_TIME)
+
+    # a primeira linha fica no namespace da aplicacao (mesmos NodeIds de uma linha unica)
+    settings = line_settings()
+    built: List[Line] = []
+    for position, config in enumerate(lines):
+        namespace_uri = server_app_uri if position == 0 else f'{server_app_uri}/{config.name}'
+        idx = await server.register_namespace(namespace_uri)
+
+        line = Line(server, idx, objects_node, settings, name=config.name, recorder=recorder,
+                    io_backend=io_backend_for(config, position, tag))
+        await line.build()
+        if isinstance(line.io_backend, ModbusBackend):
+            line.io_backend.address_map.save()
+        line.start_tasks()
+        built.append(line)
+
+    # monitor do event loop e das tasks, exposto nos nodes de diagnostico
+    monitor = LoopMonitor([component for line in built for component in line.components], EXPECTED_STEP_TIME)
+    for line in built:
+        for task in line.tasks:
+            monitor.track(task)
+
+    diagnostics = [await build_diagnostics(line, monitor) for line in built]
 
     await server.start()
-    asyncio.create_task(task_delivery_exit(queue_delivery_exit))
-    print('server start')
-    
-    # melhorar esse pedaço
-    process_run = False
-    producer_green_task = None
+    await start_endpoints(server, endpoints)
+    asyncio.create_task(monitor.run(), name='monitor')
+    for line, line_diagnostics in zip(built, diagnostics):
+        asyncio.create_task(line_diagnostics.run(), name=f'{line.name}.diagnostics')
+    if timing is not None:
+        asyncio.create_task(timing.run(TIMING_SAVE_PERIOD), name='timing')
+    print(f'server start: {", ".join(line.name for line in built)} on {endpoints[0].url()}')
 
-    while True:
-        value_start_button: bool = await btn_start_process.read_value()
-        value_stop_button: bool = await btn_stop_process.read_value()
+    try:
+        await asyncio.gather(*(line.run_controls() for line in built))
 
-        if value_start_button and process_run is False:
-            print('iniciando processo')
+    finally:
+        if timing is not None:
+            timing.save()
+        if recorder is not None:
+            recorder.close()
 
-            process_run = True
-            for producer in producers:
-                producer.start_event.set()
-                producer.start_event.clear()
 
-            for turn_table in turns_table:
-                turn_table.start_event.set()
-                turn_table.start_event.clear()
+def run_lines(lines: List[LineConfig], endpoints: List[EndpointConfig], tag: Optional[str] = None):
+    """Ponto de entrada de cada processo do Supervisor."""
+    asyncio.run(serve(lines, endpoints, tag))
 
-            for conveyor in conveyors:
-                conveyor.start_event.set()
-                conveyor.start_event.clear()
 
-            handler.start_event.set()
-            handler.start_event.clear()
-
-            continue
-
-        if value_stop_button and process_run is True:
-            print('parando processo')
-            
-            process_run = False
-            for task in tasks:
-                task.cancel()
-
-            tasks.clear()
-
-            for producer in producers:
-                for node in producer.nodes:
-                    await node.set_value(False)
-
-                task = asyncio.create_task(producer.run(), name=producer.name)
-                tasks.append(task)
-
-            for turn_table in turns_table:
-                for node in turn_table.nodes:
-                    await node.set_value(False)
-                    
-                task = asyncio.create_task(turn_table.run(), name=turn_table.name)
-                tasks.append(task)
-
-            for conveyor in conveyors:
-                for node in conveyor.nodes:
-                    await node.set_value(False)
-
-                task = asyncio.create_task(conveyor.run(), name=conveyor.name)
-                tasks.append(task)
-
-            task = asyncio.create_task(handler.run(), name=handler.name)
-            tasks.append(task)
-
-            continue
-        
-        await asyncio.sleep(0.01)
+def main():
+    # o certificado é gerado uma vez aqui, antes dos processos das linhas
+    host_name = socket.gethostname()
+    certificate_manager_for(host_name, f"alisonalmeida@{host_name}").ensure()
 
+    Supervisor(LINES, ENDPOINTS, LINE_MODE, run_lines).run()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -0,0 +1,246 @@
+from typing import Any, Callable, Dict, List, Optional, Union
+from asyncua import ua
+from asyncua.ua import NodeId
+from datetime import datetime, timezone
+
+import asyncio
+
+
+class FakeMonitoredItem:
+    def __init__(self, value: ua.DataValue):
+        self.Value = value
+
+
+class FakeNotification:
+    """Mesmo formato do 'data' entregue pelo asyncua: data.monitored_item.Value é o DataValue."""
+    def __init__(self, value: ua.DataValue):
+        self.monitored_item = FakeMonitoredItem(value)
+
+
+class FakeNode:
+    """
+        Node em memoria com a parte da API do asyncua.Node usada pelos componentes.
+        Toda escrita que muda o valor notifica as subscriptions do node.
+    """
+    def __init__(self, server: 'FakeServer', nodeid: NodeId, browse_name: ua.QualifiedName,
+                 value: Any = None, varianttype: Optional[ua.VariantType] = None):
+        self.server = server
+        self.nodeid = nodeid
+        self.browse_name = browse_name
+        self.varianttype = varianttype
+        self.value = value
+        self.writable = False
+        self.method: Optional[Callable] = None
+        self.children: List[FakeNode] = []
+
+    def __repr__(self):
+        return f'FakeNode({self.nodeid.to_string()})'
+
+    def __eq__(self, other):
+        return isinstance(other, FakeNode) and self.nodeid == other.nodeid
+
+    def __hash__(self):
+        return hash(self.nodeid)
+
+    def _add_child(self, nodeid, bname, value=None, varianttype=None) -> 'FakeNode':
+        if not isinstance(nodeid, NodeId):
+            nodeid = NodeId.from_string(nodeid)
+
+        if not isinstance(bname, ua.QualifiedName):
+            bname = ua.QualifiedName(bname, nodeid.NamespaceIndex)
+
+        node = FakeNode(self.server, nodeid, bname, value, varianttype)
+        self.children.append(node)
+        self.server.register(node)
+        return node
+
+    async def add_object(self, nodeid, bname, *args, **kwargs) -> 'FakeNode':
+        return self._add_child(nodeid, bname)
+
+    async def add_variable(self, nodeid, bname, val, varianttype=None, datatype=None) -> 'FakeNode':
+        if isinstance(val, ua.Variant):
+            val, varianttype = val.Value, val.VariantType
+
+        return self._add_child(nodeid, bname, val, varianttype)
+
+    async def add_method(self, nodeid, bname, func: Callable, *args, **kwargs) -> 'FakeNode':
+        node = self._add_child(nodeid, bname)
+        node.method = func
+        return node
+
+    async def get_children(self) -> List['FakeNode']:
+        return list(self.children)
+
+    async def set_writable(self, writable: bool = True):
+        self.writable = writable
+
+    async def read_browse_name(self) -> ua.QualifiedName:
+        return self.browse_name
+
+    async def read_value(self) -> Any:
+        return self.value
+
+    async def get_value(self) -> Any:
+        return self.value
+
+    async def write_value(self, value: Any, varianttype: Optional[ua.VariantType] = None):
+        if isinstance(value, ua.DataValue):
+            value = value.Value
+
+        if isinstance(value, ua.Variant):
+            value = value.Value
+
+        self.server.write(self, value)
+
+    set_value = write_value
+    set_data_value = write_value
+
+
+class FakeSubscription:
+    def __init__(self, server: 'FakeServer', handler):
+        self.server = server
+        self.handler = handler
+        self.nodes: List[FakeNode] = []
+
+    async def subscribe_data_change(self, nodes: Union[FakeNode, List[FakeNode]], *args, **kwargs):
+        if not isinstance(nodes, (list, tuple)):
+            nodes = [nodes]
+
+        for node in nodes:
+            self.nodes.append(node)
+            self.server.subscriptions.setdefault(node.nodeid, []).append(self)
+
+            # igual ao servidor real, o valor atual é enviado logo apos a inscricao
+            self.server.notify(self, node)
+
+        return [id(node) for node in nodes]
+
+    async def delete(self):
+        for node in self.nodes:
+            self.server.subscriptions[node.nodeid].remove(self)
+
+        self.nodes.clear()
+
+
+class FakeEvent:
+    def __init__(self, event_type: FakeNode, fields: List[str]):
+        self.event_type = event_type
+        self.Message = None
+        for name in fields:
+            setattr(self, name, None)
+
+
+class FakeEventGenerator:
+    """Guarda os eventos disparados em server.events, como (tipo, campos)."""
+    def __init__(self, server: 'FakeServer', event_type: FakeNode, emitting_node: FakeNode):
+        self.server = server
+        self.emitting_node = emitting_node
+        self.event = FakeEvent(event_type, server.event_fields[event_type.nodeid])
+
+    async def trigger(self, time_attr=None, message: Optional[str] = None):
+        self.event.Message = message
+        fields = {name: value for name, value in vars(self.event).items() if name != 'event_type'}
+        self.server.events.append((self.event.event_type.browse_name.Name, fields))
+
+
+class FakeServer:
+    """
+        Servidor em memoria com a parte da API do asyncua.Server usada pelos componentes.
+        As notificacoes de data change sao entregues como tasks no event loop, na ordem das escritas.
+
+        synchronous: o handler roda dentro da propria escrita, quando o set_sensor retorna os
+        detectores ja viram a borda. Os handlers nao podem suspender (EventSensorHandle so
+        aguarda chamadas do proprio fake, que retornam direto).
+        Os watchers (simulation.scenario) sao chamados a cada mudanca de valor de qualquer node.
+    """
+    def __init__(self, namespace_uri: str = 'urn:fake:line', synchronous: bool = False):
+        self.synchronous = synchronous
+        self.watchers: List[Callable[[FakeNode, Any], None]] = []
+        self.namespaces = ['http://opcfoundation.org/UA/', 'urn:freeopcua:python:server']
+        self.nodes: Dict[NodeId, FakeNode] = {}
+        self.subscriptions: Dict[NodeId, List[FakeSubscription]] = {}
+        self.event_fields: Dict[NodeId, List[str]] = {}
+        self.events: List[tuple] = []
+        self._next_type_id = 1
+        self.objects_node = FakeNode(self, NodeId(ua.ObjectIds.ObjectsFolder, 0), ua.QualifiedName('Objects', 0))
+        self.register(self.objects_node)
+        self.namespace_index = self.register_namespace(namespace_uri)
+
+    def register(self, node: FakeNode):
+        if node.nodeid in self.nodes:
+            raise ua.UaStatusCodeError(ua.StatusCodes.BadNodeIdExists)
+
+        self.nodes[node.nodeid] = node
+
+    def register_namespace(self, uri: str) -> int:
+        if uri not in self.namespaces:
+            self.namespaces.append(uri)
+
+        return self.namespaces.index(uri)
+
+    async def get_namespace_index(self, uri: str) -> int:
+        return self.namespaces.index(uri)
+
+    def get_objects_node(self) -> FakeNode:
+        return self.objects_node
+
+    def get_node(self, nodeid: Union[NodeId, str]) -> FakeNode:
+        if not isinstance(nodeid, NodeId):
+            nodeid = NodeId.from_string(nodeid)
+
+        return self.nodes[nodeid]
+
+    async def create_custom_event_type(self, idx: int, name: str, basetype=None, properties=None) -> FakeNode:
+        node = FakeNode(self, NodeId(self._next_type_id, idx), ua.QualifiedName(name, idx))
+        self._next_type_id += 1
+        self.register(node)
+        self.event_fields[node.nodeid] = [field for field, *_ in (properties or [])]
+        return node
+
+    async def get_event_generator(self, etype: FakeNode, emitting_node: FakeNode) -> FakeEventGenerator:
+        return FakeEventGenerator(self, etype, emitting_node)
+
+    async def create_subscription(self, period, handler) -> FakeSubscription:
+        return FakeSubscription(self, handler)
+
+    def write(self, node: FakeNode, value: Any):
+        if node.varianttype == ua.VariantType.Boolean:
+            value = bool(value)
+
+        if node.value == value:
+            return
+
+        node.value = value
+        for subscription in self.subscriptions.get(node.nodeid, []):
+            self.notify(subscription, node)
+
+        for watcher in self.watchers:
+            watcher(node, value)
+
+    def notify(self, subscription: FakeSubscription, node: FakeNode):
+        datavalue = ua.DataValue(
+            ua.Variant(node.value, node.varianttype),
+            SourceTimestamp=datetime.now(timezone.utc),
+            ServerTimestamp=datetime.now(timezone.utc)
+        )
+
+        result = subscription.handler.datachange_notification(node, node.value, FakeNotification(datavalue))
+        if not asyncio.iscoroutine(result):
+            return
+
+        if not self.synchronous:
+            asyncio.get_running_loop().create_task(result)
+            return
+
+        try:
+            result.send(None)
+
+        except StopIteration:
+            return
+
+        result.close()
+        raise RuntimeError(f'subscription handler suspended during synchronous delivery of {node}')
+
+    def set_sensor(self, nodeid: Union[NodeId, str], value: Any):
+        """Simula o Factory I/O escrevendo um sensor."""
+        self.write(self.get_node(nodeid), value)
@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional
+from components.modbus import (
+    MBAP, READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS,
+    WRITE_SINGLE_COIL, WRITE_SINGLE_REGISTER, WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS,
+    pack_bits, unpack_bits
+)
+
+import argparse
+import asyncio
+import struct
+
+
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+
+
+class FakeModbusServer:
+    """
+        Servidor Modbus TCP em memoria no lugar do Factory I/O: coils e holding registers sao
+        escritos pelo controlador, discrete inputs sao os sensores (set_input simula a planta).
+        Conta as requisicoes por funcao em 'requests'.
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 5020, size: int = 1024):
+        self.host = host
+        self.port = port
+        self.coils: List[bool] = [False] * size
+        self.discrete_inputs: List[bool] = [False] * size
+        self.holding_registers: List[int] = [0] * size
+        self.input_registers: List[int] = [0] * size
+        self.requests: Dict[int, int] = {}
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+        # port 0: o sistema escolhe uma porta livre
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def set_input(self, address: int, value: bool):
+        self.discrete_inputs[address] = bool(value)
+
+    def _check(self, table: list, address: int, count: int):
+        if count < 1 or address + count > len(table):
+            raise IndexError
+
+    def _execute(self, function: int, data: bytes) -> bytes:
+        if function in (READ_COILS, READ_DISCRETE_INPUTS):
+            address, count = struct.unpack('>HH', data[:4])
+            table = self.coils if function == READ_COILS else self.discrete_inputs
+            self._check(table, address, count)
+            values = pack_bits(table[address:address + count])
+            return bytes([len(values)]) + values
+
+        if function in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+            address, count = struct.unpack('>HH', data[:4])
+            table = self.holding_registers if function == READ_HOLDING_REGISTERS else self.input_registers
+            self._check(table, address, count)
+            return struct.pack(f'>B{count}H', count * 2, *table[address:address + count])
+
+        if function == WRITE_SINGLE_COIL:
+            address, value = struct.unpack('>HH', data[:4])
+            self._check(self.coils, address, 1)
+            self.coils[address] = value == 0xFF00
+            return data[:4]
+
+        if function == WRITE_SINGLE_REGISTER:
+            address, value = struct.unpack('>HH', data[:4])
+            self._check(self.holding_registers, address, 1)
+            self.holding_registers[address] = value
+            return data[:4]
+
+        if function == WRITE_MULTIPLE_COILS:
+            address, count, _ = struct.unpack('>HHB', data[:5])
+            self._check(self.coils, address, count)
+            self.coils[address:address + count] = unpack_bits(data[5:], count)
+            return data[:4]
+
+        if function == WRITE_MULTIPLE_REGISTERS:
+            address, count, _ = struct.unpack('>HHB', data[:5])
+            self._check(self.holding_registers, address, count)
+            self.holding_registers[address:address + count] = struct.unpack(f'>{count}H', data[5:5 + count * 2])
+            return data[:4]
+
+        raise NotImplementedError
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                transaction, protocol, length, unit = MBAP.unpack(await reader.readexactly(MBAP.size))
+                pdu = await reader.readexactly(length - 1)
+                function = pdu[0]
+                self.requests[function] = self.requests.get(function, 0) + 1
+
+                try:
+                    response = bytes([function]) + self._execute(function, pdu[1:])
+
+                except NotImplementedError:
+                    response = bytes([function | 0x80, ILLEGAL_FUNCTION])
+
+                except IndexError:
+                    response = bytes([function | 0x80, ILLEGAL_DATA_ADDRESS])
+
+                writer.write(MBAP.pack(transaction, protocol, len(response) + 1, unit) + response)
+                await writer.drain()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+        finally:
+            writer.close()
+
+
+async def main(host: str, port: int):
+    server = FakeModbusServer(host, port)
+    await server.start()
+    print(f'fake modbus server on {host}:{port}')
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor Modbus TCP em memoria no lugar do Factory I/O')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5020)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.host, args.port))
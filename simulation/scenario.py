@@ -0,0 +1,140 @@
+from typing import Any, List, Optional, Tuple, Union
+from asyncua.ua import NodeId
+from components.base import BaseComponent
+from simulation.fake_server import FakeNode, FakeServer
+
+import asyncio
+import time
+
+
+NodeRef = Union[FakeNode, NodeId, str]
+
+# (atraso em segundos da planta, sensor, valor)
+Effect = Tuple[float, NodeRef, Any]
+
+
+class Rule:
+    """Reacao da planta: quando o atuador vai para 'value', aplica os efeitos nos sensores."""
+    def __init__(self, actuator: NodeId, value: Any, effects: List[Effect], once: bool):
+        self.actuator = actuator
+        self.value = value
+        self.effects = effects
+        self.once = once
+        self.fired = 0
+
+
+class Scenario:
+    """
+        Roteiro de sensores para o servidor fake, no lugar do Factory I/O.
+
+        Passos temporizados (at, pulse) e esperas por atuador (expect) rodam em sequencia no
+        run(); regras reativas (on) ficam ativas do start ao stop e respondem as escritas dos
+        componentes, ex: quando a esteira liga, o sensor de fim sobe 2 s depois. Os atrasos sao
+        em segundos da planta, escalados por BaseComponent.time_scale como os dwell.
+
+            scenario = (Scenario(server)
+                .on(feeder.conveyors[0], True, (0.5, feeder.sensors[0], True), (1.0, feeder.sensors[0], False))
+                .expect(feeder.conveyors[0], False)
+                .at(0.2, feeder.sensors[1], True))
+            await scenario.run(timeout=1.0)
+
+        Tudo o que muda (atuadores e sensores) fica em 'log' como (t, node_id, valor).
+    """
+    def __init__(self, server: FakeServer, time_scale: Optional[float] = None):
+        self.server = server
+        self.time_scale = time_scale
+        self.rules: List[Rule] = []
+        self.steps: List[tuple] = []
+        self.log: List[Tuple[float, str, Any]] = []
+        self.started_at: Optional[float] = None
+
+        self._changed = asyncio.Event()
+        self._cursor = 0
+        self._handles: List[asyncio.TimerHandle] = []
+
+    def node(self, ref: NodeRef) -> FakeNode:
+        return ref if isinstance(ref, FakeNode) else self.server.get_node(ref)
+
+    @property
+    def scale(self) -> float:
+        return BaseComponent.time_scale if self.time_scale is None else self.time_scale
+
+    def on(self, actuator: NodeRef, value: Any, *effects: Effect, once: bool = False) -> 'Scenario':
+        self.rules.append(Rule(self.node(actuator).nodeid, value, list(effects), once))
+        return self
+
+    def at(self, delay: float, sensor: NodeRef, value: Any) -> 'Scenario':
+        """Escreve o sensor 'delay' segundos depois do passo anterior."""
+        self.steps.append(('at', delay, self.node(sensor), value))
+        return self
+
+    def pulse(self, sensor: NodeRef, width: float, delay: float = 0.0) -> 'Scenario':
+        return self.at(delay, sensor, True).at(width, sensor, False)
+
+    def expect(self, actuator: NodeRef, value: Any) -> 'Scenario':
+        """
+            Espera a proxima mudanca do atuador para 'value' depois da mudanca casada pelo
+            expect anterior, assim uma sequencia de expects confere a ordem dos comandos.
+        """
+        self.steps.append(('expect', 0.0, self.node(actuator), value))
+        return self
+
+    def _watch(self, node: FakeNode, value: Any):
+        self.log.append((time.monotonic() - self.started_at, node.nodeid.to_string(), value))
+        self._changed.set()
+
+        loop = asyncio.get_running_loop()
+        for rule in self.rules:
+            if rule.actuator != node.nodeid or rule.value != value or (rule.once and rule.fired):
+                continue
+
+            rule.fired += 1
+            for delay, sensor, sensor_value in rule.effects:
+                # fora da escrita atual, o efeito nunca reentra no componente que escreveu
+                handle = loop.call_later(delay * self.scale, self.server.write, self.node(sensor), sensor_value)
+                self._handles.append(handle)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.server.watchers.append(self._watch)
+
+    def stop(self):
+        if self._watch in self.server.watchers:
+            self.server.watchers.remove(self._watch)
+
+        for handle in self._handles:
+            handle.cancel()
+
+        self._handles.clear()
+
+    async def _play(self):
+        for kind, delay, node, value in self.steps:
+            if kind == 'at':
+                await asyncio.sleep(delay * self.scale)
+                self.server.write(node, value)
+                continue
+
+            node_id = node.nodeid.to_string()
+            while True:
+                index = next((i for i in range(self._cursor, len(self.log)) if self.log[i][1:] == (node_id, value)), None)
+                if index is not None:
+                    self._cursor = index + 1
+                    break
+
+                self._changed.clear()
+                await self._changed.wait()
+
+    async def run(self, timeout: Optional[float] = None, keep: bool = False):
+        """
+            Roda os passos em sequencia. timeout em segundos reais (asyncio.TimeoutError);
+            keep mantem as regras ativas depois dos passos.
+        """
+        if self.started_at is None:
+            self.start()
+
+        try:
+            await asyncio.wait_for(self._play(), timeout)
+
+        finally:
+            if not keep:
+                self.stop()
@@ -0,0 +1,21 @@
+from components.base import BaseComponent
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fast_components():
+    """Tempos de planta em centesimos, sem perfil de tempos, watchdog ou gravador."""
+    previous = (BaseComponent.time_scale, BaseComponent.recorder, BaseComponent.timing,
+                BaseComponent.watchdog, BaseComponent.suppress_writes)
+
+    BaseComponent.time_scale = 0.01
+    BaseComponent.recorder = None
+    BaseComponent.timing = None
+    BaseComponent.watchdog = None
+    BaseComponent.suppress_writes = True
+
+    yield
+
+    (BaseComponent.time_scale, BaseComponent.recorder, BaseComponent.timing,
+     BaseComponent.watchdog, BaseComponent.suppress_writes) = previous
@@ -0,0 +1,117 @@
+from typing import Any, Awaitable, Callable, List, Tuple
+from components.base import BaseComponent
+from simulation.fake_server import FakeServer
+from simulation.scenario import Scenario
+
+import asyncio
+
+
+async def started(component: BaseComponent) -> asyncio.Task:
+    """Monta o componente, roda a task e libera o start."""
+    await component.build()
+    task = asyncio.create_task(component.run())
+    await asyncio.sleep(0)
+    component.start_event.set()
+    return task
+
+
+async def stop(*tasks: asyncio.Task):
+    for task in tasks:
+        task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def until(condition: Callable[[], bool], timeout: float = 2.0):
+    """Espera a condicao ficar verdadeira, timeout em segundos reais."""
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.001)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+def changes(scenario: Scenario, node) -> List[Any]:
+    """Valores escritos no node, na ordem, tirados do log do cenario."""
+    node_id = node.nodeid.to_string()
+    return [value for _, changed, value in scenario.log if changed == node_id]
+
+
+def index_of(scenario: Scenario, node, value, start: int = 0) -> int:
+    node_id = node.nodeid.to_string()
+    return next(i for i in range(start, len(scenario.log)) if scenario.log[i][1:] == (node_id, value))
+
+
+class PreviousStage:
+    """move_prev_stage de mentira, guarda os comandos do turntable para o estagio anterior."""
+    def __init__(self):
+        self.commands: List[bool] = []
+
+    async def __call__(self, value: bool):
+        self.commands.append(value)
+
+
+def feeder_plant(server: FakeServer, feeder) -> Scenario:
+    """
+        Esteiras do feeder: a esteira 1 leva a caixa pelo sensor de start, as esteiras do fim
+        (ou a passagem pelo start nos feeders de 2 esteiras) levam ate o sensor de fim, e a
+        ultima esteira ligada pelo turntable tira a caixa do sensor de fim.
+    """
+    start, end = feeder.sensors
+    scenario = Scenario(server).on(feeder.conveyors[0], True, (0.3, start, True), (0.6, start, False))
+
+    if feeder.num_conveyors > 2:
+        scenario.on(feeder.conveyors[2], True, (0.5, end, True))
+
+    else:
+        scenario.on(start, False, (0.5, end, True))
+
+    return scenario.on(feeder.conveyors[-1], True, (0.2, end, False))
+
+
+async def puller(queue, count: int, hold: float = 0.0) -> List[Tuple[Any, Callable[[bool], Awaitable]]]:
+    """Turntable de selecao: puxa 'count' caixas, cada uma 'hold' segundos de planta depois de chegar."""
+    pulled = []
+    for _ in range(count):
+        item = await queue.get()
+        _, move_to_next = item
+
+        await asyncio.sleep(hold * BaseComponent.time_scale)
+        await move_to_next(True)
+        await asyncio.sleep(0.5 * BaseComponent.time_scale)
+        await move_to_next(False)
+        pulled.append(item)
+
+    return pulled
+
+
+def handler_plant(server: FakeServer, handler, positions=range(1, 10), travel: float = 1.0) -> Scenario:
+    """
+        Elevador do rack: cada novo valor de Position liga o sensor de movimento X por 'travel'
+        segundos; o garfo chega na esquerda, direita ou centro e o elevador sobe ou desce com
+        um pulso do sensor Z.
+    """
+    scenario = Scenario(server)
+    for position in [*positions, handler.idle_position]:
+        scenario.on(handler.position, position, (0.2, handler.sensor_x, True), (0.2 + travel, handler.sensor_x, False))
+
+    for actuator, sensor in ((handler.handler_move_leff, handler.sensor_left), (handler.handler_move_right, handler.sensor_right)):
+        scenario.on(actuator, True, (0.1, handler.sensor_center, False), (0.3, sensor, True))
+        scenario.on(actuator, False, (0.1, sensor, False), (0.3, handler.sensor_center, True))
+
+    for value in (True, False):
+        scenario.on(handler.handler_raise, value, (0.1, handler.sensor_z, True), (0.5, handler.sensor_z, False))
+
+    return scenario
+
+
+def pick_place_plant(server: FakeServer, station) -> Scenario:
+    """Eixos X e Z do PickPlace com os sensores Moving* em 1 durante o movimento, a garra detecta a tampa."""
+    scenario = Scenario(server)
+    for actuator, sensor in ((station.move_x, station.moving_x), (station.move_z, station.moving_z)):
+        for value in (True, False):
+            scenario.on(actuator, value, (0.1, sensor, True), (0.4, sensor, False))
+
+    return (scenario
+        .on(station.grab, True, (0.1, station.item_detected, True))
+        .on(station.grab, False, (0.1, station.item_detected, False)))
@@ -0,0 +1,44 @@
+from components.base import BoxType
+from components.order import BoxRecord, CoverType, Order, OrderState
+from manager.archive import ColumnArchive
+from manager.order_table import OrderTable
+
+
+def test_column_archive_overwrites_oldest_rows():
+    archive = ColumnArchive([('order_id', 'I'), ('finished_at', 'd')], budget_bytes=3 * 12)
+
+    for order_id in range(5):
+        archive.append(order_id, float(order_id))
+
+    assert archive.capacity == 3
+    assert len(archive) == 3 and archive.overwritten == 2
+    assert [row['order_id'] for row in archive.rows()] == [2, 3, 4]
+    assert archive.find_last('order_id', 4)['finished_at'] == 4.0
+    assert archive.find_last('order_id', 0) is None
+
+
+def test_order_table_archives_finished_orders():
+    table = OrderTable(retention=1, archive_budget=4096)
+    first, second = Order(1, BoxType.GREEN, 2, CoverType.NO_COVER, True), Order(2, BoxType.GREEN, 1, CoverType.NO_COVER, True)
+
+    for item in (first, second):
+        table.add(item)
+        item.set_state(OrderState.PRODUCTION)
+        for _ in range(item.quantity):
+            item.start_box()
+            item.box_finished()
+
+    # so a ultima finalizada fica como objeto, a primeira vai para o arquivo colunar
+    assert table.get(1) is None
+    assert table.get(2) is second
+    assert table.status(1)[:4] == (OrderState.COMPLETED, BoxType.GREEN, 2, 2)
+    assert len(table.box_archive) == 3
+    assert [row['seq'] for row in table.box_archive.find('order_id', 1)] == [0, 1]
+    assert table.active() == 0
+
+    report = table.memory_report()
+    assert report['archived_orders'] == 1 and report['archived_boxes'] == 3
+    assert report['bytes_per_archived_order'] == table.order_archive.row_bytes
+    # ordens e registros de caixa sem __dict__
+    assert not hasattr(second, '__dict__')
+    assert not hasattr(BoxRecord(2, 0, BoxType.GREEN, True), '__dict__')
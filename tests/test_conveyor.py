@@ -0,0 +1,94 @@
+from components.base import BoxType
+from components.conveyor import Conveyor, ConveyorAccess, ConveyorDirection
+from components.order import CoverType, Order
+from simulation.fake_server import FakeServer
+from simulation.scenario import Scenario
+from tests.plant import PreviousStage, changes, started, stop, until
+
+import asyncio
+
+
+async def next_stage(queue: asyncio.Queue):
+    """Proximo estagio: pega a caixa e liga a ultima esteira para puxar."""
+    order, move_to_next = await queue.get()
+    await move_to_next(True)
+    return order
+
+
+def test_conveyor_moves_box_to_end_and_waits_next_stage():
+    async def main():
+        server = FakeServer(synchronous=True)
+        queue_input, queue_output, sem_input = asyncio.Queue(), asyncio.Queue(), asyncio.Semaphore(2)
+        conveyor = Conveyor('Input', server, server.namespace_index, server.get_objects_node(),
+                            2, 2, {ConveyorDirection.FORWARD}, queue_input, queue_output, sem_input)
+
+        task = await started(conveyor)
+        start, end = conveyor.sensors
+        scenario = (Scenario(server)
+            .expect(conveyor.engines[0], True)
+            .at(0.2, start, True)
+            .at(0.2, start, False)                  # caixa entrou inteira
+            .expect(conveyor.engines[0], False)
+            .expect(conveyor.engines[0], True)
+            .at(0.5, end, True)                     # chegou no fim
+            .expect(conveyor.engines[1], False)
+            .expect(conveyor.engines[1], True)      # proximo estagio puxando
+            .at(0.2, end, False))
+
+        order = Order(1, BoxType.GREEN, 1, CoverType.NO_COVER, True)
+        await queue_input.put((order, None))
+        pulled = asyncio.create_task(next_stage(queue_output))
+
+        try:
+            await scenario.run(timeout=2.0)
+            # a caixa saiu do fim, a vaga da entrada foi devolvida
+            await until(lambda: not conveyor.active_waits)
+
+        finally:
+            await stop(task)
+
+        return conveyor, scenario, sem_input, await pulled
+
+    conveyor, scenario, sem_input, order = asyncio.run(main())
+
+    assert order.order_id == 1
+    assert changes(scenario, conveyor.engines[0]) == [True, False, True, False]
+    assert conveyor.items == 0
+    assert not sem_input.locked()
+
+
+def test_access_conveyor_pulls_previous_stage_and_hands_over():
+    async def main():
+        server = FakeServer(synchronous=True)
+        queue_input, queue_output = asyncio.Queue(), asyncio.Queue()
+        conveyor = ConveyorAccess('Access', server, server.namespace_index, server.get_objects_node(),
+                                  1, 1, {ConveyorDirection.FORWARD, ConveyorDirection.BACKWARD}, queue_input, queue_output, asyncio.Semaphore(2))
+
+        task = await started(conveyor)
+        end = conveyor.sensors[1]
+        scenario = (Scenario(server)
+            .expect(conveyor.engines[0], True)
+            .at(0.3, end, True)
+            .at(0.3, end, False)                    # caixa parada no fim
+            .expect(conveyor.engines[0], False)
+            .at(0.5, end, True)                     # o handler tira a caixa
+            .at(0.3, end, False))
+
+        previous = PreviousStage()
+        order = Order(1, BoxType.BLUE, 1, CoverType.NO_COVER, False)
+        await queue_input.put((order, previous))
+
+        try:
+            await scenario.run(timeout=2.0)
+            # depois da saida da caixa a esteira volta a esperar a proxima ordem
+            await until(lambda: queue_input._getters)
+
+        finally:
+            await stop(task)
+
+        return queue_output.get_nowait(), previous
+
+    (order, move_to_next), previous = asyncio.run(main())
+
+    assert order.order_id == 1
+    assert previous.commands == [True, False]
@@ -0,0 +1,76 @@
+from components.base import BoxType
+from components.box_producer import BoxFeeder
+from components.order import CoverType, Order, OrderState
+from manager.jobs import JobQueue
+from simulation.fake_server import FakeServer
+from tests.plant import changes, feeder_plant, index_of, puller, started, stop, until
+
+import asyncio
+import pytest
+
+
+# emitters e esteiras de cada feeder, como na Line
+FEEDERS = [(BoxType.GREEN, 2, 4), (BoxType.BLUE, 2, 2), (BoxType.METAL, 2, 4)]
+
+
+async def produce(box_type: BoxType, num_emitters: int, num_conveyors: int, pipelined: bool, boxes: int, hold: float = 0.0):
+    server = FakeServer(synchronous=True)
+    jobs, queue = JobQueue(), asyncio.Queue()
+    feeder = BoxFeeder(jobs, box_type, server, server.namespace_index, server.get_objects_node(),
+                       num_emitters, num_conveyors, queue, pipelined)
+
+    task = await started(feeder)
+    scenario = feeder_plant(server, feeder)
+    scenario.start()
+
+    order = Order(1, box_type, boxes, CoverType.NO_COVER, True)
+    await jobs.put(order)
+
+    try:
+        pulled = await asyncio.wait_for(puller(queue, boxes, hold), 5.0)
+        await until(lambda: not feeder.sensors[1].value)
+
+    finally:
+        scenario.stop()
+        await stop(task)
+
+    return feeder, order, pulled, scenario
+
+
+@pytest.mark.parametrize('box_type, num_emitters, num_conveyors', FEEDERS, ids=lambda value: getattr(value, 'name', None))
+def test_sequential_feeder_delivers_each_box(box_type, num_emitters, num_conveyors):
+    feeder, order, pulled, scenario = asyncio.run(produce(box_type, num_emitters, num_conveyors, False, 2))
+
+    assert feeder.boxes_done == 2
+    assert [item[0] for item in pulled] == [order, order]
+    assert order.state == OrderState.PRODUCTION
+    assert order.boxes_started == 2
+
+    # uma subida e uma descida do sensor de fim por caixa
+    assert changes(scenario, feeder.sensors[1]) == [True, False, True, False]
+    # o produto enche um container por caixa
+    assert changes(scenario, feeder.emitters[1]).count(True) >= 2
+    # a ultima esteira termina desligada
+    assert feeder.conveyors[-1].value is False
+
+
+@pytest.mark.parametrize('box_type, num_emitters, num_conveyors', FEEDERS, ids=lambda value: getattr(value, 'name', None))
+def test_pipelined_feeder_fills_while_previous_box_waits(box_type, num_emitters, num_conveyors):
+    # o turntable demora para puxar, a segunda caixa é enchida com a primeira parada no fim
+    feeder, order, pulled, scenario = asyncio.run(produce(box_type, num_emitters, num_conveyors, True, 2, hold=12))
+
+    assert feeder.boxes_done == 2
+    assert order.boxes_started == 2
+    assert changes(scenario, feeder.sensors[1]) == [True, False, True, False]
+
+    end, product = feeder.sensors[1], feeder.emitters[1]
+    first_arrival = index_of(scenario, end, True)
+    first_pull = index_of(scenario, end, False)
+    second_fill = index_of(scenario, product, True, first_arrival)
+    assert second_fill < first_pull
+
+    if num_conveyors > 2:
+        # a segunda caixa espera na esteira 2 ate a primeira sair do sensor de fim
+        hold = index_of(scenario, feeder.conveyors[1], False, second_fill)
+        assert hold < first_pull
+        assert index_of(scenario, feeder.conveyors[1], True, hold) > first_pull
@@ -0,0 +1,152 @@
+from components.base import BoxType
+from components.handler import Handler
+from components.order import CoverType, Order, OrderState
+from manager.order_table import OrderTable
+from manager.parking import HandlerParking, ParkingPolicy
+from simulation.fake_server import FakeServer
+from tests.plant import changes, handler_plant, started, stop, until
+
+import asyncio
+
+
+class PlannedSlotting:
+    """Plano fixo de re-slotting, um movimento."""
+    def __init__(self, move):
+        self.move = move
+        self.max_moves = 1
+        self.moves = 0
+        self.aborted = 0
+
+    def plan(self, slots):
+        return self.move
+
+
+async def rack(idle_delay: float = 1000.0, travel: float = 1.0):
+    server = FakeServer(synchronous=True)
+    handler = Handler('Handler', server, server.namespace_index, server.get_objects_node(),
+                      asyncio.Queue(), asyncio.Queue(), asyncio.Semaphore(2), asyncio.Semaphore(2))
+    handler.idle_delay = idle_delay
+
+    task = await started(handler)
+    scenario = handler_plant(server, handler, travel=travel)
+    scenario.start()
+    return handler, scenario, task
+
+
+def test_input_a_stores_box_in_first_free_position():
+    async def main():
+        handler, scenario, task = await rack()
+        order = Order(1, BoxType.GREEN, 1, CoverType.NO_COVER, False)
+        await handler.queue_input_a.put((order, None))
+
+        try:
+            await until(lambda: handler.cycle_histogram.count == 1)
+
+        finally:
+            scenario.stop()
+            await stop(task)
+
+        return handler, scenario, order
+
+    handler, scenario, order = asyncio.run(main())
+
+    # home A (8), pega pela esquerda, guarda em P1 pela direita e volta
+    assert changes(scenario, handler.position) == [8, 1, 8]
+    assert changes(scenario, handler.handler_move_leff) == [True, False]
+    assert changes(scenario, handler.handler_move_right) == [True, False]
+    assert changes(scenario, handler.handler_raise) == [True, False]
+    assert handler.slots[0] == (BoxType.GREEN, CoverType.NO_COVER)
+    assert handler.at_position == 8
+    assert order.state == OrderState.COMPLETED
+
+
+def test_input_b_stores_box_after_occupied_positions():
+    async def main():
+        handler, scenario, task = await rack()
+        handler.slots[0] = (BoxType.BLUE, CoverType.NO_COVER)
+        order = Order(1, BoxType.METAL, 1, CoverType.WITH_COVER, False)
+        await handler.queue_input_b.put((order, None))
+
+        try:
+            await until(lambda: handler.cycle_histogram.count == 1)
+
+        finally:
+            scenario.stop()
+            await stop(task)
+
+        return handler, scenario
+
+    handler, scenario = asyncio.run(main())
+
+    assert changes(scenario, handler.position) == [1, 2, 1]
+    assert handler.slots[:2] == [(BoxType.BLUE, CoverType.NO_COVER), (BoxType.METAL, CoverType.WITH_COVER)]
+    assert handler.last_home == 1
+
+
+def test_box_arrival_aborts_reslot_before_pick():
+    async def main():
+        handler, scenario, task = await rack(travel=3.0)
+        handler.slots[4] = (BoxType.GREEN, CoverType.NO_COVER)
+        handler.slotting = PlannedSlotting((5, 9))
+
+        async def reslot():
+            async with handler.lock_processor:
+                return await handler.reslot()
+
+        reslot_task = asyncio.create_task(reslot())
+        await until(lambda: handler._is_moving)
+
+        # a caixa chega com o elevador indo para P5
+        order = Order(1, BoxType.BLUE, 1, CoverType.NO_COVER, False)
+        await handler.queue_input_a.put((order, None))
+
+        try:
+            completed = await asyncio.wait_for(reslot_task, 2.0)
+            await until(lambda: handler.cycle_histogram.count == 1)
+
+        finally:
+            scenario.stop()
+            await stop(task)
+
+        return handler, scenario, completed
+
+    handler, scenario, completed = asyncio.run(main())
+
+    assert completed is False
+    assert handler.slotting.aborted == 1 and handler.slotting.moves == 0
+    # a caixa do re-slotting nao saiu do lugar, a nova foi para a primeira posicao livre
+    assert handler.slots[4] == (BoxType.GREEN, CoverType.NO_COVER)
+    assert handler.slots[0] == (BoxType.BLUE, CoverType.NO_COVER)
+    assert changes(scenario, handler.position) == [5, 8, 1, 8]
+    assert changes(scenario, handler.handler_move_right) == [True, False]
+
+
+def test_idle_handler_parks_at_predicted_input():
+    async def main():
+        handler, scenario, task = await rack(idle_delay=5.0)
+        handler.slots[0] = (BoxType.BLUE, CoverType.NO_COVER)
+
+        # a proxima caixa de storage tem tampa, chega pela entrada B (home 1)
+        orders = OrderTable()
+        handler.parking = HandlerParking(ParkingPolicy.PREDICTIVE, orders)
+        orders.add(Order(2, BoxType.METAL, 1, CoverType.WITH_COVER, False))
+
+        await handler.queue_input_a.put((Order(1, BoxType.GREEN, 1, CoverType.NO_COVER, False), None))
+
+        try:
+            await until(lambda: handler.parked)
+            await handler.queue_input_b.put((orders.get(2), None))
+            await until(lambda: handler.cycle_histogram.count == 2)
+
+        finally:
+            scenario.stop()
+            await stop(task)
+
+        return handler, scenario
+
+    handler, scenario = asyncio.run(main())
+
+    # guarda pela entrada A, estaciona em P1 e a caixa seguinte chega por B sem deslocamento
+    assert changes(scenario, handler.position) == [8, 2, 8, 1, 3, 1]
+    assert handler.parking.parks == 1
+    assert handler.parking.hits == 1 and handler.parking.misses == 0
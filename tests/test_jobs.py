@@ -0,0 +1,30 @@
+from components.base import BoxType
+from components.order import CoverType, Order
+from manager.jobs import JobQueue
+
+
+def order(order_id: int, box_type: BoxType = BoxType.GREEN, quantity: int = 1, priority: int = 0, delivery: bool = True) -> Order:
+    return Order(order_id, box_type, quantity, CoverType.NO_COVER, delivery, priority, due=float(order_id))
+
+
+def test_job_queue_serves_urgent_order_between_boxes():
+    jobs = JobQueue()
+    long, urgent = order(1, quantity=3), order(2, priority=5)
+
+    jobs.put_nowait(long)
+    served = [jobs.get_nowait()]
+    long.boxes_started = 1
+    jobs.put_nowait(urgent)
+
+    served += [jobs.get_nowait() for _ in range(3)]
+    assert served == [long, urgent, long, long]
+    assert jobs.empty() and jobs.qsize() == 0
+
+
+def test_job_queue_skips_order_with_every_box_started():
+    jobs = JobQueue()
+    done = order(1, quantity=2)
+    done.boxes_started = 2
+
+    jobs.put_nowait(done)
+    assert jobs.empty()
@@ -0,0 +1,99 @@
+from components.base import BoxType
+from components.box_producer import BoxFeeder
+from components.order import CoverType, Order
+from manager.jobs import JobQueue
+from manager.line import default_router
+from manager.merge import FeederMerge, MergePolicy
+from simulation.fake_server import FakeServer
+from tests.plant import feeder_plant, puller, started, stop
+
+import asyncio
+
+
+def order(order_id: int, box_type: BoxType = BoxType.GREEN, quantity: int = 1, priority: int = 0, delivery: bool = True) -> Order:
+    return Order(order_id, box_type, quantity, CoverType.NO_COVER, delivery, priority, due=float(order_id))
+
+
+def fill(merge: FeederMerge, boxes):
+    for order_id, (box_type, delivery) in enumerate(boxes):
+        merge.slot(box_type).items.append(((order(order_id, box_type, delivery=delivery), None), 0.0))
+
+
+async def drain(merge: FeederMerge, count: int):
+    return [(await merge.get())[0].box_type for _ in range(count)]
+
+
+def test_round_robin_merge_alternates_ready_feeders():
+    merge = FeederMerge([BoxType.GREEN, BoxType.BLUE, BoxType.METAL], slot_size=2)
+    fill(merge, [(BoxType.GREEN, True), (BoxType.GREEN, True), (BoxType.METAL, True)])
+
+    assert asyncio.run(drain(merge, 3)) == [BoxType.GREEN, BoxType.METAL, BoxType.GREEN]
+    assert merge.empty()
+
+
+def test_weighted_merge_follows_weights():
+    merge = FeederMerge([BoxType.GREEN, BoxType.BLUE], MergePolicy.WEIGHTED, slot_size=6, weights={BoxType.GREEN: 2})
+    fill(merge, [(BoxType.GREEN, True)] * 4 + [(BoxType.BLUE, True)] * 2)
+
+    G, B = BoxType.GREEN, BoxType.BLUE
+    assert asyncio.run(drain(merge, 6)) == [G, B, G, G, B, G]
+    assert merge.slot(BoxType.GREEN).boxes == 4
+
+
+def test_route_balance_merge_prefers_idle_branch():
+    merge = FeederMerge([BoxType.GREEN, BoxType.BLUE], MergePolicy.ROUTE_BALANCE, slot_size=2, branch_of=default_router)
+    fill(merge, [(BoxType.GREEN, True), (BoxType.GREEN, True), (BoxType.BLUE, False)])
+
+    # depois de uma caixa para entrega, a de estoque passa na frente da outra de entrega
+    served = asyncio.run(drain(merge, 3))
+    assert served == [BoxType.GREEN, BoxType.BLUE, BoxType.GREEN]
+
+
+def test_feeder_slot_blocks_when_full():
+    async def main():
+        merge = FeederMerge([BoxType.GREEN])
+        slot = merge.slot(BoxType.GREEN)
+        await slot.put((order(1), None))
+
+        blocked = asyncio.create_task(slot.put((order(2), None)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        await merge.get()
+        await asyncio.wait_for(blocked, 1.0)
+        return slot
+
+    slot = asyncio.run(main())
+    assert slot.qsize() == 1
+    assert slot.blocked_time > 0
+
+
+def test_feeder_puts_into_merge_slot():
+    async def main():
+        server = FakeServer(synchronous=True)
+        jobs = JobQueue()
+        merge = FeederMerge([BoxType.GREEN, BoxType.BLUE])
+        feeder = BoxFeeder(jobs, BoxType.BLUE, server, server.namespace_index, server.get_objects_node(),
+                           2, 2, merge.slot(BoxType.BLUE))
+
+        task = await started(feeder)
+        scenario = feeder_plant(server, feeder)
+        scenario.start()
+
+        order = Order(1, BoxType.BLUE, 1, CoverType.NO_COVER, True)
+        await jobs.put(order)
+
+        try:
+            pulled = await asyncio.wait_for(puller(merge, 1), 5.0)
+
+        finally:
+            scenario.stop()
+            await stop(task)
+
+        return merge, order, pulled
+
+    merge, order, pulled = asyncio.run(main())
+
+    assert pulled[0][0] is order
+    assert merge.slot(BoxType.BLUE).boxes == 1
+    assert merge.empty()
@@ -0,0 +1,136 @@
+from asyncua import ua
+from components.modbus import (
+    READ_COILS, READ_DISCRETE_INPUTS, WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS, WRITE_SINGLE_COIL,
+    ModbusAddressMap, ModbusBackend, ModbusClient, ModbusError, contiguous_runs
+)
+from simulation.fake_server import FakeServer
+from simulation.modbus_server import ILLEGAL_DATA_ADDRESS, FakeModbusServer
+from tests.plant import stop, until
+
+import asyncio
+import pytest
+
+
+async def modbus_server(size: int = 1024) -> FakeModbusServer:
+    plant = FakeModbusServer(port=0, size=size)
+    await plant.start()
+    return plant
+
+
+def test_client_function_codes():
+    async def main():
+        plant = await modbus_server(size=16)
+        client = ModbusClient(plant.host, plant.port)
+        await client.connect()
+
+        try:
+            await client.write_coil(3, True)
+            await client.write_coils(8, [True, False, True])
+            await client.write_registers(2, [7, 65535])
+            plant.set_input(1, True)
+
+            coils = await client.read_coils(0, 11)
+            inputs = await client.read_discrete_inputs(0, 3)
+            with pytest.raises(ModbusError) as error:
+                await client.read_coils(10, 8)
+
+        finally:
+            await client.close()
+            await plant.stop()
+
+        return plant, coils, inputs, error.value
+
+    plant, coils, inputs, error = asyncio.run(main())
+
+    assert [address for address, value in enumerate(coils) if value] == [3, 8, 10]
+    assert inputs == [False, True, False]
+    assert plant.holding_registers[2:4] == [7, 65535]
+    assert (error.function, error.code) == (READ_COILS, ILLEGAL_DATA_ADDRESS)
+    assert plant.requests == {WRITE_SINGLE_COIL: 1, WRITE_MULTIPLE_COILS: 1, WRITE_MULTIPLE_REGISTERS: 1, READ_COILS: 2, READ_DISCRETE_INPUTS: 1}
+
+
+async def bound_backend(plant: FakeModbusServer):
+    """Backend com duas entradas, coils nos enderecos 0, 1 e 5 e um holding register."""
+    server = FakeServer(synchronous=True)
+    objects = server.get_objects_node()
+    address_map = ModbusAddressMap()
+    address_map.tables['coil'] = {'Coil0': 0, 'Coil1': 1, 'Coil5': 5}
+
+    backend = ModbusBackend(ModbusClient(plant.host, plant.port), address_map, scan_period=0.001, reconnect_delay=0.01)
+    io = {}
+    for name, value, varianttype, actuator in [
+            ('Input0', False, ua.VariantType.Boolean, False), ('Input1', False, ua.VariantType.Boolean, False),
+            ('Coil0', False, ua.VariantType.Boolean, True), ('Coil1', False, ua.VariantType.Boolean, True),
+            ('Coil5', False, ua.VariantType.Boolean, True), ('Position', 0, ua.VariantType.Int32, True)]:
+        node = await objects.add_variable(f'ns={server.namespace_index};s={name}', name, value, varianttype)
+        io[name] = (node, backend.bind(server, node, varianttype, actuator))
+
+    return backend, io
+
+
+def test_scan_mirrors_only_changed_inputs():
+    async def main():
+        plant = await modbus_server()
+        backend, io = await bound_backend(plant)
+        await backend.client.connect()
+        input0, input1 = io['Input0'][0], io['Input1'][0]
+
+        try:
+            plant.set_input(0, True)
+            await backend.scan()
+            first = [await input0.read_value(), await input1.read_value()]
+
+            # outro valor no espelho da entrada 0: so a entrada que mudou na planta é reescrita
+            await input0.write_value(False)
+            plant.set_input(1, True)
+            await backend.scan()
+            second = [await input0.read_value(), await input1.read_value()]
+
+        finally:
+            await backend.client.close()
+            await plant.stop()
+
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert first == [True, False]
+    assert second == [False, True]
+
+
+def test_writes_without_connection_are_pushed_on_reconnect():
+    async def main():
+        plant = await modbus_server()
+        backend, io = await bound_backend(plant)
+        plant.coils[2] = True       # fora do mapa, a reconexao nao pode apagar
+
+        # sem conexao a escrita fica so no espelho OPC UA
+        await io['Coil1'][1].write(True)
+        await io['Coil5'][1].write(True)
+        await io['Position'][1].write(4)
+        mirrored = [await io['Coil1'][0].read_value(), plant.coils[1]]
+
+        task = asyncio.create_task(backend.run())
+        try:
+            await until(lambda: backend.connects == 1 and backend.scans > 0)
+
+        finally:
+            await stop(task)
+            await backend.client.close()
+            await plant.stop()
+
+        return plant, mirrored
+
+    plant, mirrored = asyncio.run(main())
+
+    assert mirrored == [True, False]
+    assert plant.coils[:6] == [False, True, True, False, False, True]
+    assert plant.holding_registers[0] == 4
+    # uma escrita por sequencia de enderecos mapeados: [0, 1] e [5]
+    assert plant.requests[WRITE_MULTIPLE_COILS] == 2
+    assert plant.requests[WRITE_MULTIPLE_REGISTERS] == 1
+
+
+def test_contiguous_runs():
+    assert contiguous_runs([5, 0, 1, 7, 8, 9]) == [[0, 1], [5], [7, 8, 9]]
+    assert contiguous_runs([]) == []
@@ -0,0 +1,55 @@
+from components.base import BoxType
+from components.order import CoverType, Order, OrderState
+from manager.order_table import OrderTable
+from simulation.fake_server import FakeServer
+from tests.plant import stop, until
+
+import asyncio
+
+
+def order(order_id: int, box_type: BoxType = BoxType.GREEN, quantity: int = 1, priority: int = 0, delivery: bool = True) -> Order:
+    return Order(order_id, box_type, quantity, CoverType.NO_COVER, delivery, priority, due=float(order_id))
+
+
+def test_order_table_indexes_orders_by_state():
+    table = OrderTable()
+    waiting, running = order(1), order(2)
+    for item in (waiting, running):
+        table.add(item)
+
+    running.set_state(OrderState.PRODUCTION)
+
+    assert table.list(OrderState.WAIT) == [waiting]
+    assert table.list() == [running, waiting]
+    assert table.status(2)[:4] == (OrderState.PRODUCTION, BoxType.GREEN, 0, 1)
+    assert table.active() == 2
+    assert table.status(3) is None
+
+
+def test_order_table_emits_state_and_box_events():
+    async def main():
+        server = FakeServer()
+        table = OrderTable()
+        await table.build(server, server.namespace_index, server.get_objects_node())
+        task = asyncio.create_task(table.run())
+
+        item = order(1)
+        table.add(item)
+        item.set_state(OrderState.PRODUCTION)
+        item.start_box()
+        item.box_finished()
+
+        try:
+            await until(lambda: len(server.events) == 3)
+
+        finally:
+            await stop(task)
+
+        return server.events
+
+    events = asyncio.run(main())
+
+    assert [name for name, _ in events] == ['OrderStateEvent', 'OrderBoxEvent', 'OrderStateEvent']
+    assert [fields['State'] for _, fields in events] == ['PRODUCTION', 'PRODUCTION', 'COMPLETED']
+    assert events[1][1]['BoxesDone'] == 1
+    assert events[2][1]['Message'] == 'Order 1: PRODUCTION -> COMPLETED'
@@ -0,0 +1,95 @@
+from components.arm import ArmComponent
+from components.base import BaseComponent, BoxType
+from components.handler import Handler
+from components.order import CoverType, Order
+from simulation.fake_server import FakeServer
+from simulation.scenario import Scenario
+from tests.plant import handler_plant, started, stop, until
+
+import asyncio
+import time
+
+
+def plant_seconds(seconds: float) -> float:
+    return seconds * BaseComponent.time_scale
+
+
+def test_pause_freezes_dwell_time():
+    async def main():
+        server = FakeServer(synchronous=True)
+        arm = ArmComponent('CoverFeed', server, server.namespace_index, server.get_objects_node(), push_time=4.0)
+        task = await started(arm)
+        scenario = Scenario(server)
+        scenario.start()
+
+        arm.requested.set()
+        await until(lambda: arm.move_front.value)
+
+        # pausa no meio do empurrao, mais longa que o tempo que faltava
+        await asyncio.sleep(plant_seconds(1.0))
+        await arm.pause()
+        await asyncio.sleep(plant_seconds(4.0))
+        resumed_at = time.monotonic() - scenario.started_at
+        await arm.resume()
+
+        try:
+            await until(lambda: arm.covers_fed == 1)
+
+        finally:
+            scenario.stop()
+            await stop(task)
+
+        return arm, scenario, resumed_at
+
+    arm, scenario, resumed_at = asyncio.run(main())
+
+    front = arm.move_front.nodeid.to_string()
+    pushed = [t for t, node_id, value in scenario.log if node_id == front and value]
+    released = [t for t, node_id, value in scenario.log if node_id == front and not value]
+
+    # a pausa desliga e o resume religa o atuador; o restante do empurrao (3 s) corre depois do resume
+    assert len(pushed) == 2 and len(released) == 2
+    assert released[-1] - resumed_at >= plant_seconds(3.0) * 0.5
+    assert arm.covers_fed == 1
+
+
+def test_pause_restarts_handler_start_movement_timeout():
+    async def main():
+        server = FakeServer(synchronous=True)
+        handler = Handler('Handler', server, server.namespace_index, server.get_objects_node(),
+                          asyncio.Queue(), asyncio.Queue(), asyncio.Semaphore(2), asyncio.Semaphore(2))
+        handler.idle_delay = 1000.0
+        task = await started(handler)
+
+        # sem regra para a Position: o elevador so anda quando o teste mandar
+        scenario = handler_plant(server, handler, positions=())
+        scenario.start()
+
+        await handler.queue_input_a.put((Order(1, BoxType.GREEN, 1, CoverType.NO_COVER, False), None))
+        await until(lambda: handler.position.value == 8)
+        await handler.pause()
+
+        # a pausa passa do prazo de 3 s para o elevador começar a andar
+        await asyncio.sleep(plant_seconds(5.0))
+        await handler.resume()
+        await asyncio.sleep(plant_seconds(1.0))
+        assumed = handler.at_position
+
+        server.set_sensor(handler.sensor_x.nodeid, True)
+        await asyncio.sleep(plant_seconds(0.5))
+        server.set_sensor(handler.sensor_x.nodeid, False)
+
+        try:
+            await until(lambda: handler.handler_move_leff.value)
+
+        finally:
+            scenario.stop()
+            await stop(task)
+
+        return handler, assumed
+
+    handler, assumed = asyncio.run(main())
+
+    # sem o movimento confirmado a posicao continua desconhecida
+    assert assumed is None
+    assert handler.at_position == 8
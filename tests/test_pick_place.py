@@ -0,0 +1,89 @@
+from components.arm import ArmComponent
+from components.base import BoxType
+from components.order import CoverType, Order
+from components.pick_place import PickPlace
+from simulation.fake_server import FakeServer
+from tests.plant import changes, pick_place_plant, started, stop, until
+
+import asyncio
+
+
+async def cover_station(server: FakeServer, queue_input: asyncio.Queue, queue_output: asyncio.Queue, box_present: bool):
+    """Braco e PickPlace rodando, com o sensor de fim da esteira anterior em box_present."""
+    objects = server.get_objects_node()
+    box_sensor = await objects.add_variable(f'ns={server.namespace_index};s=Dispatch.SensorEnd', 'SensorEnd', box_present)
+    arm = ArmComponent('CoverFeed', server, server.namespace_index, objects)
+    station = PickPlace('Cover', server, server.namespace_index, objects, queue_input, queue_output, arm, box_sensor)
+
+    return arm, station, box_sensor, [await started(arm), await started(station)]
+
+
+def test_cover_station_covers_only_boxes_that_need_it():
+    async def main():
+        server = FakeServer(synchronous=True)
+        queue_input, queue_output = asyncio.Queue(), asyncio.Queue()
+        arm, station, _, tasks = await cover_station(server, queue_input, queue_output, True)
+        scenario = pick_place_plant(server, station)
+        scenario.start()
+
+        # a primeira tampa é pega antes de qualquer caixa chegar
+        await until(lambda: station.cover_ready.is_set())
+
+        boxes = [Order(1, BoxType.GREEN, 1, CoverType.WITH_COVER, True), Order(2, BoxType.BLUE, 1, CoverType.NO_COVER, True)]
+        for order in boxes:
+            await queue_input.put((order, None))
+
+        try:
+            out = [(await asyncio.wait_for(queue_output.get(), 2.0))[0] for _ in boxes]
+            # tampa seguinte ja pega, esperando sobre o ponto de colocacao
+            await until(lambda: station.cover_ready.is_set())
+
+        finally:
+            scenario.stop()
+            await stop(*tasks)
+
+        return station, arm, scenario, boxes, out
+
+    station, arm, scenario, boxes, out = asyncio.run(main())
+
+    assert out == boxes
+    assert station.covers_placed == 1
+    assert station.cycle_histogram.count == 1
+    assert arm.covers_fed == 2
+    # pega, solta na caixa, pega a proxima
+    assert changes(scenario, station.grab) == [True, False, True]
+
+
+def test_cover_waits_for_a_late_box():
+    async def main():
+        server = FakeServer(synchronous=True)
+        queue_input, queue_output = asyncio.Queue(), asyncio.Queue()
+        arm, station, box_sensor, tasks = await cover_station(server, queue_input, queue_output, False)
+        scenario = pick_place_plant(server, station)
+        scenario.start()
+        await until(lambda: station.cover_ready.is_set())
+
+        # a esteira cheia entrega a caixa na fila antes dela chegar no fim
+        order = Order(1, BoxType.GREEN, 1, CoverType.WITH_COVER, True)
+        await queue_input.put((order, None))
+
+        try:
+            await asyncio.sleep(0.05)
+            holding = changes(scenario, station.grab)
+
+            server.set_sensor(box_sensor.nodeid, True)
+            out, _ = await asyncio.wait_for(queue_output.get(), 2.0)
+
+        finally:
+            scenario.stop()
+            await stop(*tasks)
+
+        return station, scenario, holding, order, out
+
+    station, scenario, holding, order, out = asyncio.run(main())
+
+    assert out == order
+    # a tampa ficou na garra ate a caixa chegar
+    assert holding == [True]
+    assert changes(scenario, station.grab)[:2] == [True, False]
+    assert station.covers_placed == 1
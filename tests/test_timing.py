@@ -0,0 +1,31 @@
+from components.conveyor import Conveyor, ConveyorDirection
+from manager.timing import TimingProfile
+from simulation.fake_server import FakeServer
+
+import asyncio
+
+
+def test_profile_measures_from_the_command_before_the_wait():
+    async def main():
+        server = FakeServer(synchronous=True)
+        conveyor = Conveyor('Input', server, server.namespace_index, server.get_objects_node(),
+                            2, 2, {ConveyorDirection.FORWARD}, asyncio.Queue(), asyncio.Queue(), asyncio.Semaphore(2))
+        await conveyor.build()
+        conveyor.running.set()
+        timing = conveyor.timing = TimingProfile()
+
+        # comando, dwell e espera: a duracao conta desde o comando
+        await conveyor.write(conveyor.engines[0], True)
+        await asyncio.sleep(0.05)
+        with conveyor.waiting('SensorEnd'):
+            await asyncio.sleep(0.05)
+
+        # segunda espera sem comando novo: conta so a propria espera
+        with conveyor.waiting('SensorEnd'):
+            await asyncio.sleep(0.05)
+
+        return list(timing.samples[conveyor.timing_key('SensorEnd')])
+
+    first, second = asyncio.run(main())
+    assert first >= 0.1
+    assert 0.05 <= second < 0.1
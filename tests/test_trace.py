@@ -0,0 +1,148 @@
+from asyncua.ua import NodeId
+from components.base import BaseComponent
+from components.box_producer import BoxType
+from manager.line import Line, LineSettings
+from manager.merge import MergePolicy
+from manager.replay import ReplayDriver, compare
+from manager.trace import HEADER, KIND, MAGIC, ORDER_V1, RecordKind, TraceRecord, TraceRecorder, actuator_sequence, read_trace
+from simulation.fake_server import FakeServer
+from tests.plant import stop
+
+import asyncio
+import pytest
+
+
+def test_records_survive_round_trip(tmp_path):
+    path = tmp_path / 'line.fiot'
+    sensor = NodeId.from_string('ns=2;s=Sensor')
+    actuator = NodeId.from_string('ns=2;s=Actuator')
+
+    recorder = TraceRecorder(path, flush_every=2)
+    recorder.line(2, {'name': 'Line', 'settings': {'feeder_pipelined': True}, 'timing': None, 'watchdog': False})
+    recorder.sensor(sensor, 1)
+    recorder.actuator(actuator, 1)
+    recorder.order(7, 1, 3, True, False, 2, namespace_index=2)
+    recorder.actuator(actuator, 0)
+    recorder.close()
+
+    # segunda sessao no mesmo arquivo, os indices dos nodes recomecam
+    recorder = TraceRecorder(path)
+    recorder.actuator(actuator, 1)
+    recorder.close()
+
+    records = list(read_trace(path))
+    assert [record.kind for record in records] == [
+        RecordKind.LINE, RecordKind.SENSOR, RecordKind.ACTUATOR, RecordKind.ORDER, RecordKind.ACTUATOR, RecordKind.ACTUATOR]
+    assert (records[0].value, records[0].line['settings']) == (2, {'feeder_pipelined': True})
+    assert records[1].node_id == sensor.to_string()
+    assert (records[3].value, records[3].order) == (2, (7, 1, 3, 1, 0, 2))
+    assert records[5].timestamp >= records[4].timestamp
+    assert actuator_sequence(records) == {actuator.to_string(): [1, 0, 1]}
+
+
+def test_version_1_orders_have_no_namespace(tmp_path):
+    path = tmp_path / 'line.fiot'
+    path.write_bytes(HEADER.pack(MAGIC, 1, 0.0) + KIND.pack(RecordKind.ORDER) + ORDER_V1.pack(0.5, 7, 1, 3, 1, 0, 2))
+
+    [record] = read_trace(path)
+    assert (record.kind, record.timestamp, record.value, record.order) == (RecordKind.ORDER, 0.5, -1, (7, 1, 3, 1, 0, 2))
+
+
+def test_line_settings_survive_round_trip():
+    settings = LineSettings(feeder_pipelined=True, merge_policy=MergePolicy.WEIGHTED, merge_weights={BoxType.GREEN: 3})
+
+    assert LineSettings.from_dict(settings.to_dict()) == settings
+    with pytest.raises(ValueError):
+        LineSettings.from_dict({'conveyor_speed': 2.0})
+    with pytest.raises(ValueError):
+        LineSettings.from_dict({'merge_policy': 'FASTEST'})
+
+
+def test_compare_reports_first_divergence():
+    divergences = compare({'a': [1, 0, 1], 'b': [1]}, {'a': [1, 1, 1], 'c': [0]})
+
+    assert [(d.node_id, d.index, d.expected, d.replayed) for d in divergences] == [
+        ('a', 1, 0, 1), ('b', 0, 1, None), ('c', 0, None, 0)]
+
+
+async def record_lines(path, speed: float, settings: LineSettings, count: int = 1):
+    """Uma caixa verde por linha no servidor fake, 'count' linhas com namespaces proprios e os tempos acelerados por 'speed'."""
+    BaseComponent.time_scale = 1.0 / speed
+    recorder = BaseComponent.recorder = TraceRecorder(path)
+
+    server = FakeServer()
+    lines = []
+    for position in range(count):
+        idx = server.namespace_index if position == 0 else server.register_namespace(f'urn:fake:line:{position}')
+        line = Line(server, idx, server.get_objects_node(), settings, name=f'Line{position}', recorder=recorder)
+        await line.build()
+        line.start_tasks()
+        lines.append(line)
+
+    try:
+        await asyncio.sleep(0)
+        for line in lines:
+            line.start()
+            await line.process_order.handle_new_order(None, 1, 1, False, True)
+
+        # o container enche em 7 s de planta, depois a caixa passa pelo start e chega no fim
+        for delay, signal, value in [(8.5, 'SensorStart', True), (0.5, 'SensorStart', False), (1.0, 'SensorEnd', True), (3.0, None, None)]:
+            await asyncio.sleep(delay / speed)
+            if signal is not None:
+                for line in lines:
+                    server.set_sensor(f'ns={line.namespace_index};s=Feeder.GREEN.{signal}', value)
+
+    finally:
+        await stop(*[task for line in lines for task in line.tasks])
+        recorder.close()
+        BaseComponent.recorder = None
+
+
+def recorded(path, speed: float):
+    """Registros do trace com os tempos de volta no relogio da planta."""
+    records = list(read_trace(path))
+    for record in records:
+        record.timestamp *= speed
+
+    return records
+
+
+def test_replay_of_recorded_line_has_no_divergences(tmp_path):
+    path = tmp_path / 'line.fiot'
+    speed = 10.0
+    asyncio.run(record_lines(path, speed, LineSettings()))
+
+    records = recorded(path, speed)
+    assert any(record.kind == RecordKind.ACTUATOR for record in records)
+    assert asyncio.run(ReplayDriver(records, speed=speed).run()) == []
+
+
+def test_replay_uses_recorded_settings_and_namespaces(tmp_path):
+    path = tmp_path / 'lines.fiot'
+    speed = 10.0
+    asyncio.run(record_lines(path, speed, LineSettings(feeder_pipelined=True), count=2))
+
+    driver = ReplayDriver(recorded(path, speed), speed=speed)
+    lines = driver.lines()
+    assert [info['name'] for idx, info in sorted(lines.items())] == ['Line0', 'Line1']
+    assert all(LineSettings.from_dict(info['settings']).feeder_pipelined for info in lines.values())
+
+    assert asyncio.run(driver.run()) == []
+    assert {NodeId.from_string(node_id).NamespaceIndex for node_id in driver.capture.actuators} == set(lines)
+
+
+def test_replay_rejects_traces_it_cannot_reproduce():
+    line = {'name': 'Line', 'settings': {}, 'timing': None, 'watchdog': False}
+    write = TraceRecord(RecordKind.ACTUATOR, 0.0, 'ns=3;s=Feeder.GREEN.Emitter', 1)
+
+    # IO de um namespace sem registro LINE
+    with pytest.raises(ValueError):
+        ReplayDriver([TraceRecord(RecordKind.LINE, 0.0, value=2, line=line), write]).lines()
+
+    # versao 1 com mais de uma linha
+    with pytest.raises(ValueError):
+        ReplayDriver([TraceRecord(RecordKind.ACTUATOR, 0.0, 'ns=2;s=Feeder.GREEN.Emitter', 1), write]).lines()
+
+    # recuperacoes do watchdog nao ficam no trace
+    with pytest.raises(ValueError):
+        ReplayDriver([TraceRecord(RecordKind.LINE, 0.0, value=3, line={**line, 'watchdog': True}), write]).lines()
@@ -0,0 +1,150 @@
+from components.base import BoxType
+from components.order import CoverType, Order
+from components.turn_table import Capabilities, TurnTable1, TurnTable2, TurnTable3
+from manager.line import QueueRouter, default_router, simple_delivery
+from simulation.fake_server import FakeServer
+from simulation.scenario import Scenario
+from tests.plant import PreviousStage, started, stop, until
+
+import asyncio
+import pytest
+
+
+def blue_pass(table):
+    return (Scenario(table.server)
+        .expect(table.node_roll_minus, True)
+        .at(0.2, table.node_roll_front_limit, True)
+        .at(0.2, table.node_roll_front_limit, False)
+        .at(0.2, table.node_roll_back_limit, True)
+        .expect(table.node_roll_minus, False)
+        .expect(table.node_roll_minus, True)        # proximo estagio puxando
+        .at(0.3, table.node_roll_back_limit, False)
+        .expect(table.node_roll_minus, False))
+
+
+def green_pass(table):
+    return (Scenario(table.server)
+        .expect(table.node_move_turn, True)
+        .at(0.1, table.node_sensor_turn_nineteen, True)
+        .expect(table.node_roll_minus, True)
+        .at(0.2, table.node_roll_back_limit, True)
+        .expect(table.node_roll_minus, False)
+        .expect(table.node_move_turn, False)
+        .at(0.1, table.node_sensor_turn_nineteen, False)
+        .at(0.1, table.node_sensor_turn_zero, True)
+        .expect(table.node_roll_minus, True)
+        .at(0.3, table.node_roll_back_limit, False)
+        .expect(table.node_roll_minus, False))
+
+
+def metal_pass(table):
+    # a caixa de metal entra pelo lado do roll+
+    return (Scenario(table.server)
+        .expect(table.node_move_turn, True)
+        .at(0.1, table.node_sensor_turn_nineteen, True)
+        .expect(table.node_roll_plus, True)
+        .at(0.2, table.node_roll_front_limit, True)
+        .expect(table.node_roll_plus, False)
+        .expect(table.node_move_turn, False)
+        .at(0.1, table.node_sensor_turn_nineteen, False)
+        .at(0.1, table.node_sensor_turn_zero, True)
+        .expect(table.node_roll_minus, True)
+        .at(0.2, table.node_roll_back_limit, True)
+        .at(0.2, table.node_roll_back_limit, False)
+        .expect(table.node_roll_minus, False))
+
+
+def delivery(table):
+    return (Scenario(table.server)
+        .expect(table.node_roll_minus, True)
+        .at(0.2, table.node_roll_back_limit, True)
+        .expect(table.node_roll_minus, False)
+        .expect(table.node_roll_minus, True)        # proximo estagio puxando
+        .at(0.2, table.node_roll_back_limit, False)
+        .expect(table.node_roll_minus, False))
+
+
+def storage(table):
+    return (Scenario(table.server)
+        .expect(table.node_roll_minus, True)
+        .at(0.2, table.node_roll_back_limit, True)
+        .expect(table.node_roll_minus, False)
+        .expect(table.node_move_turn, True)
+        .at(0.1, table.node_sensor_turn_nineteen, True)
+        .expect(table.node_roll_minus, True)        # proximo estagio puxando
+        .at(0.2, table.node_roll_back_limit, False)
+        .expect(table.node_roll_minus, False)
+        .expect(table.node_move_turn, False)
+        .at(0.1, table.node_sensor_turn_nineteen, False)
+        .at(0.1, table.node_sensor_turn_zero, True))
+
+
+async def route(table_class, capabilities, order: Order, sequence, routing=None):
+    """Passa uma ordem pelo turntable e devolve (fila em que a caixa saiu, comandos ao estagio anterior)."""
+    server = FakeServer(synchronous=True)
+    queue_input = asyncio.Queue()
+    queues = {'output': asyncio.Queue(), 'storage': asyncio.Queue(), 'delivery': asyncio.Queue()}
+
+    if routing is None:
+        queue_output = queues['output']
+    else:
+        queue_output = QueueRouter(queues['storage'], queues['delivery'], asyncio.Semaphore(), asyncio.Semaphore(), routing)
+
+    table = table_class('Table', server, server.namespace_index, server.get_objects_node(),
+                        capabilities, queue_input, queue_output, asyncio.Semaphore())
+
+    task = await started(table)
+    scenario = sequence(table)
+    previous = PreviousStage()
+    await queue_input.put((order, previous))
+
+    try:
+        await scenario.run(timeout=2.0)
+        await until(lambda: table.cycle_histogram.count == 1)
+
+    finally:
+        await stop(task)
+
+    exits = {name: queue.get_nowait()[0] for name, queue in queues.items() if not queue.empty()}
+    return exits, previous.commands
+
+
+@pytest.mark.parametrize('box_type, sequence', [
+    (BoxType.BLUE, blue_pass),
+    (BoxType.GREEN, green_pass),
+    (BoxType.METAL, metal_pass),
+], ids=['BLUE', 'GREEN', 'METAL'])
+def test_select_passes_each_box_type(box_type, sequence):
+    order = Order(1, box_type, 1, CoverType.NO_COVER, True)
+    exits, previous = asyncio.run(route(TurnTable1, {Capabilities.PASS}, order, sequence))
+
+    assert exits == {'output': order}
+    assert previous == [True, False]
+
+
+@pytest.mark.parametrize('cover, delivery_, sequence, exit_queue', [
+    (CoverType.NO_COVER, True, delivery, 'delivery'),
+    (CoverType.WITH_COVER, False, delivery, 'delivery'),     # tampa: segue pela expedicao ate a estacao de tampas
+    (CoverType.NO_COVER, False, storage, 'storage'),
+], ids=['delivery_no_cover', 'storage_cover', 'storage_no_cover'])
+def test_no_cover_table_routes(cover, delivery_, sequence, exit_queue):
+    order = Order(1, BoxType.GREEN, 1, cover, delivery_)
+    capabilities = {Capabilities.DELIVERY_NO_COVER, Capabilities.STORAGE_NO_COVER}
+    exits, previous = asyncio.run(route(TurnTable2, capabilities, order, sequence, default_router))
+
+    assert exits == {exit_queue: order}
+    assert previous == [True, False]
+
+
+@pytest.mark.parametrize('cover, delivery_, sequence, exit_queue', [
+    (CoverType.WITH_COVER, False, storage, 'storage'),
+    (CoverType.WITH_COVER, True, delivery, 'delivery'),
+    (CoverType.NO_COVER, True, delivery, 'delivery'),
+], ids=['storage_cover', 'delivery_cover', 'delivery_no_cover'])
+def test_cover_table_routes(cover, delivery_, sequence, exit_queue):
+    order = Order(1, BoxType.METAL, 1, cover, delivery_)
+    capabilities = {Capabilities.DELIVERY_NO_COVER, Capabilities.DELIVERY_COVER, Capabilities.STORAGE_COVER}
+    exits, previous = asyncio.run(route(TurnTable3, capabilities, order, sequence, simple_delivery))
+
+    assert exits == {exit_queue: order}
+    assert previous == [True, False]
@@ -0,0 +1,116 @@
+from components.base import BaseComponent, BoxType
+from components.conveyor import Conveyor, ConveyorDirection
+from components.order import CoverType, Order
+from manager.watchdog import Watchdog
+from simulation.fake_server import FakeServer
+from tests.plant import started, stop, until
+
+import asyncio
+import pytest
+
+
+# prazo de uma espera da esteira: 5 s de planta
+STEP = 5.0
+
+
+async def conveyor_waiting_start():
+    """Esteira com a caixa a caminho do sensor de start, o primeiro wait_edge da sequencia."""
+    server = FakeServer(synchronous=True)
+    conveyor = Conveyor('Input', server, server.namespace_index, server.get_objects_node(),
+                        1, 2, {ConveyorDirection.FORWARD}, asyncio.Queue(), asyncio.Queue(), asyncio.Semaphore(2))
+
+    task = await started(conveyor)
+    await conveyor.queue_input.put((Order(1, BoxType.GREEN, 1, CoverType.NO_COVER, True), None))
+    await until(lambda: conveyor.active_waits)
+    return server, conveyor, task
+
+
+def waiting_end(conveyor) -> bool:
+    """A caixa passou do start e a esteira espera o sensor de fim."""
+    return any('SensorEnd' in active_wait.label for active_wait in conveyor.active_waits.values())
+
+
+def plant_seconds(seconds: float) -> float:
+    return seconds * BaseComponent.time_scale
+
+
+@pytest.fixture
+def watchdog():
+    BaseComponent.watchdog = Watchdog({'Conveyor': STEP}, retries=1, poll=0.1)
+    return BaseComponent.watchdog
+
+
+def test_missed_edge_is_recovered_by_rereading_the_sensor(watchdog):
+    async def main():
+        server, conveyor, task = await conveyor_waiting_start()
+        start = conveyor.sensors[0]
+        server.set_sensor(start.nodeid, True)
+
+        # a descida nao gera notificacao, so o valor do sensor muda
+        start.value = False
+
+        try:
+            await until(lambda: waiting_end(conveyor), timeout=2.0)
+
+        finally:
+            await stop(task)
+
+        return conveyor
+
+    conveyor = asyncio.run(main())
+
+    assert conveyor.missed_edges == 1
+    assert conveyor.watchdog_timeouts == 1
+    assert conveyor.jams == 0
+
+
+def test_stalled_motion_is_retried_once(watchdog):
+    async def main():
+        server, conveyor, task = await conveyor_waiting_start()
+        start = conveyor.sensors[0]
+
+        # a caixa so anda depois do reenvio dos comandos
+        await asyncio.sleep(plant_seconds(STEP * 1.5))
+        server.set_sensor(start.nodeid, True)
+        server.set_sensor(start.nodeid, False)
+
+        try:
+            await until(lambda: waiting_end(conveyor), timeout=2.0)
+
+        finally:
+            await stop(task)
+
+        return conveyor
+
+    conveyor = asyncio.run(main())
+
+    assert conveyor.watchdog_timeouts == 1
+    assert conveyor.motion_retries == 1
+    assert conveyor.jams == 0 and conveyor.missed_edges == 0
+
+
+def test_jam_isolates_stage_until_edge_arrives(watchdog):
+    async def main():
+        server, conveyor, task = await conveyor_waiting_start()
+        start = conveyor.sensors[0]
+
+        try:
+            await until(lambda: conveyor.isolated, timeout=2.0)
+            # isolada, a sequencia continua esperando com os atuadores como estavam
+            assert conveyor.engines[0].value is True
+
+            # o operador libera a caixa
+            server.set_sensor(start.nodeid, True)
+            server.set_sensor(start.nodeid, False)
+            await until(lambda: waiting_end(conveyor), timeout=2.0)
+            assert not conveyor.isolated
+
+        finally:
+            await stop(task)
+
+        return conveyor
+
+    conveyor = asyncio.run(main())
+
+    assert conveyor.jams == 1
+    assert conveyor.watchdog_timeouts == 2